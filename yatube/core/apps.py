@@ -1,5 +1,28 @@
 from django.apps import AppConfig
+from django.core import checks
+from django.core.signals import request_finished
+from django.db.backends.signals import connection_created
 
 
 class CoreConfig(AppConfig):
     name = 'core'
+
+    def ready(self):
+        from core import (
+            counters, identity_map, instrumentation, metrics, object_cache
+        )
+        from core.checks import (
+            check_negative_cache_backend, check_shared_cache
+        )
+        from core.db import configure_sqlite
+        from core.models import User
+        checks.register(check_negative_cache_backend, checks.Tags.caches)
+        checks.register(check_shared_cache, checks.Tags.caches, deploy=True)
+        instrumentation.install()
+        metrics.prune()
+        identity_map.install()
+        connection_created.connect(configure_sqlite)
+        object_cache.register(User, ['username'])
+        request_finished.connect(
+            counters.accumulator.flush_if_due, weak=False
+        )
@@ -0,0 +1,160 @@
+"""Бенчмарк основных страниц: задержка, число SQL-запросов, время рендеринга.
+
+Запросы проходят через тестовый клиент Django, т.е. через весь стек
+middleware и WSGI-обработчик, но без сети.
+"""
+import statistics
+import time
+
+from django.test import Client
+from django.urls import reverse
+
+from core import instrumentation
+from core.models import User
+from posts.models import Comment, Follow, Group, Post
+
+BENCHMARK_PASSWORD = 'benchmark-password'
+
+
+def _views(data):
+    author = data['authors'][0]
+    return (
+        ('index', reverse('posts:index'), False),
+        ('group_list', reverse(
+            'posts:group_list', kwargs={'slug': data['groups'][0].slug}
+        ), False),
+        ('profile', reverse(
+            'posts:profile', kwargs={'username': author.username}
+        ), False),
+        ('post_detail', reverse(
+            'posts:post_detail', kwargs={'post_id': data['post'].pk}
+        ), False),
+        ('follow_index', reverse('posts:follow_index'), True),
+    )
+
+
+def seed(authors=20, groups=5, posts_per_author=30, comments_per_post=3):
+    """Наполняет базу тестовыми данными и возвращает опорные объекты."""
+    User.objects.bulk_create(
+        User(username=f'bench_author_{i}') for i in range(authors)
+    )
+    users = list(User.objects.filter(username__startswith='bench_author_'))
+    reader = User.objects.create_user(
+        username='bench_reader', password=BENCHMARK_PASSWORD
+    )
+    Group.objects.bulk_create(
+        Group(
+            title=f'Группа {i}',
+            slug=f'bench-group-{i}',
+            description=f'Описание группы {i}',
+        )
+        for i in range(groups)
+    )
+    group_list = list(Group.objects.filter(slug__startswith='bench-group-'))
+    Post.objects.bulk_create(
+        Post(
+            text=f'Пост {j} автора {user.username}',
+            author=user,
+            group=group_list[j % len(group_list)],
+        )
+        for user in users
+        for j in range(posts_per_author)
+    )
+    post_ids = Post.objects.values_list('pk', flat=True)
+    Comment.objects.bulk_create(
+        Comment(
+            post_id=post_id,
+            author=users[k % len(users)],
+            text=f'Комментарий {k}',
+        )
+        for post_id in post_ids
+        for k in range(comments_per_post)
+    )
+    Follow.objects.bulk_create(
+        Follow(user=reader, author=user) for user in users[::2]
+    )
+    return {
+        'authors': users,
+        'groups': group_list,
+        'reader': reader,
+        'post': Post.objects.filter(author=users[0]).first(),
+    }
+
+
+def percentile(values, pct):
+    """Перцентиль с линейной интерполяцией между соседними значениями."""
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    rank = (len(ordered) - 1) * pct / 100
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def measure(client, url, iterations, warmup=0):
+    """Выполняет GET-запросы к url и возвращает сводку замеров."""
+    for _ in range(warmup):
+        client.get(url)
+    latencies, queries, sql, render = [], [], [], []
+    for _ in range(iterations):
+        with instrumentation.collect() as collector:
+            start = time.perf_counter()
+            response = client.get(url)
+            latencies.append((time.perf_counter() - start) * 1000)
+        if response.status_code != 200:
+            raise RuntimeError(
+                f'{url} вернул статус {response.status_code}'
+            )
+        queries.append(collector.queries)
+        sql.append(collector.sql_time * 1000)
+        render.append(collector.render_time * 1000)
+    return {
+        'p50_ms': percentile(latencies, 50),
+        'p95_ms': percentile(latencies, 95),
+        'p99_ms': percentile(latencies, 99),
+        'mean_ms': statistics.mean(latencies),
+        'queries': max(queries),
+        'sql_ms': statistics.median(sql),
+        'render_ms': statistics.median(render),
+    }
+
+
+def run(data, iterations=50, warmup=5):
+    """Прогоняет все страницы бенчмарка, возвращает {имя: сводка}."""
+    guest = Client()
+    reader = Client()
+    reader.login(username=data['reader'].username, password=BENCHMARK_PASSWORD)
+    return {
+        name: measure(
+            reader if login_required else guest, url, iterations, warmup
+        )
+        for name, url, login_required in _views(data)
+    }
+
+
+def compare(results, baseline, latency_threshold=0.2, query_threshold=0):
+    """Сравнивает результаты с базовыми и возвращает список регрессий.
+
+    Задержка считается регрессией, если p95 вырос больше чем на
+    latency_threshold (доля), число запросов — если превысило базовое
+    больше чем на query_threshold.
+    """
+    regressions = []
+    for name, current in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        limit = base['p95_ms'] * (1 + latency_threshold)
+        if current['p95_ms'] > limit:
+            regressions.append(
+                f'{name}: p95 {current["p95_ms"]:.2f} мс '
+                f'> {limit:.2f} мс (база {base["p95_ms"]:.2f} мс)'
+            )
+        if current['queries'] > base['queries'] + query_threshold:
+            regressions.append(
+                f'{name}: {current["queries"]} SQL-запросов '
+                f'> {base["queries"] + query_threshold} '
+                f'(база {base["queries"]})'
+            )
+    return regressions
@@ -0,0 +1,58 @@
+"""Бэкенды кэша, которые сообщают о своих операциях в instrumentation."""
+import time
+
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+
+from core import instrumentation, metrics
+
+_missing = object()
+
+
+def is_process_local(alias='default'):
+    """True, если записи кэша alias не видны другим процессам."""
+    return isinstance(caches[alias], (LocMemCache, DummyCache))
+
+
+class InstrumentedCacheMixin:
+    """Учитывает время операций с кэшем в сборщике текущего запроса.
+
+    Попадания и промахи get() считаются в метриках по имени фрагмента.
+    """
+
+    def _timed(self, method, *args, **kwargs):
+        if not instrumentation.active():
+            return method(*args, **kwargs)
+        start = time.perf_counter()
+        try:
+            return method(*args, **kwargs)
+        finally:
+            instrumentation.record_cache(time.perf_counter() - start)
+
+    def get(self, key, default=None, version=None):
+        value = self._timed(super().get, key, _missing, version)
+        metrics.registry.inc('yatube_cache_requests_total', (
+            ('fragment', metrics.fragment_name(key)),
+            ('result', 'miss' if value is _missing else 'hit'),
+        ))
+        return default if value is _missing else value
+
+    def set(self, *args, **kwargs):
+        return self._timed(super().set, *args, **kwargs)
+
+    def add(self, *args, **kwargs):
+        return self._timed(super().add, *args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        return self._timed(super().delete, *args, **kwargs)
+
+    def incr(self, *args, **kwargs):
+        return self._timed(super().incr, *args, **kwargs)
+
+    def has_key(self, *args, **kwargs):
+        return self._timed(super().has_key, *args, **kwargs)
+
+
+class InstrumentedLocMemCache(InstrumentedCacheMixin, LocMemCache):
+    pass
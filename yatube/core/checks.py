@@ -0,0 +1,40 @@
+"""Проверки настроек при запуске (manage.py check, runserver, тесты)."""
+from django.conf import settings
+from django.core import checks
+
+from core.cache import is_process_local
+
+
+def check_negative_cache_backend(app_configs, **kwargs):
+    """Поколение фильтров Блума должно быть видно всем процессам."""
+    if not settings.NEGATIVE_CACHE_BLOOM_FIELDS:
+        return []
+    if not is_process_local():
+        return []
+    return [checks.Error(
+        'NEGATIVE_CACHE_BLOOM_FIELDS требует общего для процессов кэша.',
+        hint=(
+            'В кэше процесса другие воркеры не узнают о новых объектах и '
+            'продолжат отвечать 404. Настройте CACHES["default"] на '
+            'Redis, Memcached или базу данных либо очистите '
+            'NEGATIVE_CACHE_BLOOM_FIELDS.'
+        ),
+        id='core.E001',
+    )]
+
+
+def check_shared_cache(app_configs, **kwargs):
+    """Для нескольких воркеров кэш default должен быть общим."""
+    if not is_process_local():
+        return []
+    return [checks.Warning(
+        'Кэш default виден только своему процессу.',
+        hint=(
+            'Удаление объекта из core.object_cache после записи не '
+            'дойдёт до других воркеров, поэтому они хранят объекты не '
+            'дольше OBJECT_CACHE_LOCAL_TIMEOUT. Для нескольких воркеров '
+            'настройте CACHES["default"] на Redis, Memcached или базу '
+            'данных.'
+        ),
+        id='core.W001',
+    )]
@@ -0,0 +1,201 @@
+"""Сжатие ответов gzip и brotli, в том числе потоковых.
+
+CompressionMiddleware выбирает кодировку по Accept-Encoding (brotli
+предпочтительнее gzip) и сжимает текстовые ответы длиннее
+COMPRESSION_MIN_LENGTH. StreamingHttpResponse сжимается по частям: после
+каждой части компрессор сбрасывается, и клиент получает её сразу.
+
+Фрагменты, кэшируемые тегом {% cache %} из библиотеки compressed_cache,
+хранятся вместе со сжатой копией (сырой deflate, COMPRESSION_FRAGMENT_LEVEL),
+которая считается один раз при промахе кэша. Если на странице есть такие
+фрагменты и клиент принимает gzip, ответ собирается из кусков: между
+фрагментами сжимается только остальной HTML, а фрагменты вставляются
+готовыми, так что попадание в кэш не тратит процессор на их сжатие.
+Куски deflate заканчиваются сбросом Z_SYNC_FLUSH и не ссылаются на
+предыдущие данные, поэтому их можно склеивать; поток закрывается пустым
+последним блоком и контрольной суммой CRC-32 всего текста. Потоки brotli
+так не склеиваются, поэтому страницы с фрагментами отдаются в gzip.
+"""
+import struct
+import zlib
+
+import brotli
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+
+from core.staticfiles import accepted_encodings
+
+COMPRESSIBLE_TYPES = {
+    'text/html', 'text/plain', 'text/css', 'text/csv', 'text/xml',
+    'application/json', 'application/javascript', 'application/xml',
+    'image/svg+xml',
+}
+GZIP_HEADER = b'\x1f\x8b\x08\x00\x00\x00\x00\x00\x00\xff'
+# Последний блок deflate без данных (фиксированные коды, только конец).
+FINAL_BLOCK = b'\x03\x00'
+
+
+def deflate(data, level):
+    """Сырой deflate, который можно вставить в середину потока."""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, -zlib.MAX_WBITS)
+    return compressor.compress(data) + compressor.flush(zlib.Z_SYNC_FLUSH)
+
+
+class Fragment(str):
+    """Отрисованный фрагмент шаблона, его байты и сжатая копия."""
+
+    def __new__(cls, text, data=None, deflated=None):
+        fragment = super().__new__(cls, text)
+        fragment.data = data
+        if data is None:
+            fragment.data = text.encode(settings.DEFAULT_CHARSET)
+        fragment.deflated = deflated
+        if deflated is None:
+            fragment.deflated = deflate(
+                fragment.data, settings.COMPRESSION_FRAGMENT_LEVEL
+            )
+        return fragment
+
+    def __reduce__(self):
+        return Fragment, (str(self), self.data, self.deflated)
+
+
+def add_fragment(request, fragment):
+    """Отмечает, что в ответ на request войдёт сжатый fragment."""
+    if not hasattr(request, 'compressed_fragments'):
+        request.compressed_fragments = []
+    request.compressed_fragments.append(fragment)
+
+
+def _find(content, data, position):
+    # Поиск по короткому началу и сравнение целиком быстрее, чем поиск
+    # длинной подстроки.
+    prefix = data[:64]
+    start = content.find(prefix, position)
+    while start >= 0:
+        if content.startswith(data, start):
+            return start
+        start = content.find(prefix, start + 1)
+    return -1
+
+
+def splice_gzip(content, fragments):
+    """gzip для content, где куски fragments берутся сжатыми заранее.
+
+    Фрагменты ищутся в content по порядку; ненайденные сжимаются вместе
+    с остальным текстом.
+    """
+    level = settings.COMPRESSION_GZIP_LEVEL
+    parts = [GZIP_HEADER]
+    position = 0
+    for fragment in fragments:
+        data = fragment.data
+        start = _find(content, data, position) if data else -1
+        if start < 0:
+            continue
+        parts.append(deflate(content[position:start], level))
+        parts.append(fragment.deflated)
+        position = start + len(data)
+    parts.append(deflate(content[position:], level))
+    parts.append(FINAL_BLOCK)
+    parts.append(struct.pack(
+        '<II', zlib.crc32(content), len(content) & 0xffffffff
+    ))
+    return b''.join(parts)
+
+
+def compress(content, encoding):
+    if encoding == 'br':
+        return brotli.compress(
+            content, quality=settings.COMPRESSION_BROTLI_QUALITY
+        )
+    compressor = zlib.compressobj(
+        settings.COMPRESSION_GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS
+    )
+    return compressor.compress(content) + compressor.flush()
+
+
+def compress_stream(chunks, encoding):
+    """Сжимает поток частей, отдавая каждую часть без задержки."""
+    if encoding == 'br':
+        compressor = brotli.Compressor(
+            quality=settings.COMPRESSION_BROTLI_QUALITY
+        )
+        for chunk in chunks:
+            data = compressor.process(chunk) + compressor.flush()
+            if data:
+                yield data
+        yield compressor.finish()
+        return
+    compressor = zlib.compressobj(
+        settings.COMPRESSION_GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS
+    )
+    for chunk in chunks:
+        data = compressor.compress(chunk) + compressor.flush(
+            zlib.Z_SYNC_FLUSH
+        )
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def _compressible(response):
+    if response.has_header('Content-Encoding'):
+        return False
+    content_type = response.get('Content-Type', '').split(';')[0]
+    if content_type.strip().lower() not in COMPRESSIBLE_TYPES:
+        return False
+    return response.streaming or (
+        len(response.content) >= settings.COMPRESSION_MIN_LENGTH
+    )
+
+
+class CompressionMiddleware:
+    """Сжимает ответы gzip или brotli; см. описание модуля."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if not _compressible(response):
+            return response
+        patch_vary_headers(response, ('Accept-Encoding',))
+        accepted = accepted_encodings(
+            request.META.get('HTTP_ACCEPT_ENCODING', '')
+        )
+        fragments = getattr(request, 'compressed_fragments', ())
+        splice = (
+            fragments and not response.streaming and 'gzip' in accepted
+            and settings.COMPRESSION_FRAGMENTS
+            and response.charset.lower() == settings.DEFAULT_CHARSET.lower()
+        )
+        if splice:
+            encoding = 'gzip'
+        elif 'br' in accepted:
+            encoding = 'br'
+        elif 'gzip' in accepted:
+            encoding = 'gzip'
+        else:
+            return response
+
+        if response.streaming:
+            response.streaming_content = compress_stream(
+                response.streaming_content, encoding
+            )
+            del response['Content-Length']
+        else:
+            if splice:
+                content = splice_gzip(response.content, fragments)
+            else:
+                content = compress(response.content, encoding)
+            if len(content) >= len(response.content):
+                return response
+            response.content = content
+            response['Content-Length'] = str(len(content))
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            # Сжатое тело отличается побайтно, сильный ETag не подходит.
+            response['ETag'] = 'W/' + etag
+        response['Content-Encoding'] = encoding
+        return response
@@ -0,0 +1,220 @@
+"""Шардированные счётчики для записей с высокой конкуренцией.
+
+Счётчик `<вид>:<id>` хранится в SHARDED_COUNTER_SHARDS строках
+CounterShard, и каждое увеличение попадает в случайную из них, так что
+одновременные писатели почти не спорят за одну строку. Значение — сумма
+строк, она кэшируется на SHARDED_COUNTER_CACHE_TIMEOUT.
+
+Увеличения сначала копятся в памяти процесса (Accumulator) и сбрасываются
+одной транзакцией не чаще раза в SHARDED_COUNTER_FLUSH_INTERVAL секунд по
+окончании запроса, фоновым потоком (start_flusher) и при выходе процесса;
+при падении воркера теряются дельты с последнего сброса. После сброса
+итог каждого затронутого счётчика передаётся функции, зарегистрированной
+для его вида через register(), — например, чтобы записать его в
+денормализованное поле.
+"""
+import atexit
+import logging
+import os
+import random
+import threading
+import time
+import weakref
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import (
+    DEFAULT_DB_ALIAS, IntegrityError, close_old_connections, transaction
+)
+from django.db.models import F, Sum
+
+from core.models import CounterShard
+
+logger = logging.getLogger(__name__)
+
+_materializers = {}
+_accumulators = weakref.WeakSet()
+_flusher = None
+_stop_flusher = None
+
+
+class Accumulator:
+    """Копит дельты по ключам в памяти и передаёт их write() пачкой."""
+
+    def __init__(self, write,
+                 interval_setting='SHARDED_COUNTER_FLUSH_INTERVAL'):
+        self.write = write
+        self.interval_setting = interval_setting
+        self.lock = threading.Lock()
+        self.deltas = defaultdict(int)
+        self.last_flush = time.monotonic()
+        _accumulators.add(self)
+
+    def add(self, key, delta=1):
+        with self.lock:
+            self.deltas[key] += delta
+
+    def pending(self, key):
+        with self.lock:
+            return self.deltas.get(key, 0)
+
+    def clear(self):
+        with self.lock:
+            self.deltas.clear()
+
+    def flush(self):
+        with self.lock:
+            deltas, self.deltas = self.deltas, defaultdict(int)
+            self.last_flush = time.monotonic()
+        deltas = {key: delta for key, delta in deltas.items() if delta}
+        if not deltas:
+            return
+        try:
+            self.write(deltas)
+        except Exception:
+            logger.exception('Не удалось сбросить %d дельт', len(deltas))
+            with self.lock:
+                for key, delta in deltas.items():
+                    self.deltas[key] += delta
+
+    def flush_if_due(self, **kwargs):
+        interval = getattr(settings, self.interval_setting)
+        if time.monotonic() - self.last_flush >= interval:
+            self.flush()
+
+
+def _flush_loop(stop):
+    while True:
+        accumulators = list(_accumulators)
+        interval = min(
+            (getattr(settings, accumulator.interval_setting)
+             for accumulator in accumulators),
+            default=settings.SHARDED_COUNTER_FLUSH_INTERVAL,
+        )
+        if stop.wait(interval):
+            return
+        for accumulator in accumulators:
+            accumulator.flush_if_due()
+        # Как после запроса: соединение потока, закрытое сервером или
+        # старше CONN_MAX_AGE, переоткрывается.
+        close_old_connections()
+
+
+def start_flusher():
+    """Запускает поток, сбрасывающий все накопители процесса по интервалу.
+
+    Без него дельты сбрасываются только по окончании запросов, и воркер
+    без трафика держит их до следующего запроса или выхода. Вызывается из
+    yatube/wsgi.py; в дочернем процессе после fork поток запускается
+    заново.
+    """
+    global _flusher, _stop_flusher
+    if _flusher is not None and _flusher.is_alive():
+        return
+    if _flusher is None:
+        os.register_at_fork(after_in_child=start_flusher)
+    _stop_flusher = threading.Event()
+    _flusher = threading.Thread(
+        target=_flush_loop, args=(_stop_flusher,),
+        name='counters-flush', daemon=True,
+    )
+    _flusher.start()
+
+
+def stop_flusher():
+    """Останавливает фоновый сброс и ждёт завершения потока."""
+    if _flusher is not None and _flusher.is_alive():
+        _stop_flusher.set()
+        _flusher.join()
+
+
+def clear_all():
+    """Отбрасывает несброшенные дельты всех накопителей процесса."""
+    for accumulator in list(_accumulators):
+        accumulator.clear()
+
+
+def name(kind, pk):
+    return f'{kind}:{pk}'
+
+
+def _cache_key(kind, pk):
+    return f'counter:{kind}:{pk}'
+
+
+def register(kind, materialize):
+    """materialize(totals) получает {id: значение} после каждого сброса."""
+    _materializers[kind] = materialize
+
+
+def add_to_shard(counter, delta):
+    """Прибавляет delta к случайной строке счётчика."""
+    shard = random.randrange(settings.SHARDED_COUNTER_SHARDS)
+    rows = CounterShard.objects.using(DEFAULT_DB_ALIAS).filter(
+        name=counter, shard=shard
+    )
+    if rows.update(value=F('value') + delta):
+        return
+    try:
+        with transaction.atomic(using=DEFAULT_DB_ALIAS):
+            CounterShard.objects.using(DEFAULT_DB_ALIAS).create(
+                name=counter, shard=shard, value=delta
+            )
+    except IntegrityError:
+        rows.update(value=F('value') + delta)
+
+
+def totals(names):
+    rows = CounterShard.objects.using(DEFAULT_DB_ALIAS).filter(
+        name__in=names
+    ).values('name').annotate(total=Sum('value'))
+    result = dict.fromkeys(names, 0)
+    result.update((row['name'], row['total']) for row in rows)
+    return result
+
+
+def _write(deltas):
+    with transaction.atomic(using=DEFAULT_DB_ALIAS):
+        for (kind, pk), delta in deltas.items():
+            add_to_shard(name(kind, pk), delta)
+        current = totals([name(kind, pk) for kind, pk in deltas])
+    cache.delete_many([_cache_key(kind, pk) for kind, pk in deltas])
+    by_kind = defaultdict(dict)
+    for kind, pk in deltas:
+        by_kind[kind][pk] = current[name(kind, pk)]
+    for kind, kind_totals in by_kind.items():
+        if kind in _materializers:
+            _materializers[kind](kind_totals)
+
+
+accumulator = Accumulator(_write)
+atexit.register(accumulator.flush)
+
+
+def increment(kind, pk, delta=1):
+    accumulator.add((kind, pk), delta)
+
+
+def value(kind, pk):
+    """Сумма строк счётчика (из кэша) плюс несброшенная дельта процесса."""
+    key = _cache_key(kind, pk)
+    total = cache.get(key)
+    if total is None:
+        total = totals([name(kind, pk)])[name(kind, pk)]
+        cache.set(key, total, settings.SHARDED_COUNTER_CACHE_TIMEOUT)
+    return total + accumulator.pending((kind, pk))
+
+
+def reset(kind, kind_totals):
+    """Заменяет строки счётчиков вида kind точными значениями."""
+    names = {name(kind, pk): total for pk, total in kind_totals.items()}
+    with transaction.atomic(using=DEFAULT_DB_ALIAS):
+        CounterShard.objects.using(DEFAULT_DB_ALIAS).filter(
+            name__in=names
+        ).delete()
+        CounterShard.objects.using(DEFAULT_DB_ALIAS).bulk_create(
+            CounterShard(name=counter, shard=0, value=total)
+            for counter, total in names.items() if total
+        )
+    cache.delete_many([_cache_key(kind, pk) for pk in kind_totals])
@@ -0,0 +1,21 @@
+"""Настройка соединений с базой данных."""
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+
+def configure_sqlite(sender, connection, **kwargs):
+    """Применяет SQLITE_PRAGMAS к каждому новому соединению SQLite.
+
+    WAL позволяет читать во время записи, busy_timeout заставляет
+    писателя ждать блокировку вместо ошибки `database is locked`.
+    В шардах нет пользователей и групп, на которые ссылаются посты,
+    поэтому проверка внешних ключей там выключена.
+    """
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for pragma, value in settings.SQLITE_PRAGMAS.items():
+            cursor.execute(f'PRAGMA {pragma} = {value}')
+        if (connection.alias != DEFAULT_DB_ALIAS
+                and connection.alias in settings.SHARD_DATABASES):
+            cursor.execute('PRAGMA foreign_keys = OFF')
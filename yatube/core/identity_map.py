@@ -0,0 +1,122 @@
+"""Карта идентичности для моделей из IDENTITY_MAP_MODELS в пределах запроса.
+
+Пока идёт запрос, каждый загруженный экземпляр такой модели запоминается
+по pk, а внешние ключи на неё у остальных загруженных объектов
+откладываются. Первое обращение к незагруженному внешнему ключу (например,
+post.author в шаблоне) одним запросом IN загружает все отложенные id этой
+модели, последующие обращения берут готовые экземпляры из карты.
+"""
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+
+from django.apps import apps
+from django.conf import settings
+from django.db import router
+from django.db.models.fields.related_descriptors import (
+    ForwardManyToOneDescriptor
+)
+from django.db.models.signals import post_init
+
+_local = threading.local()
+_original_get_object = ForwardManyToOneDescriptor.get_object
+_tracked_models = set()
+_foreign_keys = {}
+
+
+class IdentityMap:
+    def __init__(self):
+        self.instances = defaultdict(dict)
+        self.pending = defaultdict(set)
+        self.queries = 0
+        self.saved = 0
+
+    def add(self, obj):
+        self.instances[type(obj)].setdefault(obj.pk, obj)
+
+    def want(self, model, pk):
+        if pk not in self.instances[model]:
+            self.pending[model].add(pk)
+
+    def get(self, model, pk, using):
+        known = self.instances[model]
+        if pk not in known:
+            ids = (self.pending.pop(model, set()) | {pk}) - known.keys()
+            self.queries += 1
+            for obj in model._default_manager.db_manager(using).in_bulk(
+                    ids).values():
+                self.add(obj)
+            if pk not in known:
+                raise model.DoesNotExist(
+                    f'{model._meta.object_name} matching query does not '
+                    'exist.'
+                )
+        else:
+            self.saved += 1
+        return known[pk]
+
+
+def current():
+    return getattr(_local, 'identity_map', None)
+
+
+@contextmanager
+def scope():
+    identity_map = _local.identity_map = IdentityMap()
+    try:
+        yield identity_map
+    finally:
+        _local.identity_map = None
+
+
+def _tracked():
+    if not _tracked_models:
+        _tracked_models.update(
+            apps.get_model(label) for label in settings.IDENTITY_MAP_MODELS
+        )
+    return _tracked_models
+
+
+def _tracked_foreign_keys(model):
+    if model not in _foreign_keys:
+        tracked = _tracked()
+        _foreign_keys[model] = [
+            (field.attname, field.related_model)
+            for field in model._meta.concrete_fields
+            if field.many_to_one and field.related_model in tracked
+            and field.target_field.primary_key
+        ]
+    return _foreign_keys[model]
+
+
+def _track(sender, instance, **kwargs):
+    identity_map = current()
+    if identity_map is None:
+        return
+    # Экземпляр с отложенными полями (only/defer) не подменяет полный.
+    if (instance.pk is not None and sender in _tracked()
+            and not instance.get_deferred_fields()):
+        identity_map.add(instance)
+    for attname, model in _tracked_foreign_keys(sender):
+        value = getattr(instance, attname)
+        if value is not None:
+            identity_map.want(model, value)
+
+
+def _get_object(self, instance):
+    identity_map = current()
+    model = self.field.related_model
+    if identity_map is None or (
+            (self.field.attname, model)
+            not in _tracked_foreign_keys(type(instance))):
+        return _original_get_object(self, instance)
+    return identity_map.get(
+        model, getattr(instance, self.field.attname),
+        router.db_for_read(model, instance=instance),
+    )
+
+
+def install():
+    """Подключает карту к загрузке моделей; вызов из CoreConfig.ready()."""
+    post_init.connect(_track, weak=False)
+    ForwardManyToOneDescriptor.get_object = _get_object
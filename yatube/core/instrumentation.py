@@ -0,0 +1,105 @@
+"""Учёт времени запроса: SQL-запросы, рендеринг шаблонов и работа с кэшем.
+
+Замеры собираются в объекты Collector, привязанные к текущему потоку;
+вложенные collect() получают одни и те же замеры. Пока сбор не включён,
+обёртки почти ничего не стоят.
+"""
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+
+from django.db import connections
+from django.template import base as template_base
+
+_local = threading.local()
+_original_render = template_base.Template.render
+
+
+class Collector:
+    """Счётчики одного запроса (или одного прогона бенчмарка)."""
+
+    def __init__(self):
+        self.queries = 0
+        self.sql_time = 0.0
+        self.render_time = 0.0
+        self.cache_calls = 0
+        self.cache_time = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.sql_time += time.perf_counter() - start
+            self.queries += 1
+
+    def record_cache(self, duration):
+        self.cache_calls += 1
+        self.cache_time += duration
+
+    def as_dict(self):
+        return {
+            'queries': self.queries,
+            'sql_ms': self.sql_time * 1000,
+            'render_ms': self.render_time * 1000,
+            'cache_calls': self.cache_calls,
+            'cache_ms': self.cache_time * 1000,
+        }
+
+
+def active():
+    """Список активных сборщиков текущего потока."""
+    try:
+        return _local.collectors
+    except AttributeError:
+        _local.collectors = []
+        _local.render_depth = 0
+        return _local.collectors
+
+
+def current():
+    """Самый внутренний активный сборщик или None."""
+    collectors = active()
+    return collectors[-1] if collectors else None
+
+
+def record_cache(duration):
+    for collector in active():
+        collector.record_cache(duration)
+
+
+@contextmanager
+def collect():
+    """Включает сбор метрик для блока кода и возвращает Collector."""
+    collector = Collector()
+    collectors = active()
+    collectors.append(collector)
+    try:
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(collector))
+            yield collector
+    finally:
+        collectors.remove(collector)
+
+
+def _timed_render(self, context):
+    collectors = active()
+    if not collectors:
+        return _original_render(self, context)
+    # Вложенные шаблоны (extends/include) учитываются внешним вызовом.
+    _local.render_depth += 1
+    start = time.perf_counter()
+    try:
+        return _original_render(self, context)
+    finally:
+        _local.render_depth -= 1
+        if not _local.render_depth:
+            duration = time.perf_counter() - start
+            for collector in collectors:
+                collector.render_time += duration
+
+
+def install():
+    """Подменяет Template.render; вызывается из CoreConfig.ready()."""
+    template_base.Template.render = _timed_render
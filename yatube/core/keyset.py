@@ -0,0 +1,56 @@
+"""Постраничный вывод по ключу (keyset) вместо OFFSET.
+
+Страница — это строки строго «раньше» курсора в порядке убывания
+(дата, id), поэтому запрос идёт по индексу с этими полями и не
+замедляется на дальних страницах, а новые записи не сдвигают страницы.
+Курсор — строка «<микросекунды с 1970 года>_<id>».
+"""
+from datetime import datetime, timedelta, timezone
+
+from django.db.models import Q
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+MICROSECOND = timedelta(microseconds=1)
+# Наибольшее целое, которое принимают базы (BIGINT).
+MAX_PK = 2 ** 63 - 1
+
+
+def encode(moment, pk):
+    return f'{(moment - EPOCH) // MICROSECOND}_{pk}'
+
+
+def decode(cursor):
+    """(момент, id) из курсора; ValueError для неверной строки.
+
+    Отрицательные и не помещающиеся в дату или BIGINT значения тоже
+    считаются неверными.
+    """
+    microseconds, pk = map(int, cursor.split('_'))
+    try:
+        moment = EPOCH + microseconds * MICROSECOND
+    except OverflowError:
+        moment = None
+    if moment is None or microseconds < 0 or not 0 < pk <= MAX_PK:
+        raise ValueError(f'Курсор вне допустимого диапазона: {cursor}')
+    return moment, pk
+
+
+def page(queryset, cursor, size, date_field='pub_date', pk_field='pk'):
+    """Строки после cursor (None — с начала) и курсор следующей страницы.
+
+    Курсор следующей страницы равен None, если строк больше нет.
+    """
+    if cursor:
+        moment, pk = decode(cursor)
+        queryset = queryset.filter(
+            Q(**{f'{date_field}__lt': moment})
+            | Q(**{date_field: moment, f'{pk_field}__lt': pk})
+        )
+    rows = list(
+        queryset.order_by(f'-{date_field}', f'-{pk_field}')[:size + 1]
+    )
+    if len(rows) <= size:
+        return rows, None
+    rows = rows[:size]
+    last = rows[-1]
+    return rows, encode(getattr(last, date_field), getattr(last, pk_field))
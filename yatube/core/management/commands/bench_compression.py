@@ -0,0 +1,103 @@
+import time
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.http import HttpResponse
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from core import benchmark
+from core.compression import CompressionMiddleware
+
+# (название, Accept-Encoding, склейка фрагментов)
+MODES = (
+    ('без сжатия', '', True),
+    ('gzip', 'gzip', False),
+    ('gzip+фрагм.', 'gzip', True),
+    ('brotli', 'br', True),
+)
+
+
+def _measure(page, accept, fragments, iterations):
+    """Процессорное время middleware на запрос (мкс) и размер ответа."""
+    request = page.wsgi_request
+    request.META['HTTP_ACCEPT_ENCODING'] = accept
+    middleware = CompressionMiddleware(lambda request: HttpResponse(
+        page.content, content_type=page['Content-Type']
+    ))
+    with override_settings(COMPRESSION_FRAGMENTS=fragments):
+        start = time.process_time()
+        for _ in range(iterations):
+            response = middleware(request)
+        elapsed = time.process_time() - start
+    return elapsed / iterations * 1e6, len(response.content)
+
+
+class Command(BaseCommand):
+    help = (
+        'Замеряет экономию байт и процессорное время сжатия ответа на '
+        'запрос: без сжатия, gzip, gzip из заранее сжатых фрагментов '
+        'и brotli.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=200)
+        parser.add_argument('--authors', type=int, default=20)
+        parser.add_argument('--posts-per-author', type=int, default=30)
+
+    def handle(self, *args, **options):
+        if options['iterations'] < 1:
+            raise CommandError('--iterations должно быть положительным')
+        old_name = connection.creation.create_test_db(
+            verbosity=0, autoclobber=True
+        )
+        try:
+            cache.clear()
+            data = benchmark.seed(
+                authors=options['authors'],
+                posts_per_author=options['posts_per_author'],
+            )
+            self.run(data, options['iterations'])
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+    def run(self, data, iterations):
+        reader = Client()
+        reader.login(
+            username=data['reader'].username,
+            password=benchmark.BENCHMARK_PASSWORD
+        )
+        urls = (
+            ('index', reverse('posts:index')),
+            ('group_list', reverse(
+                'posts:group_list', kwargs={'slug': data['groups'][0].slug}
+            )),
+            ('post_detail', reverse(
+                'posts:post_detail', kwargs={'post_id': data['post'].pk}
+            )),
+            ('follow_index', reverse('posts:follow_index')),
+        )
+        self.stdout.write(
+            f'{"страница":<14}{"режим":<13}{"байт":>9}{"экономия":>10}'
+            f'{"CPU, мкс":>10}{"+CPU, мкс":>11}'
+        )
+        for name, url in urls:
+            # Второй запрос берёт фрагменты из кэша, как в работе.
+            reader.get(url)
+            page = reader.get(url)
+            if page.status_code != 200:
+                raise CommandError(
+                    f'{url} вернул статус {page.status_code}'
+                )
+            plain_size = plain_cpu = None
+            for mode, accept, fragments in MODES:
+                cpu, size = _measure(page, accept, fragments, iterations)
+                if plain_size is None:
+                    plain_size, plain_cpu = size, cpu
+                self.stdout.write(
+                    f'{name:<14}{mode:<13}{size:>9}'
+                    f'{1 - size / plain_size:>10.1%}'
+                    f'{cpu:>10.0f}{cpu - plain_cpu:>+11.0f}'
+                )
@@ -0,0 +1,157 @@
+import os
+import random
+import shutil
+import tempfile
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connections, transaction
+
+from core.counters import Accumulator
+
+ALIAS = 'bench_counters'
+
+
+def _add(shard, delta=1):
+    with connections[ALIAS].cursor() as cursor:
+        cursor.execute(
+            'UPDATE counter SET value = value + %s WHERE shard = %s',
+            [delta, shard]
+        )
+
+
+def _single_row(shards):
+    with transaction.atomic(using=ALIAS):
+        _add(0)
+
+
+def _sharded(shards):
+    with transaction.atomic(using=ALIAS):
+        _add(random.randrange(shards))
+
+
+def _write_deltas(deltas):
+    with transaction.atomic(using=ALIAS):
+        for shard, delta in deltas.items():
+            _add(shard, delta)
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает увеличение «горячего» счётчика: одна строка, '
+        'K строк со случайным выбором и накопление дельт в памяти.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--writers', default='1,2,4,8,16,32',
+            help='Числа одновременных писателей через запятую.'
+        )
+        parser.add_argument(
+            '--increments', type=int, default=200,
+            help='Увеличений на одного писателя.'
+        )
+        parser.add_argument('--shards', type=int, default=8)
+        parser.add_argument(
+            '--flush-interval', type=float, default=0.05,
+            help='Период сброса накопителя, секунды.'
+        )
+
+    def handle(self, *args, **options):
+        directory = tempfile.mkdtemp()
+        connections.databases[ALIAS] = {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.path.join(directory, 'bench.sqlite3'),
+        }
+        shards = options['shards']
+        try:
+            with connections[ALIAS].cursor() as cursor:
+                cursor.execute(
+                    'CREATE TABLE counter '
+                    '(shard INTEGER PRIMARY KEY, value INTEGER NOT NULL)'
+                )
+                cursor.executemany(
+                    'INSERT INTO counter (shard, value) VALUES (%s, 0)',
+                    [(shard,) for shard in range(shards)]
+                )
+            self.stdout.write(
+                f'{"писателей":>10}{"1 строка, ув/с":>17}{"ошибок":>8}'
+                f'{f"{shards} строк, ув/с":>18}{"ошибок":>8}'
+                f'{"накопитель, ув/с":>19}'
+            )
+            for writers in map(int, options['writers'].split(',')):
+                single, single_errors = self.run(
+                    writers, options['increments'],
+                    lambda: _single_row(shards)
+                )
+                sharded, sharded_errors = self.run(
+                    writers, options['increments'], lambda: _sharded(shards)
+                )
+                accumulated = self.run_accumulated(
+                    writers, options['increments'], shards,
+                    options['flush_interval']
+                )
+                self.stdout.write(
+                    f'{writers:>10}{single:>17.0f}{single_errors:>8}'
+                    f'{sharded:>18.0f}{sharded_errors:>8}'
+                    f'{accumulated:>19.0f}'
+                )
+            with connections[ALIAS].cursor() as cursor:
+                cursor.execute('SELECT SUM(value) FROM counter')
+                total, = cursor.fetchone()
+            self.stdout.write(f'Итоговое значение счётчика: {total}')
+        finally:
+            connections[ALIAS].close()
+            del connections.databases[ALIAS]
+            shutil.rmtree(directory, ignore_errors=True)
+
+    def run(self, writers, increments, increment):
+        errors = []
+
+        def worker(number):
+            try:
+                for _ in range(increments):
+                    try:
+                        increment()
+                    except OperationalError:
+                        errors.append(number)
+            finally:
+                connections[ALIAS].close()
+
+        threads = [
+            threading.Thread(target=worker, args=(number,))
+            for number in range(writers)
+        ]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+        return (writers * increments - len(errors)) / elapsed, len(errors)
+
+    def run_accumulated(self, writers, increments, shards, interval):
+        """Писатели копят дельты, отдельный поток сбрасывает их."""
+        accumulator = Accumulator(_write_deltas)
+        done = threading.Event()
+
+        def flusher():
+            try:
+                while not done.wait(interval):
+                    accumulator.flush()
+                accumulator.flush()
+            finally:
+                connections[ALIAS].close()
+
+        thread = threading.Thread(target=flusher)
+        start = time.perf_counter()
+        thread.start()
+        self.run(
+            writers, increments,
+            lambda: accumulator.add(random.randrange(shards))
+        )
+        done.set()
+        thread.join()
+        elapsed = time.perf_counter() - start
+        return writers * increments / elapsed
@@ -0,0 +1,96 @@
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connections, transaction
+
+from core.write_queue import WriteQueue
+
+ALIAS = 'bench_writes'
+
+
+def _insert(value):
+    with connections[ALIAS].cursor() as cursor:
+        cursor.execute('INSERT INTO bench (value) VALUES (%s)', [value])
+
+
+def _direct(value):
+    with transaction.atomic(using=ALIAS):
+        _insert(value)
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает пропускную способность записи в SQLite: отдельные '
+        'транзакции против очереди с групповой фиксацией.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--writers', default='1,2,4,8,16,32',
+            help='Числа одновременных писателей через запятую.'
+        )
+        parser.add_argument(
+            '--writes', type=int, default=200,
+            help='Записей на одного писателя.'
+        )
+
+    def handle(self, *args, **options):
+        directory = tempfile.mkdtemp()
+        connections.databases[ALIAS] = {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.path.join(directory, 'bench.sqlite3'),
+        }
+        try:
+            with connections[ALIAS].cursor() as cursor:
+                cursor.execute(
+                    'CREATE TABLE bench '
+                    '(id INTEGER PRIMARY KEY, value TEXT NOT NULL)'
+                )
+            self.stdout.write(
+                f'{"писателей":>10}{"отдельно, зап/с":>18}{"ошибок":>8}'
+                f'{"очередь, зап/с":>17}{"пачек":>8}'
+            )
+            for writers in map(int, options['writers'].split(',')):
+                direct, errors = self.run(writers, options['writes'], _direct)
+                write_queue = WriteQueue(using=ALIAS)
+                queued, _ = self.run(
+                    writers, options['writes'],
+                    lambda value: write_queue.submit(_insert, value).result()
+                )
+                self.stdout.write(
+                    f'{writers:>10}{direct:>18.0f}{errors:>8}'
+                    f'{queued:>17.0f}{write_queue.batches:>8}'
+                )
+        finally:
+            connections[ALIAS].close()
+            del connections.databases[ALIAS]
+            shutil.rmtree(directory, ignore_errors=True)
+
+    def run(self, writers, writes, write):
+        errors = []
+
+        def worker(number):
+            try:
+                for index in range(writes):
+                    try:
+                        write(f'{number}-{index}')
+                    except OperationalError:
+                        errors.append(number)
+            finally:
+                connections[ALIAS].close()
+
+        threads = [
+            threading.Thread(target=worker, args=(number,))
+            for number in range(writers)
+        ]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+        return (writers * writes - len(errors)) / elapsed, len(errors)
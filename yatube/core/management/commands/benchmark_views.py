@@ -0,0 +1,96 @@
+import json
+from datetime import datetime, timezone
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from core import benchmark
+
+
+class Command(BaseCommand):
+    help = (
+        'Замеряет задержку и число SQL-запросов основных страниц '
+        'на временной базе с тестовыми данными.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=50)
+        parser.add_argument('--warmup', type=int, default=5)
+        parser.add_argument('--authors', type=int, default=20)
+        parser.add_argument('--posts-per-author', type=int, default=30)
+        parser.add_argument(
+            '--output', default='benchmark.json',
+            help='Куда сохранить результаты в формате JSON.'
+        )
+        parser.add_argument(
+            '--baseline',
+            help='JSON с базовыми результатами для сравнения.'
+        )
+        parser.add_argument(
+            '--save-baseline', action='store_true',
+            help='Записать результаты в файл --baseline.'
+        )
+        parser.add_argument(
+            '--latency-threshold', type=float, default=0.2,
+            help='Допустимый рост p95, доля (0.2 = 20%%).'
+        )
+        parser.add_argument(
+            '--query-threshold', type=int, default=0,
+            help='Допустимое число лишних SQL-запросов на страницу.'
+        )
+
+    def handle(self, *args, **options):
+        old_name = connection.creation.create_test_db(
+            verbosity=0, autoclobber=True
+        )
+        try:
+            cache.clear()
+            data = benchmark.seed(
+                authors=options['authors'],
+                posts_per_author=options['posts_per_author'],
+            )
+            results = benchmark.run(
+                data, options['iterations'], options['warmup']
+            )
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+        self.report(results)
+        document = {
+            'created': datetime.now(timezone.utc).isoformat(),
+            'iterations': options['iterations'],
+            'views': results,
+        }
+        with open(options['output'], 'w') as file:
+            json.dump(document, file, indent=2, ensure_ascii=False)
+
+        baseline_path = options['baseline']
+        if not baseline_path:
+            return
+        if options['save_baseline']:
+            with open(baseline_path, 'w') as file:
+                json.dump(document, file, indent=2, ensure_ascii=False)
+            self.stdout.write(f'Базовые результаты записаны в {baseline_path}')
+            return
+        with open(baseline_path) as file:
+            baseline = json.load(file)['views']
+        regressions = benchmark.compare(
+            results, baseline,
+            options['latency_threshold'], options['query_threshold'],
+        )
+        if regressions:
+            raise CommandError('Регрессии:\n' + '\n'.join(regressions))
+        self.stdout.write(self.style.SUCCESS('Регрессий нет'))
+
+    def report(self, results):
+        self.stdout.write(
+            f'{"страница":<14}{"p50":>9}{"p95":>9}{"p99":>9}'
+            f'{"SQL":>6}{"SQL мс":>9}{"шаблон мс":>11}'
+        )
+        for name, row in results.items():
+            self.stdout.write(
+                f'{name:<14}{row["p50_ms"]:>9.2f}{row["p95_ms"]:>9.2f}'
+                f'{row["p99_ms"]:>9.2f}{row["queries"]:>6}'
+                f'{row["sql_ms"]:>9.2f}{row["render_ms"]:>11.2f}'
+            )
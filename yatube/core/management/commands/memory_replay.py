@@ -0,0 +1,56 @@
+import gc
+import tracemalloc
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+
+from core import memory
+from core.models import User
+
+
+class Command(BaseCommand):
+    help = (
+        'Выполняет N запросов к URL и показывает прирост памяти '
+        'на запрос и места, где память растёт.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('url')
+        parser.add_argument('--requests', type=int, default=100)
+        parser.add_argument('--warmup', type=int, default=5)
+        parser.add_argument('--user', help='Выполнять запросы от имени.')
+        parser.add_argument('--top', type=int, default=10)
+
+    def handle(self, *args, **options):
+        client = Client()
+        if options['user']:
+            try:
+                client.force_login(User.objects.get(username=options['user']))
+            except User.DoesNotExist:
+                raise CommandError(f'Нет пользователя {options["user"]}')
+        url = options['url']
+        requests = options['requests']
+        if requests < 1:
+            raise CommandError('--requests должен быть положительным')
+        memory.start()
+        try:
+            for _ in range(options['warmup']):
+                client.get(url)
+            gc.collect()
+            first = memory.take_snapshot('до')
+            start_size = tracemalloc.get_traced_memory()[0]
+            for _ in range(requests):
+                response = client.get(url)
+            gc.collect()
+            last = memory.take_snapshot('после')
+            growth = tracemalloc.get_traced_memory()[0] - start_size
+        finally:
+            memory.stop()
+        self.stdout.write(
+            f'{url}: {requests} запросов, статус {response.status_code}\n'
+            f'Прирост: {growth / 1024:+.1f} KiB всего, '
+            f'{growth / requests:+.1f} байт на запрос'
+        )
+        self.stdout.write('Места наибольшего прироста:')
+        for line in memory.diff(first, last, options['top']):
+            self.stdout.write(line)
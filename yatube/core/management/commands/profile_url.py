@@ -0,0 +1,56 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+
+from core.models import User
+from core.profiling import Sampler
+
+
+class Command(BaseCommand):
+    help = (
+        'Запрашивает URL в течение заданного времени под профилировщиком '
+        'и сохраняет свёрнутые стеки для flamegraph.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('url')
+        parser.add_argument(
+            '--seconds', type=float, default=10,
+            help='Длительность окна профилирования.'
+        )
+        parser.add_argument(
+            '--requests', type=int, default=None,
+            help='Остановиться после указанного числа запросов.'
+        )
+        parser.add_argument('--user', help='Выполнять запросы от имени.')
+        parser.add_argument('--interval', type=float, default=None)
+
+    def handle(self, *args, **options):
+        if options['seconds'] <= 0:
+            raise CommandError('--seconds должен быть положительным')
+        if options['requests'] is not None and options['requests'] <= 0:
+            raise CommandError('--requests должен быть положительным')
+        client = Client()
+        if options['user']:
+            try:
+                client.force_login(User.objects.get(username=options['user']))
+            except User.DoesNotExist:
+                raise CommandError(f'Нет пользователя {options["user"]}')
+        limit = options['requests']
+        done = 0
+        response = None
+        deadline = time.monotonic() + options['seconds']
+        with Sampler(interval=options['interval']) as sampler:
+            while time.monotonic() < deadline and (
+                    limit is None or done < limit):
+                response = client.get(options['url'])
+                done += 1
+        if response is not None and response.status_code >= 400:
+            self.stderr.write(f'Последний ответ: {response.status_code}')
+        path = sampler.save(options['url'].strip('/') or 'index')
+        self.stdout.write(
+            f'Запросов: {done}, сэмплов: {sampler.samples}\n'
+            f'{sampler.summary()}\n'
+            f'Стеки записаны в {path}'
+        )
@@ -0,0 +1,68 @@
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.slow_queries import fingerprint, read_entries
+
+SORT_KEYS = {
+    'total': lambda group: group['total_ms'],
+    'count': lambda group: group['count'],
+    'max': lambda group: group['max_ms'],
+}
+
+
+class Command(BaseCommand):
+    help = 'Сводка журнала медленных запросов, сгруппированная по шаблону SQL.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--file', default=None)
+        parser.add_argument('--top', type=int, default=10)
+        parser.add_argument(
+            '--sort', choices=sorted(SORT_KEYS), default='total'
+        )
+        parser.add_argument(
+            '--plans', action='store_true',
+            help='Показать план выполнения для каждого шаблона.'
+        )
+
+    def handle(self, *args, **options):
+        groups = defaultdict(lambda: {
+            'count': 0, 'total_ms': 0.0, 'max_ms': 0.0,
+            'views': Counter(), 'call_sites': Counter(), 'plan': None,
+        })
+        for entry in read_entries(options['file'] or settings.SLOW_QUERY_LOG):
+            group = groups[fingerprint(entry['sql'])]
+            group['count'] += 1
+            group['total_ms'] += entry['duration_ms']
+            group['max_ms'] = max(group['max_ms'], entry['duration_ms'])
+            group['views'][entry.get('view')] += 1
+            group['call_sites'][entry.get('call_site')] += 1
+            group['plan'] = entry.get('plan') or group['plan']
+
+        if not groups:
+            self.stdout.write('Медленных запросов нет.')
+            return
+        ordered = sorted(
+            groups.items(), key=lambda item: SORT_KEYS[options['sort']](
+                item[1]), reverse=True
+        )
+        for sql, group in ordered[:options['top']]:
+            self.stdout.write(self.style.SQL_KEYWORD(sql))
+            self.stdout.write(
+                f'  запросов: {group["count"]}, '
+                f'всего: {group["total_ms"]:.1f} мс, '
+                f'среднее: {group["total_ms"] / group["count"]:.1f} мс, '
+                f'максимум: {group["max_ms"]:.1f} мс'
+            )
+            views = ', '.join(
+                f'{view} ({count})'
+                for view, count in group['views'].most_common(3)
+            )
+            self.stdout.write(f'  views: {views}')
+            site, _ = group['call_sites'].most_common(1)[0]
+            self.stdout.write(f'  место вызова: {site}')
+            if options['plans'] and group['plan']:
+                for row in group['plan']:
+                    self.stdout.write(f'    {row}')
+            self.stdout.write('')
@@ -0,0 +1,25 @@
+import asyncio
+
+from django.core.management.base import BaseCommand
+
+from core import sse
+
+
+class Command(BaseCommand):
+    help = 'Запускает sidecar Server-Sent Events для уведомлений.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=8001)
+
+    def handle(self, *args, **options):
+        def ready(server, hub):
+            for sock in server.sockets:
+                self.stdout.write(f'Слушаю {sock.getsockname()}')
+
+        try:
+            asyncio.run(
+                sse.serve(options['host'], options['port'], ready=ready)
+            )
+        except KeyboardInterrupt:
+            pass
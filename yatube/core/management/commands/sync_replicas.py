@@ -0,0 +1,39 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS
+
+from core.routers import sync_sqlite
+
+
+class Command(BaseCommand):
+    help = 'Копирует основную базу SQLite во все реплики (backup API).'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval', type=float, default=None,
+            help='Повторять копирование каждые N секунд.'
+        )
+
+    def handle(self, *args, **options):
+        databases = settings.DATABASES
+        if not settings.REPLICA_DATABASES:
+            raise CommandError('REPLICA_DATABASES пуст')
+        aliases = [DEFAULT_DB_ALIAS, *settings.REPLICA_DATABASES]
+        for alias in aliases:
+            if databases[alias]['ENGINE'] != 'django.db.backends.sqlite3':
+                raise CommandError(f'{alias}: поддерживается только SQLite')
+        while True:
+            for alias in settings.REPLICA_DATABASES:
+                start = time.perf_counter()
+                sync_sqlite(
+                    databases[DEFAULT_DB_ALIAS]['NAME'],
+                    databases[alias]['NAME'],
+                )
+                self.stdout.write(
+                    f'{alias}: {(time.perf_counter() - start) * 1000:.0f} мс'
+                )
+            if options['interval'] is None:
+                return
+            time.sleep(options['interval'])
@@ -0,0 +1,106 @@
+"""Поиск утечек памяти на tracemalloc.
+
+Снимки памяти хранятся в процессе, их можно сравнивать между собой.
+Пока трассировка включена, MemoryMiddleware считает прирост памяти
+по каждому view.
+"""
+import linecache
+import os
+import threading
+import tracemalloc
+from collections import defaultdict
+
+from django.conf import settings
+
+_lock = threading.Lock()
+snapshots = []
+view_growth = defaultdict(lambda: {'requests': 0, 'bytes': 0})
+
+_FILTERS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, linecache.__file__),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap_external>'),
+)
+
+
+def is_tracing():
+    return tracemalloc.is_tracing()
+
+
+def start():
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(settings.MEMORY_TRACE_FRAMES)
+
+
+def stop():
+    tracemalloc.stop()
+    with _lock:
+        snapshots.clear()
+        view_growth.clear()
+
+
+def take_snapshot(label=''):
+    """Снимок памяти процесса; хранятся последние MEMORY_SNAPSHOT_LIMIT."""
+    start()
+    snapshot = tracemalloc.take_snapshot().filter_traces(_FILTERS)
+    with _lock:
+        snapshots.append((label, snapshot))
+        del snapshots[:-settings.MEMORY_SNAPSHOT_LIMIT]
+    return snapshot
+
+
+def top(snapshot, limit=10, key_type='lineno'):
+    """Места с наибольшим объёмом выделенной памяти."""
+    return [
+        f'{stat.size / 1024:10.1f} KiB {stat.count:8d} '
+        f'{_location(stat.traceback)}'
+        for stat in snapshot.statistics(key_type)[:limit]
+    ]
+
+
+def diff(older, newer, limit=10, key_type='lineno'):
+    """Места с наибольшим приростом памяти между двумя снимками."""
+    return [
+        f'{stat.size_diff / 1024:+10.1f} KiB {stat.count_diff:+8d} '
+        f'{_location(stat.traceback)}'
+        for stat in newer.compare_to(older, key_type)[:limit]
+    ]
+
+
+def _location(traceback):
+    frame = traceback[-1]
+    return f'{_short(frame.filename)}:{frame.lineno}'
+
+
+def _short(filename):
+    marker = 'site-packages' + os.sep
+    if marker in filename:
+        return filename.split(marker, 1)[1]
+    if filename.startswith(settings.BASE_DIR):
+        return os.path.relpath(filename, settings.BASE_DIR)
+    return filename
+
+
+def attribute(snapshot):
+    """Память по view-функциям и тегам шаблонов, вызвавшим выделение.
+
+    Для каждого выделения берётся самый глубокий кадр из views.py или
+    templatetags/ в его стеке.
+    """
+    totals = defaultdict(int)
+    for trace in snapshot.traces:
+        for frame in reversed(trace.traceback):
+            filename = frame.filename
+            if (filename.endswith('views.py')
+                    or os.sep + 'templatetags' + os.sep in filename):
+                totals[f'{_short(filename)}:{frame.lineno}'] += trace.size
+                break
+    return sorted(totals.items(), key=lambda item: item[1], reverse=True)
+
+
+def record_view(view, before, after):
+    with _lock:
+        growth = view_growth[view]
+        growth['requests'] += 1
+        growth['bytes'] += after - before
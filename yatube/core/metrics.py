@@ -0,0 +1,309 @@
+"""Метрики в формате Prometheus, общие для всех процессов-воркеров.
+
+Каждый процесс копит значения в памяти и периодически сбрасывает их в
+файл METRICS_DIR/<pid>.json. Эндпоинт /metrics складывает файлы всех
+процессов. Без METRICS_DIR отдаются только метрики текущего процесса.
+
+При запуске процесса prune() переносит счётчики и гистограммы завершённых
+процессов в METRICS_DIR/archive.json и удаляет их файлы, так что каталог
+не растёт, а процесс с повторно выданным pid начинает с нуля.
+"""
+import atexit
+import bisect
+import fcntl
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+
+DEFAULT_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+
+METRICS = {
+    'yatube_http_requests_total': (
+        'counter', 'HTTP-запросы по имени URL, методу и статусу.'),
+    'yatube_http_request_duration_seconds': (
+        'histogram', 'Время обработки запроса по имени URL.'),
+    'yatube_db_sampled_requests_total': (
+        'counter', 'Запросы с учётом SQL (выборка) по имени URL.'),
+    'yatube_db_queries_total': (
+        'counter', 'SQL-запросы в запросах выборки по имени URL.'),
+    'yatube_db_query_duration_seconds_total': (
+        'counter', 'Время SQL-запросов в запросах выборки по имени URL.'),
+    'yatube_cache_requests_total': (
+        'counter', 'Чтения кэша по имени фрагмента и результату.'),
+    'yatube_cache_hit_ratio': (
+        'gauge', 'Доля попаданий в кэш по имени фрагмента.'),
+    'yatube_identity_map_queries_total': (
+        'counter', 'Пакетные запросы карты идентичности по имени URL.'),
+    'yatube_identity_map_saved_queries_total': (
+        'counter', 'Обращения к связям без отдельного запроса по имени URL.'),
+    'yatube_thumbnail_generation_seconds': (
+        'histogram', 'Время создания миниатюр sorl-thumbnail.'),
+}
+
+
+class Registry:
+    """Счётчики, гистограммы и вычисляемые gauge одного процесса."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters = defaultdict(float)
+        self.histograms = {}
+        self.gauges = {}
+        self.last_flush = 0.0
+
+    def inc(self, name, labels=(), value=1):
+        with self.lock:
+            self.counters[name, tuple(labels)] += value
+
+    def observe(self, name, value, labels=(), buckets=DEFAULT_BUCKETS):
+        key = (name, tuple(labels))
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = {
+                    'buckets': list(buckets),
+                    'counts': [0] * len(buckets),
+                    'sum': 0.0,
+                    'count': 0,
+                }
+            index = bisect.bisect_left(histogram['buckets'], value)
+            if index < len(buckets):
+                histogram['counts'][index] += 1
+            histogram['sum'] += value
+            histogram['count'] += 1
+
+    def register_gauge(self, name, help_text, func):
+        """Регистрирует gauge, значение которого считается при выгрузке."""
+        METRICS.setdefault(name, ('gauge', help_text))
+        self.gauges[name] = func
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                'pid': os.getpid(),
+                'counters': [
+                    [name, list(labels), value]
+                    for (name, labels), value in self.counters.items()
+                ],
+                'histograms': [
+                    [name, list(labels),
+                     dict(histogram, counts=list(histogram['counts']))]
+                    for (name, labels), histogram in self.histograms.items()
+                ],
+                'gauges': [
+                    [name, [], float(func())]
+                    for name, func in self.gauges.items()
+                ],
+            }
+
+    def flush(self, force=False):
+        """Сбрасывает значения в файл процесса не чаще интервала."""
+        directory = settings.METRICS_DIR
+        now = time.monotonic()
+        if not directory or (
+                not force
+                and now - self.last_flush < settings.METRICS_FLUSH_INTERVAL):
+            return
+        self.last_flush = now
+        os.makedirs(directory, exist_ok=True)
+        _write(
+            os.path.join(directory, f'{os.getpid()}.json'), self.snapshot()
+        )
+
+
+registry = Registry()
+atexit.register(registry.flush, force=True)
+
+ARCHIVE = 'archive.json'
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _read(directory):
+    """Пары (имя файла, снимок) из каталога метрик."""
+    for name in os.listdir(directory):
+        if not name.endswith('.json'):
+            continue
+        try:
+            with open(os.path.join(directory, name)) as file:
+                yield name, json.load(file)
+        except (OSError, ValueError):
+            continue
+
+
+def _write(path, snapshot):
+    with open(path + '.tmp', 'w') as file:
+        json.dump(snapshot, file)
+    os.replace(path + '.tmp', path)
+
+
+def prune():
+    """Переносит файлы завершённых процессов в архив; зовётся при старте.
+
+    Файл с pid текущего процесса остался от предыдущего процесса с тем же
+    pid и тоже уходит в архив.
+    """
+    directory = settings.METRICS_DIR
+    if not directory or not os.path.isdir(directory):
+        return
+    with open(os.path.join(directory, '.lock'), 'w') as lock:
+        # Два процесса, стартующие одновременно, не перенесут файл дважды.
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        archive = {'pid': None, 'counters': [], 'histograms': [],
+                   'gauges': []}
+        stale = []
+        for name, snapshot in _read(directory):
+            if name == ARCHIVE:
+                archive = snapshot
+            elif snapshot['pid'] == os.getpid() or (
+                    not _pid_alive(snapshot['pid'])):
+                stale.append((name, snapshot))
+        if not stale:
+            return
+        counters, histograms, _ = merge(
+            [archive] + [snapshot for _, snapshot in stale]
+        )
+        _write(os.path.join(directory, ARCHIVE), {
+            'pid': None,
+            'counters': [
+                [name, [list(pair) for pair in labels], value]
+                for (name, labels), value in counters.items()
+            ],
+            'histograms': [
+                [name, [list(pair) for pair in labels], histogram]
+                for (name, labels), histogram in histograms.items()
+            ],
+            'gauges': [],
+        })
+        for name, _ in stale:
+            os.remove(os.path.join(directory, name))
+
+
+def collect():
+    """Снимки всех процессов: из METRICS_DIR или только текущего."""
+    directory = settings.METRICS_DIR
+    if not directory:
+        return [registry.snapshot()]
+    registry.flush(force=True)
+    snapshots = []
+    for _, snapshot in _read(directory):
+        # Счётчики завершённых процессов остаются, gauge — нет.
+        pid = snapshot['pid']
+        if pid is not None and not _pid_alive(pid):
+            snapshot['gauges'] = []
+        snapshots.append(snapshot)
+    return snapshots
+
+
+def merge(snapshots):
+    counters = defaultdict(float)
+    gauges = defaultdict(float)
+    histograms = {}
+    for snapshot in snapshots:
+        for name, labels, value in snapshot['counters']:
+            counters[name, tuple(map(tuple, labels))] += value
+        for name, labels, value in snapshot['gauges']:
+            gauges[name, tuple(map(tuple, labels))] += value
+        for name, labels, histogram in snapshot['histograms']:
+            key = (name, tuple(map(tuple, labels)))
+            total = histograms.get(key)
+            if total is None:
+                histograms[key] = dict(
+                    histogram, counts=list(histogram['counts'])
+                )
+                continue
+            total['counts'] = [
+                a + b for a, b in zip(total['counts'], histogram['counts'])
+            ]
+            total['sum'] += histogram['sum']
+            total['count'] += histogram['count']
+    _add_hit_ratios(counters, gauges)
+    return counters, histograms, gauges
+
+
+def _add_hit_ratios(counters, gauges):
+    totals = defaultdict(lambda: [0.0, 0.0])
+    for (name, labels), value in counters.items():
+        if name != 'yatube_cache_requests_total':
+            continue
+        labels = dict(labels)
+        totals[labels['fragment']][labels['result'] == 'hit'] += value
+    for fragment, (misses, hits) in totals.items():
+        gauges['yatube_cache_hit_ratio', (('fragment', fragment),)] = (
+            hits / (hits + misses)
+        )
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    pairs = ','.join(
+        '{}="{}"'.format(key, str(value).replace('\\', r'\\')
+                         .replace('"', r'\"').replace('\n', r'\n'))
+        for key, value in labels
+    )
+    return '{' + pairs + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+def render(snapshots):
+    """Текстовый формат экспозиции Prometheus 0.0.4."""
+    counters, histograms, gauges = merge(snapshots)
+    by_name = defaultdict(list)
+    for (name, labels), value in sorted(
+            list(counters.items()) + list(gauges.items())):
+        by_name[name].append(
+            f'{name}{_format_labels(labels)} {_format_value(value)}'
+        )
+    for (name, labels), histogram in sorted(histograms.items()):
+        cumulative = 0
+        for bound, count in zip(histogram['buckets'], histogram['counts']):
+            cumulative += count
+            bucket_labels = labels + (('le', _format_value(bound)),)
+            by_name[name].append(
+                f'{name}_bucket{_format_labels(bucket_labels)} {cumulative}'
+            )
+        by_name[name].append(
+            f'{name}_bucket{_format_labels(labels + (("le", "+Inf"),))} '
+            f'{histogram["count"]}'
+        )
+        by_name[name].append(
+            f'{name}_sum{_format_labels(labels)} '
+            f'{_format_value(histogram["sum"])}'
+        )
+        by_name[name].append(
+            f'{name}_count{_format_labels(labels)} {histogram["count"]}'
+        )
+    lines = []
+    for name in sorted(by_name):
+        kind, help_text = METRICS.get(name, ('untyped', ''))
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {kind}')
+        lines.extend(by_name[name])
+    return '\n'.join(lines) + '\n'
+
+
+def fragment_name(key):
+    """Имя фрагмента для ключа кэша ({% cache %} или префикс ключа)."""
+    if key.startswith('template.cache.'):
+        return key.split('.')[2]
+    return key.split(':', 1)[0].split('.', 1)[0]
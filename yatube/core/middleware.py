@@ -0,0 +1,223 @@
+import json
+import logging
+import os
+import random
+import time
+import tracemalloc
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+from core import identity_map, instrumentation, memory, metrics, routers
+from core.profiling import Sampler
+from core.slow_queries import SlowQueryWrapper
+
+timing_logger = logging.getLogger('core.timing')
+
+
+def _view_name(request):
+    match = getattr(request, 'resolver_match', None)
+    return match.view_name if match else None
+
+
+def _sampled(request):
+    """Замерять ли запрос; решение одно на запрос для всех middleware."""
+    sampled = getattr(request, '_timing_sampled', None)
+    if sampled is None:
+        rate = getattr(settings, 'SERVER_TIMING_SAMPLE_RATE', 1.0)
+        sampled = rate >= 1 or (rate > 0 and random.random() < rate)
+        request._timing_sampled = sampled
+    return sampled
+
+
+class ServerTimingMiddleware:
+    """Добавляет заголовок Server-Timing и пишет строку лога на запрос.
+
+    Замеряется только доля запросов SERVER_TIMING_SAMPLE_RATE,
+    остальные проходят без обёрток.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not _sampled(request):
+            return self.get_response(request)
+        start = time.perf_counter()
+        with instrumentation.collect() as collector:
+            response = self.get_response(request)
+        total = (time.perf_counter() - start) * 1000
+        stats = collector.as_dict()
+        response['Server-Timing'] = ', '.join((
+            f'db;dur={stats["sql_ms"]:.2f};desc="{stats["queries"]} queries"',
+            f'tpl;dur={stats["render_ms"]:.2f}',
+            f'cache;dur={stats["cache_ms"]:.2f}',
+            f'total;dur={total:.2f}',
+        ))
+        timing_logger.info(json.dumps({
+            'method': request.method,
+            'path': request.path,
+            'view': _view_name(request),
+            'status': response.status_code,
+            'total_ms': round(total, 2),
+            **{key: round(value, 2) for key, value in stats.items()},
+        }))
+        return response
+
+
+class SlowQueryLogMiddleware:
+    """Пишет медленные SQL-запросы запроса в журнал SLOW_QUERY_LOG."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if settings.SLOW_QUERY_THRESHOLD_MS is None:
+            return self.get_response(request)
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(
+                    SlowQueryWrapper(connection, request)
+                ))
+            return self.get_response(request)
+
+
+class MetricsMiddleware:
+    """Считает запросы, их длительность и SQL по имени URL для /metrics.
+
+    SQL считается только в запросах из выборки SERVER_TIMING_SAMPLE_RATE
+    (тех же, что замеряет ServerTimingMiddleware); число таких запросов
+    идёт в yatube_db_sampled_requests_total.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        start = time.perf_counter()
+        if _sampled(request):
+            with instrumentation.collect() as collector:
+                response = self.get_response(request)
+        else:
+            collector = None
+            response = self.get_response(request)
+        view = _view_name(request) or 'unmatched'
+        registry = metrics.registry
+        registry.inc('yatube_http_requests_total', (
+            ('view', view),
+            ('method', request.method),
+            ('status', str(response.status_code)),
+        ))
+        registry.observe(
+            'yatube_http_request_duration_seconds',
+            time.perf_counter() - start, (('view', view),),
+        )
+        if collector is not None:
+            labels = (('view', view),)
+            registry.inc('yatube_db_sampled_requests_total', labels)
+            registry.inc(
+                'yatube_db_queries_total', labels, collector.queries
+            )
+            registry.inc(
+                'yatube_db_query_duration_seconds_total', labels,
+                collector.sql_time,
+            )
+        registry.flush()
+        return response
+
+
+class ProfilingMiddleware:
+    """Профилирует запрос сотрудника по заголовку X-Profile или ?__profile.
+
+    Свёрнутые стеки сохраняются в PROFILE_DIR, путь к файлу и доли
+    категорий возвращаются в заголовках X-Profile-File и X-Profile-Summary.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        requested = (
+            'HTTP_X_PROFILE' in request.META or '__profile' in request.GET
+        )
+        if not (requested and request.user.is_staff):
+            return self.get_response(request)
+        with Sampler() as sampler:
+            response = self.get_response(request)
+        path = sampler.save(_view_name(request) or 'unmatched')
+        response['X-Profile-File'] = os.path.basename(path)
+        response['X-Profile-Summary'] = (
+            f'samples={sampler.samples};{sampler.summary()}'
+        )
+        return response
+
+
+class MemoryMiddleware:
+    """Считает прирост памяти по view, пока включён tracemalloc."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not memory.is_tracing():
+            return self.get_response(request)
+        before = tracemalloc.get_traced_memory()[0]
+        response = self.get_response(request)
+        memory.record_view(
+            _view_name(request) or 'unmatched',
+            before, tracemalloc.get_traced_memory()[0],
+        )
+        return response
+
+
+class ReplicaRoutingMiddleware:
+    """Включает чтение из реплик для view из REPLICA_READ_VIEWS."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        try:
+            pinned_until = float(request.COOKIES.get(routers.PIN_COOKIE, 0))
+        except ValueError:
+            pinned_until = 0
+        routers.reset_state(pinned=pinned_until > time.time())
+        try:
+            response = self.get_response(request)
+            if routers.wrote():
+                response.set_cookie(
+                    routers.PIN_COOKIE,
+                    str(time.time() + settings.REPLICA_PIN_SECONDS),
+                    max_age=settings.REPLICA_PIN_SECONDS,
+                    httponly=True,
+                )
+            return response
+        finally:
+            routers.reset_state()
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        routers.use_replica(
+            request.method in ('GET', 'HEAD')
+            and _view_name(request) in settings.REPLICA_READ_VIEWS
+        )
+
+
+class IdentityMapMiddleware:
+    """Открывает карту идентичности на время запроса и считает её работу."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with identity_map.scope() as identity:
+            response = self.get_response(request)
+        labels = (('view', _view_name(request) or 'unmatched'),)
+        metrics.registry.inc(
+            'yatube_identity_map_queries_total', labels, identity.queries
+        )
+        metrics.registry.inc(
+            'yatube_identity_map_saved_queries_total', labels, identity.saved
+        )
+        request.identity_map = identity
+        return response
@@ -0,0 +1,31 @@
+# Generated by Django 2.2.16 on 2026-10-19 08:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CounterShard',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+                ('shard', models.PositiveSmallIntegerField()),
+                ('value', models.BigIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Часть счётчика',
+                'verbose_name_plural': 'Части счётчиков',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='countershard',
+            constraint=models.UniqueConstraint(fields=('name', 'shard'), name='counter_name_shard'),
+        ),
+    ]
@@ -18,3 +18,19 @@ class CreatedModel(models.Model):
 
     class Meta:
         abstract = True
+
+
+class CounterShard(models.Model):
+    """Часть шардированного счётчика (см. core.counters)."""
+    name = models.CharField(max_length=100)
+    shard = models.PositiveSmallIntegerField()
+    value = models.BigIntegerField(default=0)
+
+    class Meta:
+        verbose_name = 'Часть счётчика'
+        verbose_name_plural = 'Части счётчиков'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['name', 'shard'], name='counter_name_shard'
+            ),
+        ]
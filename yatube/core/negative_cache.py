@@ -0,0 +1,161 @@
+"""Отсев заведомо отсутствующих ключей без запроса к базе.
+
+В процессе хранится ограниченный LRU-список ключей, которых нет в базе
+(NEGATIVE_CACHE_SIZE записей, каждая живёт NEGATIVE_CACHE_TIMEOUT
+секунд). Сохранение объекта снимает его ключи в своём процессе сразу, а
+в остальных — через журнал core.pubsub NEGATIVE_CACHE_LOG: событие
+пишется после фиксации транзакции, и каждый процесс дочитывает журнал
+перед проверкой. Если журнал повернулся дважды между проверками
+(pubsub.Tail.missed), процесс забывает весь список.
+
+Для полей из NEGATIVE_CACHE_BLOOM_FIELDS дополнительно строится фильтр
+Блума по всем существующим значениям: значение, которого нет в
+фильтре, точно отсутствует в базе. Создание объекта в любом процессе
+увеличивает поколение фильтра в кэше default, и остальные процессы
+перестраивают его при следующей проверке. Поэтому кэш должен быть общим
+для процессов (Redis, Memcached, база); с кэшем в памяти процесса
+проверка core.E001 не даёт запустить проект.
+"""
+import hashlib
+import math
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from core import pubsub
+
+_lock = threading.Lock()
+_missing = OrderedDict()
+_filters = {}
+_tail = None
+
+
+class BloomFilter:
+    def __init__(self, capacity, error_rate=0.01):
+        capacity = max(capacity, 1)
+        self.size = math.ceil(
+            -capacity * math.log(error_rate) / math.log(2) ** 2
+        )
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, value):
+        digest = hashlib.blake2b(str(value).encode()).digest()
+        first = int.from_bytes(digest[:8], 'little')
+        second = int.from_bytes(digest[8:16], 'little')
+        for number in range(self.hashes):
+            yield (first + number * second) % self.size
+
+    def add(self, value):
+        for position in self._positions(value):
+            self.bits[position // 8] |= 1 << position % 8
+
+    def __contains__(self, value):
+        return all(
+            self.bits[position // 8] & 1 << position % 8
+            for position in self._positions(value)
+        )
+
+
+def _name(model, field):
+    return f'{model._meta.label_lower}.{field}'
+
+
+def _generation_key(name):
+    return f'negative:bloom:{name}'
+
+
+def _bloom(model, field):
+    """Фильтр для поля или None, если фильтр для него не включён."""
+    name = _name(model, field)
+    if name not in settings.NEGATIVE_CACHE_BLOOM_FIELDS:
+        return None
+    generation = cache.get(_generation_key(name), 0)
+    current = _filters.get(name)
+    if current is not None and current[0] == generation:
+        return current[1]
+    values = list(
+        model._default_manager.values_list(field, flat=True).iterator()
+    )
+    bloom = BloomFilter(
+        2 * len(values) + 1000, settings.NEGATIVE_CACHE_BLOOM_ERROR_RATE
+    )
+    for value in values:
+        bloom.add(value)
+    _filters[name] = (generation, bloom)
+    return bloom
+
+
+def _sync():
+    """Снимает отметки с ключей, сохранённых в других процессах."""
+    global _tail
+    if _tail is None:
+        # Отметок ещё нет, и прошлые события не нужны.
+        _tail = pubsub.Tail(settings.NEGATIVE_CACHE_LOG)
+        return
+    events = _tail.read()
+    if _tail.missed:
+        _missing.clear()
+        return
+    for event in events:
+        _missing.pop((event['data']['name'], event['data']['value']), None)
+
+
+def is_missing(model, field, value):
+    """True, если ключа заведомо нет в базе."""
+    key = (_name(model, field), value)
+    with _lock:
+        _sync()
+        expires = _missing.get(key)
+        if expires is not None:
+            if expires > time.monotonic():
+                _missing.move_to_end(key)
+                return True
+            del _missing[key]
+    bloom = _bloom(model, field)
+    return bloom is not None and value not in bloom
+
+
+def add_missing(model, field, value):
+    with _lock:
+        _sync()
+        key = (_name(model, field), value)
+        _missing[key] = time.monotonic() + settings.NEGATIVE_CACHE_TIMEOUT
+        _missing.move_to_end(key)
+        while len(_missing) > settings.NEGATIVE_CACHE_SIZE:
+            _missing.popitem(last=False)
+
+
+def discard(model, field, value, using=None):
+    """Снимает отметку об отсутствии после сохранения объекта."""
+    name = _name(model, field)
+    with _lock:
+        _missing.pop((name, value), None)
+    transaction.on_commit(lambda: pubsub.publish(
+        ['negative_cache'], {'name': name, 'value': value},
+        path=settings.NEGATIVE_CACHE_LOG,
+    ), using=using)
+    if name not in settings.NEGATIVE_CACHE_BLOOM_FIELDS:
+        return
+    current = _filters.get(name)
+    if current is not None and value in current[1]:
+        return
+    key = _generation_key(name)
+    generation = 1 if cache.add(key, 1, None) else cache.incr(key)
+    if current is not None and current[0] == generation - 1:
+        current[1].add(value)
+        _filters[name] = (generation, current[1])
+
+
+def clear():
+    global _tail
+    with _lock:
+        _missing.clear()
+        if _tail is not None:
+            _tail.close()
+        _tail = None
+    _filters.clear()
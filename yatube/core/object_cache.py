@@ -0,0 +1,123 @@
+"""Сквозной кэш объектов по первичному и естественному ключу.
+
+Модель регистрируется через register() с перечнем полей естественного
+ключа (Group.slug, User.username). Объект кладётся в кэш под всеми своими
+ключами и удаляется из него по post_save и post_delete. Промахи тоже
+кэшируются на OBJECT_CACHE_MISS_TIMEOUT (и в core.negative_cache), а
+создание объекта снимает такую отметку. Гонка чтения с одновременной
+записью может оставить в кэше устаревший объект, но не дольше
+OBJECT_CACHE_TIMEOUT.
+
+Ключи удаляются только из кэша процесса, обработавшего запись. Если
+кэш default у каждого процесса свой (LocMemCache), другие воркеры
+продолжают отдавать прежний объект, поэтому время жизни записей тогда
+не больше OBJECT_CACHE_LOCAL_TIMEOUT; manage.py check --deploy
+предупреждает об этом (core.W001).
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save
+from django.http import Http404
+
+from core import negative_cache
+from core.cache import is_process_local
+
+MISSING = 'object_cache:missing'
+
+_natural_keys = {}
+
+
+def _timeout(setting):
+    timeout = getattr(settings, setting)
+    if is_process_local():
+        return min(timeout, settings.OBJECT_CACHE_LOCAL_TIMEOUT)
+    return timeout
+
+
+def register(model, natural_keys=()):
+    _natural_keys[model] = tuple(natural_keys)
+    post_save.connect(invalidate, sender=model, weak=False)
+    post_delete.connect(invalidate, sender=model, weak=False)
+
+
+def cache_key(model, field, value):
+    return f'object:{model._meta.label_lower}:{field}:{value}'
+
+
+def _lookups(obj):
+    return [('pk', obj.pk)] + [
+        (field, getattr(obj, field)) for field in _natural_keys[type(obj)]
+    ]
+
+
+def _keys(obj):
+    return [
+        cache_key(type(obj), field, value) for field, value in _lookups(obj)
+    ]
+
+
+def _delete(model, pk, keys):
+    cached = cache.get(cache_key(model, 'pk', pk))
+    if cached is not None and cached != MISSING:
+        keys += _keys(cached)
+    cache.delete_many(set(keys))
+
+
+def forget(model, pk):
+    """Удаляет объект из кэша после изменения в обход save()."""
+    _delete(model, pk, [cache_key(model, 'pk', pk)])
+
+
+def invalidate(sender, instance, **kwargs):
+    """Удаляет ключи объекта, в том числе по прежним естественным ключам."""
+    _delete(sender, instance.pk, _keys(instance))
+    if kwargs.get('signal') is post_save:
+        for field, value in _lookups(instance):
+            negative_cache.discard(
+                sender, field, value, using=kwargs['using']
+            )
+
+
+def get_cached(queryset, **lookup):
+    """Как queryset.get(), но сначала смотрит в кэш.
+
+    lookup — ровно одно поле: pk или поле естественного ключа модели.
+    """
+    (field, value), = lookup.items()
+    model = queryset.model
+    if field != 'pk' and field not in _natural_keys[model]:
+        raise ValueError(f'{field} не ключ кэша для {model.__name__}')
+    does_not_exist = model.DoesNotExist(
+        f'{model._meta.object_name} matching query does not exist.'
+    )
+    if negative_cache.is_missing(model, field, value):
+        raise does_not_exist
+    key = cache_key(model, field, value)
+    obj = cache.get(key)
+    if obj == MISSING:
+        raise does_not_exist
+    if obj is not None:
+        return obj
+    try:
+        obj = queryset.get(**lookup)
+    except model.DoesNotExist:
+        cache.set(key, MISSING, _timeout('OBJECT_CACHE_MISS_TIMEOUT'))
+        negative_cache.add_missing(model, field, value)
+        raise
+    cache.set_many(
+        dict.fromkeys(_keys(obj), obj), _timeout('OBJECT_CACHE_TIMEOUT')
+    )
+    return obj
+
+
+def get_cached_or_404(klass, **lookup):
+    """Замена get_object_or_404 для зарегистрированных моделей."""
+    queryset = klass
+    if hasattr(klass, '_default_manager'):
+        queryset = klass._default_manager.all()
+    try:
+        return get_cached(queryset, **lookup)
+    except queryset.model.DoesNotExist:
+        raise Http404(
+            f'No {queryset.model._meta.object_name} matches the given query.'
+        )
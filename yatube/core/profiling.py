@@ -0,0 +1,107 @@
+"""Статистический профилировщик: периодически снимает стеки потока.
+
+Результат сохраняется в «свёрнутом» формате (одна строка на стек:
+`кадр;кадр;кадр число`), который принимают flamegraph.pl и speedscope.
+"""
+import os
+import sys
+import threading
+from collections import Counter
+from datetime import datetime
+
+from django.conf import settings
+
+CATEGORIES = (
+    ('orm', (os.sep + os.path.join('django', 'db') + os.sep,)),
+    ('template', (os.sep + os.path.join('django', 'template') + os.sep,
+                  os.sep + 'templatetags' + os.sep)),
+    ('images', (os.sep + 'PIL' + os.sep, os.sep + 'sorl' + os.sep)),
+)
+
+
+def _frame_label(code):
+    filename = code.co_filename
+    marker = 'site-packages' + os.sep
+    if marker in filename:
+        filename = filename.split(marker, 1)[1]
+    elif filename.startswith(settings.BASE_DIR):
+        filename = os.path.relpath(filename, settings.BASE_DIR)
+    return f'{filename}:{code.co_name}'.replace(';', ':').replace(' ', '_')
+
+
+def categorize(filenames):
+    """Категория стека по самому глубокому узнаваемому кадру."""
+    for filename in reversed(filenames):
+        for category, markers in CATEGORIES:
+            if any(marker in filename for marker in markers):
+                return category
+        if (filename.startswith(settings.BASE_DIR)
+                and 'site-packages' not in filename):
+            return 'view'
+    return 'other'
+
+
+class Sampler:
+    """Снимает стек потока thread_id каждые interval секунд."""
+
+    def __init__(self, thread_id=None, interval=None):
+        self.thread_id = thread_id or threading.get_ident()
+        self.interval = interval or settings.PROFILE_INTERVAL
+        self.stacks = Counter()
+        self.categories = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            codes = []
+            while frame is not None:
+                codes.append(frame.f_code)
+                frame = frame.f_back
+            codes.reverse()
+            self.stacks[';'.join(map(_frame_label, codes))] += 1
+            self.categories[
+                categorize([code.co_filename for code in codes])
+            ] += 1
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+
+    @property
+    def samples(self):
+        return sum(self.stacks.values())
+
+    def collapsed(self):
+        return ''.join(
+            f'{stack} {count}\n' for stack, count in self.stacks.most_common()
+        )
+
+    def summary(self):
+        """Доли категорий вида `orm=40%;template=35%;view=25%`."""
+        total = self.samples or 1
+        return ';'.join(
+            f'{category}={count * 100 // total}%'
+            for category, count in self.categories.most_common()
+        )
+
+    def save(self, name):
+        """Записывает стеки в PROFILE_DIR и возвращает путь к файлу."""
+        os.makedirs(settings.PROFILE_DIR, exist_ok=True)
+        stamp = datetime.now().strftime('%Y%m%d-%H%M%S-%f')
+        safe_name = ''.join(
+            char if char.isalnum() or char in '-_' else '_' for char in name
+        )
+        path = os.path.join(
+            settings.PROFILE_DIR, f'{stamp}-{os.getpid()}-{safe_name}.folded'
+        )
+        with open(path, 'w') as file:
+            file.write(self.collapsed())
+        return path
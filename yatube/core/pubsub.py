@@ -0,0 +1,107 @@
+"""Файловый pub/sub между воркерами и sidecar-процессом.
+
+publish() дописывает событие строкой JSON в PUBSUB_LOG одним write() в
+режиме O_APPEND, поэтому строки разных процессов не перемешиваются.
+Когда файл вырастает больше PUBSUB_LOG_MAX_BYTES, он переименовывается
+в <путь>.1, и запись начинается заново. Tail читает новые строки с
+места, где остановился, и после переименования дочитывает старый файл,
+прежде чем перейти к новому; файл, переименованный дважды между
+чтениями, пропускается, и Tail.missed сообщает об этом.
+"""
+import json
+import os
+
+from django.conf import settings
+
+
+def publish(scopes, data, path=None):
+    """Записывает событие data для подписчиков любой из scopes."""
+    path = path or settings.PUBSUB_LOG
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    line = json.dumps(
+        {'scopes': list(scopes), 'data': data}, ensure_ascii=False
+    ) + '\n'
+    fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+    try:
+        os.write(fd, line.encode())
+        size = os.fstat(fd).st_size
+    finally:
+        os.close(fd)
+    if size > settings.PUBSUB_LOG_MAX_BYTES:
+        try:
+            os.replace(path, f'{path}.1')
+        except FileNotFoundError:
+            # Файл уже переименовал другой процесс.
+            pass
+
+
+class Tail:
+    """Новые события журнала с момента создания объекта.
+
+    Если между двумя read() журнал переименовали больше одного раза,
+    промежуточный файл уже перезаписан следующим <путь>.1, и его события
+    потеряны; read() тогда выставляет missed.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or settings.PUBSUB_LOG
+        self.file = None
+        self.buffer = b''
+        self.missed = False
+        self._open(seek_end=True)
+
+    def _open(self, seek_end=False):
+        try:
+            self.file = open(self.path, 'rb')
+        except FileNotFoundError:
+            self.file = None
+            # Сменится, если журнал успеют создать и переименовать.
+            self.previous = self._previous_inode()
+            return
+        if seek_end:
+            self.file.seek(0, os.SEEK_END)
+
+    def _previous_inode(self):
+        try:
+            return os.stat(f'{self.path}.1').st_ino
+        except FileNotFoundError:
+            return None
+
+    def _expected_inode(self):
+        """Inode, который должен оказаться у <путь>.1 после ротации."""
+        if self.file is None:
+            return self.previous
+        return os.fstat(self.file.fileno()).st_ino
+
+    def _rotated(self):
+        try:
+            current = os.stat(self.path)
+        except FileNotFoundError:
+            # Новый файл ещё не создан; если и <путь>.1 не тот, журнал
+            # успели повернуть больше одного раза.
+            return self._previous_inode() != self._expected_inode()
+        if self.file is None:
+            return True
+        return current.st_ino != os.fstat(self.file.fileno()).st_ino
+
+    def read(self):
+        """Список событий, записанных после прошлого вызова."""
+        events = []
+        self.missed = False
+        while True:
+            if self.file is not None:
+                self.buffer += self.file.read()
+            *lines, self.buffer = self.buffer.split(b'\n')
+            events.extend(json.loads(line) for line in lines if line)
+            if not self._rotated():
+                return events
+            if self._previous_inode() != self._expected_inode():
+                self.missed = True
+            if self.file is not None:
+                self.file.close()
+            self.buffer = b''
+            self._open()
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
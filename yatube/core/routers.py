@@ -0,0 +1,101 @@
+"""Маршрутизация запросов к базе: запись в основную, чтение из реплик.
+
+Из реплик читают только view из REPLICA_READ_VIEWS и только GET/HEAD.
+После записи браузер получает cookie, и REPLICA_PIN_SECONDS его чтение
+идёт из основной базы, чтобы пользователь сразу видел свой пост или
+комментарий. Недоступная реплика исключается на REPLICA_RETRY_SECONDS.
+"""
+import os
+import random
+import sqlite3
+import threading
+import time
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+PIN_COOKIE = 'primary_pin'
+
+_local = threading.local()
+_down_until = {}
+
+
+def reset_state(pinned=False):
+    """Начинает новый запрос: чтение из основной базы, записей не было."""
+    _local.use_replica = False
+    _local.pinned = pinned
+    _local.wrote = False
+
+
+def use_replica(enabled):
+    _local.use_replica = enabled
+
+
+def note_write():
+    """Отмечает запись в текущем запросе (в т.ч. через очередь записи)."""
+    _local.wrote = True
+
+
+def wrote():
+    return getattr(_local, 'wrote', False)
+
+
+def replica_available(alias):
+    """Проверяет реплику; недоступная пропускается на время паузы."""
+    if _down_until.get(alias, 0) > time.monotonic():
+        return False
+    connection = connections[alias]
+    try:
+        if (connection.vendor == 'sqlite'
+                and not os.path.exists(connection.settings_dict['NAME'])):
+            raise DatabaseError(f'Нет файла реплики {alias}')
+        connection.ensure_connection()
+    except DatabaseError:
+        _down_until[alias] = time.monotonic() + settings.REPLICA_RETRY_SECONDS
+        return False
+    return True
+
+
+def choose_replica():
+    replicas = list(settings.REPLICA_DATABASES)
+    random.shuffle(replicas)
+    for alias in replicas:
+        if replica_available(alias):
+            return alias
+    return DEFAULT_DB_ALIAS
+
+
+class PrimaryReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if (not settings.REPLICA_DATABASES
+                or not getattr(_local, 'use_replica', False)
+                or getattr(_local, 'pinned', False)):
+            return None
+        return choose_replica()
+
+    def db_for_write(self, model, **hints):
+        note_write()
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in settings.REPLICA_DATABASES:
+            return False
+        return None
+
+
+def sync_sqlite(source, target, pages=-1):
+    """Копирует базу SQLite в реплику через backup API.
+
+    Backup переписывает страницы реплики под блокировкой записи, а
+    читатели реплики в режиме WAL продолжают видеть прежний снимок.
+    """
+    source_connection = sqlite3.connect(source)
+    target_connection = sqlite3.connect(target)
+    try:
+        source_connection.backup(target_connection, pages=pages)
+    finally:
+        target_connection.close()
+        source_connection.close()
@@ -0,0 +1,147 @@
+"""Журнал медленных SQL-запросов в формате NDJSON.
+
+Запрос, выполнявшийся дольше SLOW_QUERY_THRESHOLD_MS, записывается
+вместе с параметрами, именем view, местом вызова в коде проекта и
+планом выполнения (EXPLAIN QUERY PLAN для SQLite).
+"""
+import json
+import logging
+import os
+import re
+import threading
+import time
+import traceback
+from datetime import datetime, timezone
+from logging.handlers import RotatingFileHandler
+
+from django.conf import settings
+from django.db import DatabaseError
+
+_local = threading.local()
+_loggers = {}
+_loggers_lock = threading.Lock()
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+_PLACEHOLDER = re.compile(r'%s|\?')
+_LIST = re.compile(r'\(\s*\?(?:\s*,\s*\?)+\s*\)')
+_SPACES = re.compile(r'\s+')
+
+
+def fingerprint(sql):
+    """Нормализует запрос: литералы и параметры заменяются на `?`."""
+    sql = _STRING.sub('?', sql)
+    sql = _NUMBER.sub('?', sql)
+    sql = _PLACEHOLDER.sub('?', sql)
+    sql = _LIST.sub('(?+)', sql)
+    return _SPACES.sub(' ', sql).strip()
+
+
+def get_logger(path):
+    """Логгер с ротацией файла для указанного пути."""
+    with _loggers_lock:
+        logger = _loggers.get(path)
+        if logger is None:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            handler = RotatingFileHandler(
+                path,
+                maxBytes=settings.SLOW_QUERY_LOG_MAX_BYTES,
+                backupCount=settings.SLOW_QUERY_LOG_BACKUP_COUNT,
+                encoding='utf-8',
+            )
+            handler.setFormatter(logging.Formatter('%(message)s'))
+            logger = logging.getLogger(f'core.slow_queries.{len(_loggers)}')
+            logger.setLevel(logging.INFO)
+            logger.propagate = False
+            logger.addHandler(handler)
+            _loggers[path] = logger
+        return logger
+
+
+def log_files(path):
+    """Текущий файл журнала и его ротированные копии, от старых к новым."""
+    files = [path]
+    index = 1
+    while os.path.exists(f'{path}.{index}'):
+        files.append(f'{path}.{index}')
+        index += 1
+    return [file for file in reversed(files) if os.path.exists(file)]
+
+
+def read_entries(path):
+    for file_name in log_files(path):
+        with open(file_name, encoding='utf-8') as file:
+            for line in file:
+                if line.strip():
+                    yield json.loads(line)
+
+
+def _call_site():
+    """Ближайший кадр стека из кода приложений (кроме самого core)."""
+    base_dir = settings.BASE_DIR
+    core_dir = os.path.dirname(os.path.abspath(__file__))
+    for frame in reversed(traceback.extract_stack()):
+        filename = frame.filename
+        if (filename.startswith(base_dir) and 'site-packages' not in filename
+                and not filename.startswith(core_dir)):
+            return (
+                f'{os.path.relpath(filename, base_dir)}:{frame.lineno} '
+                f'in {frame.name}'
+            )
+    return None
+
+
+def _explain(connection, sql, params):
+    if not sql.lstrip().upper().startswith('SELECT'):
+        return None
+    prefix = (
+        'EXPLAIN QUERY PLAN ' if connection.vendor == 'sqlite' else 'EXPLAIN '
+    )
+    _local.explaining = True
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(prefix + sql, params)
+            return [
+                ' '.join(str(column) for column in row)
+                for row in cursor.fetchall()
+            ]
+    except DatabaseError:
+        return None
+    finally:
+        _local.explaining = False
+
+
+class SlowQueryWrapper:
+    """Обёртка для connection.execute_wrapper()."""
+
+    def __init__(self, connection, request=None):
+        self.connection = connection
+        self.request = request
+
+    def __call__(self, execute, sql, params, many, context):
+        if getattr(_local, 'explaining', False):
+            return execute(sql, params, many, context)
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = (time.perf_counter() - start) * 1000
+            if duration > settings.SLOW_QUERY_THRESHOLD_MS:
+                self.record(sql, params, many, duration)
+
+    def record(self, sql, params, many, duration):
+        match = getattr(self.request, 'resolver_match', None)
+        entry = {
+            'ts': datetime.now(timezone.utc).isoformat(),
+            'db': self.connection.alias,
+            'duration_ms': round(duration, 3),
+            'sql': sql,
+            'params': None if many else params,
+            'view': match.view_name if match else None,
+            'path': getattr(self.request, 'path', None),
+            'call_site': _call_site(),
+            'plan': None if many else _explain(self.connection, sql, params),
+        }
+        get_logger(settings.SLOW_QUERY_LOG).info(
+            json.dumps(entry, ensure_ascii=False, default=str)
+        )
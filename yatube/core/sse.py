@@ -0,0 +1,212 @@
+"""Sidecar для Server-Sent Events на asyncio.
+
+Один процесс (команда sse_server) держит все соединения: каждое —
+это корутина и очередь, а не воркер WSGI, так что тысячи простаивающих
+клиентов почти ничего не стоят. Журнал core.pubsub читается одним
+циклом раз в SSE_POLL_INTERVAL, и Hub раздаёт каждое событие очередям
+клиентов, подписанных на любую из его областей: на область приходится
+одна подписка, сколько бы клиентов её ни слушали.
+
+Клиент приходит на GET <путь>?token=<...>; токен выдаёт Django
+(make_token) и подписывает SECRET_KEY, в нём перечислены области,
+которые клиенту можно слушать. Раз в SSE_HEARTBEAT секунд клиенту
+уходит комментарий, чтобы прокси не закрывали соединение. Клиент,
+не успевающий читать события, отключается и переподключится сам.
+Время выдачи в токене округляется вниз до TOKEN_WINDOW, так что в
+пределах окна токен для одних и тех же областей одинаков и страница с
+ним не меняется от запроса к запросу.
+"""
+import asyncio
+import json
+import logging
+import time
+import zlib
+from collections import defaultdict
+from urllib.parse import parse_qs, urlsplit
+
+from django.conf import settings
+from django.core import signing
+from django.utils import baseconv
+
+from core.pubsub import Tail
+
+logger = logging.getLogger(__name__)
+
+SALT = 'core.sse'
+QUEUE_SIZE = 100
+TOKEN_WINDOW = 60 * 60
+
+
+class WindowSigner(signing.TimestampSigner):
+    def timestamp(self):
+        now = int(time.time())
+        return baseconv.base62.encode(now - now % TOKEN_WINDOW)
+
+
+def make_token(scopes):
+    # То же, что signing.dumps(..., compress=True), но с WindowSigner.
+    data = json.dumps(sorted(scopes), separators=(',', ':')).encode()
+    compressed = zlib.compress(data)
+    prefix = ''
+    if len(compressed) < len(data) - 1:
+        data, prefix = compressed, '.'
+    return WindowSigner(salt=SALT).sign(
+        prefix + signing.b64_encode(data).decode()
+    )
+
+
+def read_token(token):
+    """Области из токена; signing.BadSignature для чужого или старого."""
+    return signing.loads(
+        token, salt=SALT, max_age=settings.SSE_TOKEN_MAX_AGE
+    )
+
+
+class Client:
+    def __init__(self, scopes):
+        self.scopes = scopes
+        self.queue = asyncio.Queue(QUEUE_SIZE)
+        self.closed = False
+
+    def send(self, data):
+        try:
+            self.queue.put_nowait(data)
+        except asyncio.QueueFull:
+            self.closed = True
+
+    def close(self):
+        self.closed = True
+        try:
+            # None будит handle(), если он ждёт очередь.
+            self.queue.put_nowait(None)
+        except asyncio.QueueFull:
+            pass
+
+
+class Hub:
+    def __init__(self):
+        self.subscribers = defaultdict(set)
+
+    def subscribe(self, client):
+        for scope in client.scopes:
+            self.subscribers[scope].add(client)
+
+    def unsubscribe(self, client):
+        for scope in client.scopes:
+            clients = self.subscribers.get(scope)
+            if clients is not None:
+                clients.discard(client)
+                if not clients:
+                    del self.subscribers[scope]
+
+    def dispatch(self, event):
+        """Отдаёт событие клиентам; возвращает их число."""
+        clients = set()
+        for scope in event['scopes']:
+            clients.update(self.subscribers.get(scope, ()))
+        for client in clients:
+            client.send(event['data'])
+        return len(clients)
+
+
+def _response(status, headers=()):
+    lines = [f'HTTP/1.1 {status}', *headers, '', '']
+    return '\r\n'.join(lines).encode()
+
+
+async def _read_request(reader):
+    request_line = await reader.readline()
+    while (await reader.readline()).strip():
+        pass
+    method, target, _ = request_line.decode('latin-1').split(' ', 2)
+    return method, urlsplit(target)
+
+
+async def _watch(reader, client):
+    # После запроса клиент SSE ничего не шлёт: EOF значит, что он ушёл.
+    try:
+        await reader.read()
+    except ConnectionError:
+        pass
+    client.close()
+
+
+async def handle(hub, reader, writer):
+    try:
+        method, target = await asyncio.wait_for(_read_request(reader), 10)
+        token = parse_qs(target.query).get('token', [''])[0]
+        scopes = read_token(token) if method == 'GET' else None
+    except (ValueError, asyncio.TimeoutError, signing.BadSignature):
+        scopes = None
+    if not scopes:
+        writer.write(_response('403 Forbidden', ['Content-Length: 0']))
+        await _close(writer)
+        return
+    client = Client(scopes)
+    hub.subscribe(client)
+    watching = asyncio.ensure_future(_watch(reader, client))
+    try:
+        writer.write(_response('200 OK', [
+            'Content-Type: text/event-stream; charset=utf-8',
+            'Cache-Control: no-cache',
+            'Access-Control-Allow-Origin: *',
+            'X-Accel-Buffering: no',
+        ]))
+        writer.write(f'retry: {settings.SSE_RETRY_MS}\n\n'.encode())
+        await writer.drain()
+        while not client.closed:
+            try:
+                data = await asyncio.wait_for(
+                    client.queue.get(), settings.SSE_HEARTBEAT
+                )
+            except asyncio.TimeoutError:
+                writer.write(b': ping\n\n')
+            else:
+                if data is None:
+                    break
+                payload = json.dumps(data, ensure_ascii=False)
+                writer.write(f'event: post\ndata: {payload}\n\n'.encode())
+            await writer.drain()
+    except (ConnectionError, asyncio.IncompleteReadError):
+        pass
+    finally:
+        watching.cancel()
+        hub.unsubscribe(client)
+        await _close(writer)
+
+
+async def _close(writer):
+    writer.close()
+    try:
+        await writer.wait_closed()
+    except ConnectionError:
+        pass
+
+
+async def pump(hub, tail):
+    """Раздаёт новые события журнала, пока задачу не отменят."""
+    while True:
+        try:
+            for event in tail.read():
+                hub.dispatch(event)
+        except (OSError, ValueError):
+            logger.exception('Не удалось прочитать журнал событий')
+        await asyncio.sleep(settings.SSE_POLL_INTERVAL)
+
+
+async def serve(host, port, ready=None):
+    hub = Hub()
+    tail = Tail()
+    server = await asyncio.start_server(
+        lambda reader, writer: handle(hub, reader, writer), host, port,
+        backlog=1024
+    )
+    pumping = asyncio.ensure_future(pump(hub, tail))
+    if ready is not None:
+        ready(server, hub)
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        pumping.cancel()
+        tail.close()
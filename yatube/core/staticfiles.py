@@ -0,0 +1,206 @@
+"""Статика с хэшем в имени, заранее сжатыми копиями и отдачей из WSGI.
+
+collectstatic с CompressedManifestStaticFilesStorage копирует файлы в
+STATIC_ROOT, добавляет к именам хэш содержимого (staticfiles.json) и
+рядом с текстовыми файлами кладёт <имя>.gz и <имя>.br, если сжатие
+заметно уменьшает размер. StaticFiles оборачивает WSGI-приложение:
+запросы под STATIC_URL обслуживаются из STATIC_ROOT без Django, с
+выбором сжатой копии по Accept-Encoding. Файлы с хэшем в имени
+кэшируются навсегда (immutable), остальные — на STATIC_MAX_AGE секунд.
+"""
+import gzip
+import io
+import mimetypes
+import os
+from email.utils import formatdate
+from wsgiref.headers import Headers
+
+import brotli
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+
+COMPRESSIBLE = (
+    '.css', '.js', '.map', '.svg', '.ico', '.txt', '.xml', '.json', '.html'
+)
+# Сжатая копия пишется, только если она меньше исходника хотя бы на 5%.
+MIN_RATIO = 0.95
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+IMMUTABLE = 'public, max-age=31536000, immutable'
+CHUNK_SIZE = 64 * 1024
+
+
+def _gzip(data):
+    # gzip.compress() принимает mtime только с Python 3.8; нулевое время
+    # в заголовке делает копию и её ETag одинаковыми от сборки к сборке.
+    buffer = io.BytesIO()
+    with gzip.GzipFile(
+        fileobj=buffer, mode='wb', compresslevel=9, mtime=0
+    ) as file:
+        file.write(data)
+    return buffer.getvalue()
+
+
+def compress(data):
+    """{кодировка: сжатые данные} для выгодных вариантов сжатия."""
+    variants = {
+        'br': brotli.compress(data, quality=11),
+        'gzip': _gzip(data),
+    }
+    return {
+        encoding: compressed for encoding, compressed in variants.items()
+        if len(compressed) < len(data) * MIN_RATIO
+    }
+
+
+def accepted_encodings(header):
+    """Кодировки из Accept-Encoding с ненулевым q."""
+    accepted = set()
+    for part in header.split(','):
+        coding, _, params = part.partition(';')
+        quality = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        if quality > 0:
+            accepted.add(coding.strip().lower())
+    return accepted
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    # Без манифеста (до collectstatic, в тестах) файлы адресуются
+    # исходными именами вместо ошибки при рендеринге.
+    manifest_strict = False
+
+    def stored_name(self, name):
+        try:
+            return super().stored_name(name)
+        except ValueError:
+            return name
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run, **options)
+        if dry_run:
+            return
+        names = set(paths) | set(self.hashed_files.values())
+        for name in sorted(names):
+            if not name.endswith(COMPRESSIBLE):
+                continue
+            path = self.path(name)
+            with open(path, 'rb') as source:
+                variants = compress(source.read())
+            for encoding, suffix in ENCODINGS:
+                if encoding in variants:
+                    with open(path + suffix, 'wb') as target:
+                        target.write(variants[encoding])
+
+
+def _chunks(file):
+    with file:
+        while True:
+            chunk = file.read(CHUNK_SIZE)
+            if not chunk:
+                return
+            yield chunk
+
+
+class Asset:
+    def __init__(self, path, immutable):
+        stat = os.stat(path)
+        self.immutable = immutable
+        self.content_type = (
+            mimetypes.guess_type(path)[0] or 'application/octet-stream'
+        )
+        self.etag = f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+        self.last_modified = formatdate(stat.st_mtime, usegmt=True)
+        self.variants = {None: (path, stat.st_size)}
+        for encoding, suffix in ENCODINGS:
+            if os.path.exists(path + suffix):
+                self.variants[encoding] = (
+                    path + suffix, os.path.getsize(path + suffix)
+                )
+
+    def choose(self, accept_encoding):
+        accepted = accepted_encodings(accept_encoding)
+        for encoding, _ in ENCODINGS:
+            if encoding in accepted and encoding in self.variants:
+                return encoding
+        return None
+
+
+class StaticFiles:
+    """WSGI-обёртка, отдающая файлы STATIC_ROOT в обход Django.
+
+    Список файлов читается один раз при создании; после collectstatic
+    процесс нужно перезапустить.
+    """
+
+    def __init__(self, application, root=None, prefix=None):
+        self.application = application
+        self.root = root or settings.STATIC_ROOT
+        self.prefix = prefix or settings.STATIC_URL
+        self.files = self._scan()
+
+    def _scan(self):
+        if not self.root or not os.path.isdir(self.root):
+            return {}
+        manifest = CompressedManifestStaticFilesStorage(location=self.root)
+        hashed = set(manifest.hashed_files.values())
+        suffixes = tuple(suffix for _, suffix in ENCODINGS)
+        files = {}
+        for directory, _, filenames in os.walk(self.root):
+            for filename in filenames:
+                if filename.endswith(suffixes) or (
+                    filename == manifest.manifest_name
+                ):
+                    continue
+                path = os.path.join(directory, filename)
+                name = os.path.relpath(path, self.root).replace(os.sep, '/')
+                files[self.prefix + name] = Asset(path, name in hashed)
+        return files
+
+    def __call__(self, environ, start_response):
+        path = environ.get('PATH_INFO', '')
+        if not self.files or not path.startswith(self.prefix):
+            return self.application(environ, start_response)
+        asset = self.files.get(path)
+        if asset is None:
+            start_response('404 Not Found', [
+                ('Content-Type', 'text/plain'), ('Content-Length', '0')
+            ])
+            return []
+        if environ['REQUEST_METHOD'] not in ('GET', 'HEAD'):
+            start_response('405 Method Not Allowed', [
+                ('Allow', 'GET, HEAD'), ('Content-Length', '0')
+            ])
+            return []
+        encoding = asset.choose(environ.get('HTTP_ACCEPT_ENCODING', ''))
+        filename, size = asset.variants[encoding]
+        headers = Headers([])
+        headers['Cache-Control'] = (
+            IMMUTABLE if asset.immutable
+            else f'public, max-age={settings.STATIC_MAX_AGE}'
+        )
+        headers['Last-Modified'] = asset.last_modified
+        if len(asset.variants) > 1:
+            headers['Vary'] = 'Accept-Encoding'
+        # У каждой копии свой ETag, иначе кэш отдаст gzip клиенту без него.
+        etag = asset.etag[:-1] + (f'-{encoding}"' if encoding else '"')
+        headers['ETag'] = etag
+        if etag in environ.get('HTTP_IF_NONE_MATCH', ''):
+            start_response('304 Not Modified', headers.items())
+            return []
+        headers['Content-Type'] = asset.content_type
+        headers['Content-Length'] = str(size)
+        if encoding:
+            headers['Content-Encoding'] = encoding
+        start_response('200 OK', headers.items())
+        if environ['REQUEST_METHOD'] == 'HEAD':
+            return []
+        file = open(filename, 'rb')
+        wrapper = environ.get('wsgi.file_wrapper')
+        if wrapper is not None:
+            return wrapper(file, CHUNK_SIZE)
+        return _chunks(file)
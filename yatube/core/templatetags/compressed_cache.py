@@ -0,0 +1,34 @@
+"""{% cache %}, который хранит фрагмент вместе со сжатой копией.
+
+Синтаксис и ключи кэша те же, что у встроенного тега; сжатые фрагменты
+использует core.compression.CompressionMiddleware.
+"""
+from django import template
+from django.templatetags.cache import CacheNode, do_cache
+
+from core.compression import Fragment, add_fragment
+
+register = template.Library()
+
+
+class CompressingNodeList(template.NodeList):
+    def render(self, context):
+        return Fragment(super().render(context))
+
+
+class CompressedCacheNode(CacheNode):
+    def render(self, context):
+        fragment = super().render(context)
+        request = getattr(context, 'request', None)
+        if request is not None and isinstance(fragment, Fragment):
+            add_fragment(request, fragment)
+        return fragment
+
+
+@register.tag('cache')
+def do_compressed_cache(parser, token):
+    node = do_cache(parser, token)
+    return CompressedCacheNode(
+        CompressingNodeList(node.nodelist), node.expire_time_var,
+        node.fragment_name, node.vary_on, node.cache_name
+    )
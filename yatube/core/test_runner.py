@@ -0,0 +1,14 @@
+from django.test.runner import DiscoverRunner
+
+from core import counters
+
+
+class TestRunner(DiscoverRunner):
+    """Отбрасывает несброшенные дельты счётчиков до удаления тестовых баз.
+
+    Иначе сброс при выходе процесса записал бы их в рабочую базу.
+    """
+
+    def teardown_databases(self, old_config, **kwargs):
+        counters.clear_all()
+        super().teardown_databases(old_config, **kwargs)
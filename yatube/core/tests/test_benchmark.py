@@ -0,0 +1,50 @@
+from django.core.cache import cache
+from django.test import Client, TestCase
+
+from core import benchmark
+
+
+class BenchmarkTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.data = benchmark.seed(authors=3, posts_per_author=4)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_percentile(self):
+        """Перцентиль интерполируется между соседними значениями."""
+        values = [1, 2, 3, 4, 5]
+        self.assertEqual(benchmark.percentile(values, 50), 3)
+        self.assertEqual(benchmark.percentile(values, 95), 4.8)
+        self.assertEqual(benchmark.percentile([], 99), 0.0)
+
+    def test_measure_counts_queries_and_render(self):
+        """Замер учитывает SQL-запросы и время рендеринга."""
+        results = benchmark.run(self.data, iterations=2, warmup=0)
+        self.assertEqual(
+            set(results),
+            {'index', 'group_list', 'profile', 'post_detail', 'follow_index'}
+        )
+        for name, row in results.items():
+            with self.subTest(view=name):
+                self.assertGreater(row['queries'], 0)
+                self.assertGreater(row['render_ms'], 0)
+                self.assertLessEqual(row['p50_ms'], row['p99_ms'])
+
+    def test_compare_reports_regressions(self):
+        """Рост p95 и числа запросов сверх порога считается регрессией."""
+        baseline = {'index': {'p95_ms': 10.0, 'queries': 3}}
+        self.assertEqual(benchmark.compare(
+            {'index': {'p95_ms': 11.0, 'queries': 3}}, baseline
+        ), [])
+        regressions = benchmark.compare(
+            {'index': {'p95_ms': 13.0, 'queries': 5}}, baseline,
+            latency_threshold=0.2, query_threshold=1,
+        )
+        self.assertEqual(len(regressions), 2)
+
+    def test_measure_rejects_errors(self):
+        """measure() отклоняет страницы с ошибочным статусом."""
+        with self.assertRaises(RuntimeError):
+            benchmark.measure(Client(), '/no-such-page/', iterations=1)
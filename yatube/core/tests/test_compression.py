@@ -0,0 +1,100 @@
+import gzip
+import zlib
+from unittest import mock
+
+import brotli
+from django.core.cache import cache
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import Client, RequestFactory, TestCase
+
+from core import compression
+from core.models import User
+from posts.models import Post
+
+
+class CompressionMiddlewareTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        author = User.objects.create(username='author')
+        Post.objects.bulk_create(
+            Post(text=f'Текст поста {number}', author=author)
+            for number in range(10)
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+    def test_negotiation(self):
+        plain = self.client.get('/').content
+        for accept, encoding, decompress in (
+            ('gzip, br', 'br', brotli.decompress),
+            ('br;q=0, gzip', 'gzip', gzip.decompress),
+        ):
+            with self.subTest(accept=accept):
+                with self.settings(COMPRESSION_FRAGMENTS=False):
+                    response = self.client.get(
+                        '/', HTTP_ACCEPT_ENCODING=accept
+                    )
+                self.assertEqual(response['Content-Encoding'], encoding)
+                self.assertIn('Accept-Encoding', response['Vary'])
+                self.assertEqual(decompress(response.content), plain)
+        response = self.client.get('/')
+        self.assertFalse(response.has_header('Content-Encoding'))
+
+    def test_cached_fragment_is_not_compressed_again(self):
+        """При попадании в кэш сжимается только HTML вокруг фрагмента."""
+        self.client.get('/', HTTP_ACCEPT_ENCODING='gzip')
+        with mock.patch.object(
+            compression, 'deflate', wraps=compression.deflate
+        ) as deflate:
+            response = self.client.get('/', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        content = gzip.decompress(response.content)
+        self.assertEqual(content, self.client.get('/').content)
+        compressed = sum(len(call[0][0]) for call in deflate.call_args_list)
+        self.assertLess(compressed, len(content) // 2)
+
+    def test_streaming(self):
+        """Каждая часть потока распаковывается сразу после получения."""
+        def view(request):
+            return StreamingHttpResponse(
+                (f'часть {number}\n'.encode() for number in range(3)),
+                content_type='text/plain'
+            )
+
+        middleware = compression.CompressionMiddleware(view)
+        for accept, decompress in (
+            ('gzip', zlib.decompressobj(16 + zlib.MAX_WBITS).decompress),
+            ('br', brotli.Decompressor().process),
+        ):
+            with self.subTest(accept=accept):
+                response = middleware(RequestFactory().get(
+                    '/', HTTP_ACCEPT_ENCODING=accept
+                ))
+                self.assertEqual(response['Content-Encoding'], accept)
+                chunks = iter(response.streaming_content)
+                self.assertEqual(
+                    decompress(next(chunks)), 'часть 0\n'.encode()
+                )
+                rest = b''.join(decompress(chunk) for chunk in chunks)
+                self.assertEqual(rest, 'часть 1\nчасть 2\n'.encode())
+
+    def test_skipped_responses(self):
+        request = RequestFactory().get('/', HTTP_ACCEPT_ENCODING='gzip')
+        for response in (
+            HttpResponse('коротко'),
+            HttpResponse(b'\x89PNG' * 100, content_type='image/png'),
+        ):
+            result = compression.CompressionMiddleware(
+                lambda request: response
+            )(request)
+            self.assertFalse(result.has_header('Content-Encoding'))
+
+    def test_strong_etag_becomes_weak(self):
+        response = HttpResponse('текст ' * 100)
+        response['ETag'] = '"abc"'
+        result = compression.CompressionMiddleware(lambda request: response)(
+            RequestFactory().get('/', HTTP_ACCEPT_ENCODING='gzip')
+        )
+        self.assertEqual(result['ETag'], 'W/"abc"')
@@ -0,0 +1,51 @@
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from core import identity_map
+from core.models import User
+from posts.models import Comment, Post
+
+
+class IdentityMapTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create(username='TestUser')
+        cls.post = Post.objects.create(
+            text='Тестовый текст', author=cls.author
+        )
+        cls.commenters = [
+            User.objects.create(username=f'commenter{number}')
+            for number in range(5)
+        ]
+        for user in cls.commenters * 2:
+            Comment.objects.create(post=cls.post, author=user, text='Текст')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_foreign_keys_are_loaded_in_one_query(self):
+        """Авторы всех комментариев загружаются одним запросом IN."""
+        with identity_map.scope() as identity:
+            comments = list(Comment.objects.filter(post=self.post))
+            with self.assertNumQueries(1):
+                authors = [comment.author for comment in comments]
+        self.assertEqual(identity.queries, 1)
+        self.assertEqual(identity.saved, len(comments) - 1)
+        self.assertIs(authors[0], authors[len(self.commenters)])
+
+    def test_post_detail_counts_saved_queries(self):
+        """post_detail грузит авторов комментариев пачкой."""
+        response = Client().get(
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk})
+        )
+        identity = response.wsgi_request.identity_map
+        self.assertEqual(identity.queries, 2)
+        self.assertGreaterEqual(identity.saved, 9)
+
+    def test_without_scope_descriptor_is_unchanged(self):
+        """Вне запроса внешние ключи грузятся как обычно."""
+        comments = list(Comment.objects.filter(post=self.post))
+        with self.assertNumQueries(2):
+            comments[0].author
+            comments[1].author
@@ -0,0 +1,70 @@
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase
+
+from core import memory
+from core.models import User
+from posts.models import Post
+
+
+class MemoryTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create(username='staff', is_staff=True)
+        cls.user = User.objects.create(username='TestUser')
+        Post.objects.create(text='Тестовый текст', author=cls.user)
+
+    def setUp(self):
+        self.staff_client = Client()
+        self.staff_client.force_login(self.staff)
+        cache.clear()
+
+    def tearDown(self):
+        memory.stop()
+
+    def test_snapshot_and_view_growth(self):
+        """Снимки сравниваются, прирост памяти считается по view."""
+        self.staff_client.post('/debug/memory/', {'action': 'start'})
+        self.staff_client.post(
+            '/debug/memory/', {'action': 'snapshot', 'label': 'a'}
+        )
+        self.staff_client.get('/')
+        response = self.staff_client.post(
+            '/debug/memory/', {'action': 'snapshot', 'label': 'b'}
+        )
+        body = response.content.decode()
+        self.assertIn('tracemalloc: on', body)
+        self.assertIn('posts:index: 1 запросов', body)
+        self.assertIn('Разница двух последних снимков', body)
+
+    def test_memory_view_staff_only(self):
+        """Страница памяти недоступна обычному пользователю."""
+        client = Client()
+        client.force_login(self.user)
+        response = client.post('/debug/memory/', {'action': 'start'})
+        self.assertEqual(response.status_code, 302)
+        self.assertFalse(memory.is_tracing())
+
+    def test_memory_view_requires_post_and_valid_limit(self):
+        """GET не меняет состояние, неверный limit даёт 400."""
+        response = self.staff_client.get('/debug/memory/?action=start')
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(memory.is_tracing())
+        for limit in ('abc', '0'):
+            with self.subTest(limit=limit):
+                response = self.staff_client.get(
+                    f'/debug/memory/?limit={limit}'
+                )
+                self.assertEqual(response.status_code, 400)
+
+    def test_memory_replay_command(self):
+        """memory_replay сообщает прирост памяти на запрос."""
+        out = StringIO()
+        call_command(
+            'memory_replay', f'/profile/{self.user}/',
+            '--requests', '3', '--warmup', '1', stdout=out
+        )
+        self.assertIn('байт на запрос', out.getvalue())
+        self.assertFalse(memory.is_tracing())
@@ -0,0 +1,118 @@
+import json
+import os
+
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+
+from core import metrics
+from core.models import User
+from core.tests.utils import TempDirMixin
+from posts.models import Post
+
+
+class MetricsTests(TempDirMixin, TestCase):
+    temp_settings = {'METRICS_DIR': ''}
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username='TestUser')
+        Post.objects.create(text='Тестовый текст', author=cls.user)
+
+    def setUp(self):
+        self.guest_client = Client()
+        cache.clear()
+
+    def test_metrics_endpoint(self):
+        """/metrics отдаёт запросы, SQL и попадания в кэш по фрагментам."""
+        self.guest_client.get('/')
+        self.guest_client.get('/')
+        response = self.guest_client.get('/metrics')
+        self.assertEqual(response.status_code, 200)
+        body = response.content.decode()
+        self.assertIn(
+            'yatube_http_request_duration_seconds_bucket'
+            '{view="posts:index",le="+Inf"}', body
+        )
+        self.assertIn('yatube_db_queries_total{view="posts:index"}', body)
+        self.assertIn(
+            'yatube_cache_requests_total'
+            '{fragment="index_page",result="hit"}', body
+        )
+        self.assertIn('yatube_cache_hit_ratio{fragment="index_page"}', body)
+
+    def test_metrics_merged_across_workers(self):
+        """Счётчики из файлов других процессов складываются."""
+        other = {
+            'pid': 999999999,
+            'counters': [
+                ['yatube_http_requests_total',
+                 [['view', 'other'], ['method', 'GET'], ['status', '200']],
+                 5],
+            ],
+            'histograms': [],
+            'gauges': [['yatube_queue_depth', [], 7]],
+        }
+        with open(os.path.join(self.temp_dir, '999999999.json'), 'w') as f:
+            json.dump(other, f)
+        body = self.guest_client.get('/metrics').content.decode()
+        self.assertIn(
+            'yatube_http_requests_total'
+            '{view="other",method="GET",status="200"} 5', body
+        )
+        self.assertNotIn('yatube_queue_depth', body)
+
+    def test_prune_archives_dead_workers(self):
+        """Файлы завершённых процессов сливаются в архив и удаляются."""
+        for pid, value in ((999999998, 2), (999999999, 3)):
+            with open(os.path.join(self.temp_dir, f'{pid}.json'), 'w') as f:
+                json.dump({
+                    'pid': pid,
+                    'counters': [['yatube_http_requests_total',
+                                  [['view', 'other']], value]],
+                    'histograms': [],
+                    'gauges': [],
+                }, f)
+        metrics.prune()
+        metrics.prune()
+        self.assertEqual(
+            sorted(os.listdir(self.temp_dir)), ['.lock', metrics.ARCHIVE]
+        )
+        body = self.guest_client.get('/metrics').content.decode()
+        self.assertIn('yatube_http_requests_total{view="other"} 5', body)
+
+    @override_settings(SERVER_TIMING_SAMPLE_RATE=0)
+    def test_sql_counted_only_for_sampled_requests(self):
+        """Вне выборки считается запрос, но не его SQL."""
+        counters = metrics.registry.counters
+        labels = (('view', 'posts:index'),)
+        requests = ('yatube_http_requests_total', labels + (
+            ('method', 'GET'), ('status', '200')
+        ))
+        before = {
+            key: counters[key] for key in (
+                requests,
+                ('yatube_db_sampled_requests_total', labels),
+                ('yatube_db_queries_total', labels),
+            )
+        }
+        self.guest_client.get('/')
+        after = {key: counters[key] for key in before}
+        self.assertEqual(after.pop(requests), before.pop(requests) + 1)
+        self.assertEqual(after, before)
+
+    def test_histogram_buckets_cumulative(self):
+        """Бакеты гистограммы накопительные."""
+        registry = metrics.Registry()
+        for value in (0.001, 0.02, 20):
+            registry.observe('h', value, buckets=(0.01, 0.1))
+        text = metrics.render([registry.snapshot()])
+        self.assertIn('h_bucket{le="0.01"} 1', text)
+        self.assertIn('h_bucket{le="0.1"} 2', text)
+        self.assertIn('h_bucket{le="+Inf"} 3', text)
+        self.assertIn('h_count 3', text)
+
+    @override_settings(METRICS_ALLOWED_IPS=[])
+    def test_metrics_forbidden(self):
+        """/metrics закрыт для посторонних адресов."""
+        response = self.guest_client.get('/metrics')
+        self.assertEqual(response.status_code, 403)
@@ -0,0 +1,32 @@
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+
+from core.models import User
+from posts.models import Post
+
+
+class ServerTimingMiddlewareTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username='TestUser')
+        Post.objects.create(text='Тестовый текст', author=cls.user)
+
+    def setUp(self):
+        self.guest_client = Client()
+        cache.clear()
+
+    def test_server_timing_header(self):
+        """Ответ содержит время SQL, шаблонов, кэша и общее время."""
+        with self.assertLogs('core.timing', level='INFO') as logs:
+            response = self.guest_client.get(f'/profile/{self.user}/')
+        header = response['Server-Timing']
+        for metric in ('db;dur=', 'tpl;dur=', 'cache;dur=', 'total;dur='):
+            with self.subTest(metric=metric):
+                self.assertIn(metric, header)
+        self.assertIn('"view": "posts:profile"', logs.output[0])
+
+    @override_settings(SERVER_TIMING_SAMPLE_RATE=0)
+    def test_sampling_disabled(self):
+        """При нулевой доле выборки запрос не замеряется."""
+        response = self.guest_client.get('/')
+        self.assertFalse(response.has_header('Server-Timing'))
@@ -0,0 +1,94 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from core import negative_cache, pubsub
+from core.checks import check_negative_cache_backend
+from core.models import User
+from core.negative_cache import BloomFilter
+from core.tests.utils import TempDirMixin
+
+
+class NegativeCacheTests(TempDirMixin, TestCase):
+    temp_settings = {'NEGATIVE_CACHE_LOG': 'negative_cache.ndjson'}
+
+    def setUp(self):
+        cache.clear()
+        negative_cache.clear()
+        self.addCleanup(negative_cache.clear)
+        self.guest_client = Client()
+
+    def publish_saved(self, value):
+        """Событие о сохранении, как его пишет другой процесс."""
+        pubsub.publish(
+            ['negative_cache'], {'name': 'auth.user.username', 'value': value},
+            path=settings.NEGATIVE_CACHE_LOG,
+        )
+
+    def test_bloom_filter_has_no_false_negatives(self):
+        """Все добавленные значения находятся, ложных срабатываний мало."""
+        bloom = BloomFilter(1000, 0.01)
+        for number in range(1000):
+            bloom.add(f'user{number}')
+        self.assertTrue(all(f'user{n}' in bloom for n in range(1000)))
+        false_positives = sum(f'other{n}' in bloom for n in range(1000))
+        self.assertLess(false_positives, 50)
+
+    def test_known_missing_profile_skips_database(self):
+        """Повторный запрос несуществующего профиля не ходит в базу."""
+        url = reverse('posts:profile', kwargs={'username': 'nobody'})
+        self.guest_client.get(url)
+        cache.clear()
+        with self.assertNumQueries(0):
+            response = self.guest_client.get(url)
+        self.assertEqual(response.status_code, 404)
+        User.objects.create(username='nobody')
+        self.assertEqual(self.guest_client.get(url).status_code, 200)
+
+    def test_save_in_other_process_clears_mark(self):
+        """Отметку снимает событие из журнала, записанное другим воркером."""
+        negative_cache.add_missing(User, 'username', 'ghost')
+        negative_cache.add_missing(User, 'username', 'other')
+        self.publish_saved('ghost')
+        self.assertFalse(negative_cache.is_missing(User, 'username', 'ghost'))
+        self.assertTrue(negative_cache.is_missing(User, 'username', 'other'))
+
+    @override_settings(PUBSUB_LOG_MAX_BYTES=100)
+    def test_lost_events_clear_marks(self):
+        """После пропущенного файла журнала отметкам нельзя верить."""
+        negative_cache.add_missing(User, 'username', 'ghost')
+        for number in range(6):
+            self.publish_saved(f'user{number}')
+        self.assertFalse(negative_cache.is_missing(User, 'username', 'ghost'))
+
+    @override_settings(NEGATIVE_CACHE_BLOOM_FIELDS=['auth.user.username'])
+    def test_bloom_filter_rejects_unknown_usernames(self):
+        """Фильтр Блума отсеивает имена без запроса и видит новые."""
+        User.objects.create(username='existing')
+        self.assertFalse(
+            negative_cache.is_missing(User, 'username', 'existing')
+        )
+        with self.assertNumQueries(0):
+            self.assertTrue(
+                negative_cache.is_missing(User, 'username', 'unknown')
+            )
+        User.objects.create(username='unknown')
+        self.assertFalse(
+            negative_cache.is_missing(User, 'username', 'unknown')
+        )
+
+    def test_bloom_fields_require_shared_cache(self):
+        """Фильтр Блума с кэшем в памяти процесса — ошибка настройки."""
+        self.assertEqual(check_negative_cache_backend(None), [])
+        with self.settings(NEGATIVE_CACHE_BLOOM_FIELDS=['auth.user.username']):
+            errors = check_negative_cache_backend(None)
+            self.assertEqual([error.id for error in errors], ['core.E001'])
+        with self.settings(
+            NEGATIVE_CACHE_BLOOM_FIELDS=['auth.user.username'],
+            CACHES={'default': {
+                'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+                'LOCATION': 'cache_table',
+            }},
+        ):
+            self.assertEqual(check_negative_cache_backend(None), [])
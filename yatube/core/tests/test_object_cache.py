@@ -0,0 +1,68 @@
+from django.core.cache import cache
+from django.http import Http404
+from django.test import TestCase
+
+from core import object_cache
+from core.checks import check_shared_cache
+from core.models import User
+from core.object_cache import get_cached_or_404
+from posts.models import Group
+
+
+class ObjectCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username='TestUser')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_lookup_is_cached_by_pk_and_natural_key(self):
+        """Объект, найденный по username, берётся из кэша и по pk."""
+        with self.assertNumQueries(1):
+            get_cached_or_404(User, username='TestUser')
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                get_cached_or_404(User, username='TestUser'), self.user
+            )
+            self.assertEqual(get_cached_or_404(User, pk=self.user.pk),
+                             self.user)
+
+    def test_save_invalidates_old_and_new_keys(self):
+        """После переименования старый ключ не находит объект."""
+        get_cached_or_404(User, username='TestUser')
+        self.user.username = 'Renamed'
+        self.user.save()
+        with self.assertRaises(Http404):
+            get_cached_or_404(User, username='TestUser')
+        self.assertEqual(
+            get_cached_or_404(User, pk=self.user.pk).username, 'Renamed'
+        )
+
+    def test_misses_are_cached_until_object_created(self):
+        """Промах кэшируется, создание объекта снимает отметку."""
+        with self.assertNumQueries(1):
+            with self.assertRaises(Http404):
+                get_cached_or_404(Group, slug='new_group')
+        with self.assertNumQueries(0):
+            with self.assertRaises(Http404):
+                get_cached_or_404(Group, slug='new_group')
+        group = Group.objects.create(
+            title='Группа', slug='new_group', description='Описание'
+        )
+        self.assertEqual(get_cached_or_404(Group, slug='new_group'), group)
+
+    def test_process_local_cache_shortens_timeouts(self):
+        """С кэшем в памяти процесса чужие воркеры видят старый объект
+        не дольше OBJECT_CACHE_LOCAL_TIMEOUT."""
+        self.assertEqual(object_cache._timeout('OBJECT_CACHE_TIMEOUT'), 5)
+        self.assertEqual([w.id for w in check_shared_cache(None)],
+                         ['core.W001'])
+        with self.settings(CACHES={'default': {
+            'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+            'LOCATION': 'cache_table',
+        }}):
+            self.assertEqual(
+                object_cache._timeout('OBJECT_CACHE_TIMEOUT'), 300
+            )
+            self.assertEqual(check_shared_cache(None), [])
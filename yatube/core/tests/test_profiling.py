@@ -0,0 +1,69 @@
+import os
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.test import Client, TestCase, override_settings
+
+from core.models import User
+from core.profiling import Sampler, categorize
+from core.tests.utils import TempDirMixin
+
+
+@override_settings(PROFILE_INTERVAL=0.0005)
+class ProfilingTests(TempDirMixin, TestCase):
+    temp_settings = {'PROFILE_DIR': ''}
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create(username='staff', is_staff=True)
+        cls.user = User.objects.create(username='TestUser')
+
+    def setUp(self):
+        self.staff_client = Client()
+        self.staff_client.force_login(self.staff)
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+        cache.clear()
+
+    def test_staff_request_profiled(self):
+        """Запрос сотрудника с ?__profile сохраняет свёрнутые стеки."""
+        response = self.staff_client.get('/?__profile=1')
+        file_name = response['X-Profile-File']
+        self.assertIn('posts_index', file_name)
+        self.assertIn('samples=', response['X-Profile-Summary'])
+        path = os.path.join(self.temp_dir, file_name)
+        self.assertTrue(os.path.exists(path))
+
+    def test_regular_user_not_profiled(self):
+        """Обычному пользователю профилирование недоступно."""
+        response = self.authorized_client.get('/', HTTP_X_PROFILE='1')
+        self.assertFalse(response.has_header('X-Profile-File'))
+
+    def test_sampler_collects_stacks(self):
+        """Сэмплер записывает стеки в формате `кадр;кадр число`."""
+        with Sampler(interval=0.0005) as sampler:
+            total = 0
+            while not sampler.samples:
+                total += sum(range(1000))
+        line = sampler.collapsed().splitlines()[0]
+        stack, count = line.rsplit(' ', 1)
+        self.assertIn('test_sampler_collects_stacks', stack)
+        self.assertGreater(int(count), 0)
+
+    def test_categorize(self):
+        """Стек относится к категории самого глубокого кадра."""
+        view = os.path.join(settings.BASE_DIR, 'posts', 'views.py')
+        orm = '/usr/lib/site-packages/django/db/models/query.py'
+        image = '/usr/lib/site-packages/PIL/Image.py'
+        self.assertEqual(categorize([view, orm]), 'orm')
+        self.assertEqual(categorize([view, image]), 'images')
+        self.assertEqual(categorize([view]), 'view')
+        self.assertEqual(categorize(['/usr/lib/python3/json.py']), 'other')
+
+    def test_profile_url_rejects_empty_window(self):
+        """profile_url не принимает нулевое окно или число запросов."""
+        for option in ('--seconds', '--requests'):
+            with self.subTest(option=option):
+                with self.assertRaises(CommandError):
+                    call_command('profile_url', '/', option, '0')
@@ -0,0 +1,84 @@
+import os
+import sqlite3
+
+from django.core.cache import cache
+from django.db import connections
+from django.test import Client, TestCase, override_settings
+
+from core import routers
+from core.models import User
+from core.tests.utils import TempDirMixin
+from posts.models import Post
+
+
+@override_settings(REPLICA_DATABASES=['replica'])
+class PrimaryReplicaRouterTests(TempDirMixin, TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        connections.databases['replica'] = {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.path.join(cls.temp_dir, 'replica.sqlite3'),
+        }
+
+    @classmethod
+    def tearDownClass(cls):
+        connections['replica'].close()
+        del connections.databases['replica']
+        super().tearDownClass()
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username='TestUser')
+        cls.post = Post.objects.create(text='Тестовый текст', author=cls.user)
+
+    def setUp(self):
+        cache.clear()
+        routers._down_until.clear()
+        self.router = routers.PrimaryReplicaRouter()
+
+    def tearDown(self):
+        routers.reset_state()
+
+    def test_reads_go_to_replica_only_in_read_views(self):
+        """Чтение идёт в реплику только для read-only view без закрепления."""
+        sqlite3.connect(connections.databases['replica']['NAME']).close()
+        routers.reset_state()
+        self.assertIsNone(self.router.db_for_read(Post))
+        routers.use_replica(True)
+        self.assertEqual(self.router.db_for_read(Post), 'replica')
+        routers.reset_state(pinned=True)
+        routers.use_replica(True)
+        self.assertIsNone(self.router.db_for_read(Post))
+        self.assertEqual(self.router.db_for_write(Post), 'default')
+        self.assertFalse(self.router.allow_migrate('replica', 'posts'))
+
+    def test_unavailable_replica_falls_back_to_primary(self):
+        """Без файла реплики чтение идёт в основную базу."""
+        os.remove(connections.databases['replica']['NAME'])
+        routers.use_replica(True)
+        self.assertEqual(self.router.db_for_read(Post), 'default')
+        self.assertIn('replica', routers._down_until)
+
+    def test_write_pins_reads_to_primary(self):
+        """После записи браузер получает cookie закрепления."""
+        client = Client()
+        client.force_login(self.user)
+        response = client.post(
+            f'/posts/{self.post.pk}/comment/', {'text': 'Коммент'}
+        )
+        self.assertIn(routers.PIN_COOKIE, response.cookies)
+        response = Client().get('/')
+        self.assertNotIn(routers.PIN_COOKIE, response.cookies)
+
+    def test_sync_sqlite(self):
+        """Реплика получает копию основной базы через backup API."""
+        source = os.path.join(self.temp_dir, 'source.sqlite3')
+        target = os.path.join(self.temp_dir, 'target.sqlite3')
+        with sqlite3.connect(source) as connection:
+            connection.execute('CREATE TABLE t (value TEXT)')
+            connection.execute("INSERT INTO t VALUES ('x')")
+        routers.sync_sqlite(source, target)
+        with sqlite3.connect(target) as connection:
+            rows = connection.execute('SELECT value FROM t').fetchall()
+        self.assertEqual(rows, [('x',)])
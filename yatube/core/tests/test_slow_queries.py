@@ -0,0 +1,56 @@
+import json
+from io import StringIO
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+
+from core.models import User
+from core.slow_queries import fingerprint
+from core.tests.utils import TempDirMixin
+from posts.models import Post
+
+
+@override_settings(SLOW_QUERY_THRESHOLD_MS=0)
+class SlowQueryLogTests(TempDirMixin, TestCase):
+    temp_settings = {'SLOW_QUERY_LOG': 'slow.ndjson'}
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username='TestUser')
+        Post.objects.create(text='Тестовый текст', author=cls.user)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_fingerprint(self):
+        """Литералы, параметры и списки IN сводятся к одному шаблону."""
+        self.assertEqual(
+            fingerprint("SELECT * FROM t WHERE a = 5 AND b IN (%s, %s)"),
+            fingerprint("SELECT *  FROM t WHERE a = 'x' AND b IN (?, ?, ?)"),
+        )
+
+    def test_slow_query_logged_with_plan(self):
+        """Запрос записывается с view, местом вызова и планом."""
+        Client().get(f'/profile/{self.user}/')
+        with open(settings.SLOW_QUERY_LOG, encoding='utf-8') as file:
+            entries = [json.loads(line) for line in file]
+        entry = next(
+            entry for entry in entries
+            if entry['view'] == 'posts:profile'
+            and '"auth_user"."username" =' in entry['sql']
+        )
+        self.assertEqual(entry['params'], ['TestUser'])
+        self.assertTrue(entry['plan'])
+        self.assertTrue(entry['call_site'].startswith('posts/views.py'))
+
+    def test_report_command(self):
+        """manage.py slowqueries группирует записи по шаблону."""
+        Client().get('/')
+        out = StringIO()
+        call_command(
+            'slowqueries', '--file', settings.SLOW_QUERY_LOG, stdout=out
+        )
+        self.assertIn('posts_post', out.getvalue())
+        self.assertIn('posts:index', out.getvalue())
@@ -0,0 +1,148 @@
+import asyncio
+import os
+from unittest import mock
+
+from django.conf import settings
+from django.test import SimpleTestCase, override_settings
+
+from core import pubsub, sse
+from core.tests.utils import TempDirMixin
+
+
+@override_settings(PUBSUB_LOG_MAX_BYTES=200, SSE_POLL_INTERVAL=0.01)
+class PubSubTests(TempDirMixin, SimpleTestCase):
+    temp_settings = {'PUBSUB_LOG': 'pubsub.ndjson'}
+
+    def tearDown(self):
+        log = settings.PUBSUB_LOG
+        for path in (log, f'{log}.1'):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def test_tail_reads_new_events_across_rotation(self):
+        """Tail видит только новые события и не теряет их при ротации."""
+        pubsub.publish(['all'], {'id': 0})
+        tail = pubsub.Tail()
+        self.addCleanup(tail.close)
+        for pk in range(1, 11):
+            pubsub.publish(['all'], {'id': pk})
+            if pk % 4 == 0:
+                self.assertEqual(
+                    [event['data']['id'] for event in tail.read()],
+                    list(range(pk - 3, pk + 1))
+                )
+        self.assertTrue(os.path.exists(f'{settings.PUBSUB_LOG}.1'))
+        self.assertEqual(
+            [event['data']['id'] for event in tail.read()], [9, 10]
+        )
+        self.assertFalse(tail.missed)
+
+    def test_tail_reports_skipped_file(self):
+        """Файл, повёрнутый дважды между чтениями, отмечается missed."""
+        pubsub.publish(['all'], {'id': 0})
+        tail = pubsub.Tail()
+        self.addCleanup(tail.close)
+        for pk in range(1, 16):
+            pubsub.publish(['all'], {'id': pk})
+        ids = [event['data']['id'] for event in tail.read()]
+        self.assertTrue(tail.missed)
+        self.assertNotEqual(ids, list(range(1, 16)))
+        pubsub.publish(['all'], {'id': 16})
+        self.assertEqual(
+            [event['data']['id'] for event in tail.read()], [16]
+        )
+        self.assertFalse(tail.missed)
+
+    def test_tail_reports_skipped_file_before_new_one(self):
+        """Двойная ротация видна и до появления нового файла журнала."""
+        log = settings.PUBSUB_LOG
+        pubsub.publish(['all'], {'id': 0})
+        tail = pubsub.Tail()
+        self.addCleanup(tail.close)
+        for pk in (1, 2):
+            pubsub.publish(['all'], {'id': pk})
+            os.replace(log, f'{log}.1')
+        self.assertEqual(
+            [event['data']['id'] for event in tail.read()], [1]
+        )
+        self.assertTrue(tail.missed)
+
+    def test_hub_delivers_by_scope(self):
+        """Событие получают клиенты любой из его областей, по разу."""
+        hub = sse.Hub()
+        both = sse.Client(['all', 'author:1'])
+        other = sse.Client(['author:2'])
+        hub.subscribe(both)
+        hub.subscribe(other)
+        event = {'scopes': ['all', 'author:1'], 'data': {'id': 5}}
+        self.assertEqual(hub.dispatch(event), 1)
+        self.assertEqual(both.queue.qsize(), 1)
+        self.assertTrue(other.queue.empty())
+        hub.unsubscribe(both)
+        hub.unsubscribe(other)
+        self.assertFalse(hub.subscribers)
+
+    def test_token_is_signed(self):
+        token = sse.make_token(['author:1'])
+        self.assertEqual(sse.read_token(token), ['author:1'])
+        with self.assertRaises(sse.signing.BadSignature):
+            sse.read_token(token + 'x')
+
+    def test_token_is_stable_within_window(self):
+        """Токен меняется раз в TOKEN_WINDOW и живёт SSE_TOKEN_MAX_AGE."""
+        scopes = sorted(f'author:{pk}' for pk in range(100))
+        start = 1000 * sse.TOKEN_WINDOW
+        with mock.patch('time.time', return_value=start + 1):
+            token = sse.make_token(scopes)
+        with mock.patch('time.time', return_value=start + 2):
+            self.assertEqual(sse.make_token(scopes), token)
+            self.assertEqual(sse.read_token(token), scopes)
+        with mock.patch('time.time', return_value=start + sse.TOKEN_WINDOW):
+            self.assertNotEqual(sse.make_token(scopes), token)
+        expired = start + settings.SSE_TOKEN_MAX_AGE + 1
+        with mock.patch('time.time', return_value=expired):
+            with self.assertRaises(sse.signing.SignatureExpired):
+                sse.read_token(token)
+
+    def test_stream(self):
+        """Клиент с токеном получает событие, без токена — 403."""
+        async def scenario():
+            started = asyncio.get_running_loop().create_future()
+            serving = asyncio.ensure_future(sse.serve(
+                '127.0.0.1', 0,
+                ready=lambda *args: started.set_result(args)
+            ))
+            server, hub = await started
+            port = server.sockets[0].getsockname()[1]
+
+            async def request(query):
+                reader, writer = await asyncio.open_connection(
+                    '127.0.0.1', port
+                )
+                writer.write(
+                    f'GET /events/?{query} HTTP/1.1\r\n\r\n'.encode()
+                )
+                return reader, writer
+
+            reader, writer = await request('token=bad')
+            forbidden = await reader.readline()
+            writer.close()
+            token = sse.make_token(['author:1'])
+            reader, writer = await request(f'token={token}')
+            headers = await reader.readuntil(b'retry: 3000\n\n')
+            pubsub.publish(['author:2'], {'id': 1})
+            pubsub.publish(['all', 'author:1'], {'id': 2})
+            event = await asyncio.wait_for(reader.readuntil(b'\n\n'), 5)
+            writer.close()
+            for _ in range(500):
+                if not hub.subscribers:
+                    break
+                await asyncio.sleep(0.01)
+            serving.cancel()
+            return forbidden, headers, event, hub
+
+        forbidden, headers, event, hub = asyncio.run(scenario())
+        self.assertIn(b'403', forbidden)
+        self.assertIn(b'text/event-stream', headers)
+        self.assertEqual(event, b'event: post\ndata: {"id": 2}\n\n')
+        self.assertFalse(hub.subscribers)
@@ -0,0 +1,116 @@
+import gzip
+import json
+import os
+from wsgiref.util import setup_testing_defaults
+
+import brotli
+from django.conf import settings
+from django.core.management import call_command
+from django.test import SimpleTestCase, override_settings
+
+from core.staticfiles import IMMUTABLE, StaticFiles
+from core.tests.utils import TempDirMixin
+
+CSS = b'body { color: #000; }\n' * 200
+
+
+@override_settings(
+    STATICFILES_FINDERS=[
+        'django.contrib.staticfiles.finders.FileSystemFinder'
+    ],
+)
+class StaticFilesTests(TempDirMixin, SimpleTestCase):
+    temp_settings = {'STATIC_ROOT': 'root'}
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        source = os.path.join(cls.temp_dir, 'source')
+        os.makedirs(os.path.join(source, 'css'))
+        with open(os.path.join(source, 'css', 'site.css'), 'wb') as file:
+            file.write(CSS)
+        with open(os.path.join(source, 'logo.png'), 'wb') as file:
+            file.write(os.urandom(1000))
+        with override_settings(STATICFILES_DIRS=[source]):
+            call_command('collectstatic', interactive=False, verbosity=0)
+        root = settings.STATIC_ROOT
+        with open(os.path.join(root, 'staticfiles.json')) as manifest:
+            cls.hashed = json.load(manifest)['paths']['css/site.css']
+
+    def setUp(self):
+        self.app = StaticFiles(self.django)
+        self.django_calls = 0
+
+    def django(self, environ, start_response):
+        self.django_calls += 1
+        start_response('200 OK', [])
+        return [b'django']
+
+    def get(self, path, **environ):
+        environ['PATH_INFO'] = path
+        setup_testing_defaults(environ)
+        response = {}
+
+        def start_response(status, headers):
+            response['status'] = status
+            response['headers'] = dict(headers)
+
+        body = b''.join(self.app(environ, start_response))
+        return response['status'], response['headers'], body
+
+    def test_compressed_siblings(self):
+        """Рядом с CSS лежат .gz и .br, рядом с картинкой — нет."""
+        root = settings.STATIC_ROOT
+        path = os.path.join(root, self.hashed)
+        with open(path + '.gz', 'rb') as file:
+            data = file.read()
+        self.assertEqual(gzip.decompress(data), CSS)
+        # Нулевое время в заголовке: копия не меняется от сборки к сборке.
+        self.assertEqual(data[4:8], b'\0\0\0\0')
+        with open(path + '.br', 'rb') as file:
+            self.assertEqual(brotli.decompress(file.read()), CSS)
+        self.assertFalse(os.path.exists(os.path.join(root, 'logo.png.gz')))
+
+    def test_negotiation(self):
+        url = '/static/' + self.hashed
+        for accept, encoding, body in (
+            ('gzip, deflate, br', 'br', brotli.compress),
+            ('gzip', 'gzip', gzip.compress),
+            ('br;q=0, gzip', 'gzip', gzip.compress),
+            ('', None, None),
+        ):
+            with self.subTest(accept=accept):
+                status, headers, content = self.get(
+                    url, HTTP_ACCEPT_ENCODING=accept
+                )
+                self.assertEqual(status, '200 OK')
+                self.assertEqual(headers.get('Content-Encoding'), encoding)
+                self.assertEqual(headers['Vary'], 'Accept-Encoding')
+                self.assertEqual(headers['Cache-Control'], IMMUTABLE)
+                self.assertEqual(headers['Content-Type'], 'text/css')
+                self.assertEqual(
+                    int(headers['Content-Length']), len(content)
+                )
+                if encoding == 'br':
+                    content = brotli.decompress(content)
+                elif encoding == 'gzip':
+                    content = gzip.decompress(content)
+                self.assertEqual(content, CSS)
+        self.assertEqual(self.django_calls, 0)
+
+    def test_unhashed_and_not_modified(self):
+        status, headers, _ = self.get('/static/logo.png')
+        self.assertEqual(status, '200 OK')
+        self.assertNotIn('immutable', headers['Cache-Control'])
+        self.assertNotIn('Vary', headers)
+        status, _, content = self.get(
+            '/static/logo.png', HTTP_IF_NONE_MATCH=headers['ETag']
+        )
+        self.assertEqual((status, content), ('304 Not Modified', b''))
+
+    def test_static_requests_skip_django(self):
+        status, _, _ = self.get('/static/missing.css')
+        self.assertEqual(status, '404 Not Found')
+        self.assertEqual(self.django_calls, 0)
+        self.assertEqual(self.get('/about/')[2], b'django')
+        self.assertEqual(self.django_calls, 1)
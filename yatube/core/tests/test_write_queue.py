@@ -0,0 +1,82 @@
+import threading
+from concurrent.futures import TimeoutError
+
+from django.db import IntegrityError, connection
+from django.test import Client, TestCase, TransactionTestCase
+from django.test import override_settings
+
+from core.models import User
+from core.write_queue import WriteQueue, run_write, write_queue
+from posts.models import Comment, Group, Post
+
+
+class SQLitePragmaTests(TestCase):
+    def test_busy_timeout(self):
+        """Соединение SQLite получает busy_timeout из настроек."""
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA busy_timeout')
+            self.assertEqual(cursor.fetchone()[0], 5000)
+
+
+class WriteQueueTests(TransactionTestCase):
+    def test_batch_commit(self):
+        """Записи выполняются и фиксируются пачками."""
+        write_queue = WriteQueue(batch_size=10, max_delay=0.05)
+        futures = [
+            write_queue.submit(
+                Group.objects.create,
+                title=f'Группа {i}', slug=f'group-{i}', description='',
+            )
+            for i in range(5)
+        ]
+        groups = [future.result(5) for future in futures]
+        self.assertEqual(Group.objects.count(), 5)
+        self.assertEqual(groups[0].slug, 'group-0')
+        self.assertLess(write_queue.batches, 5)
+
+    def test_failed_write_isolated(self):
+        """Ошибка одной записи не отменяет остальные записи пачки."""
+        write_queue = WriteQueue(batch_size=10, max_delay=0.05)
+        futures = [
+            write_queue.submit(
+                Group.objects.create, title='Группа', slug=slug,
+                description='',
+            )
+            for slug in ('same', 'same', 'other')
+        ]
+        futures[0].result(5)
+        with self.assertRaises(IntegrityError):
+            futures[1].result(5)
+        futures[2].result(5)
+        self.assertEqual(Group.objects.count(), 2)
+
+    @override_settings(WRITE_QUEUE_ENABLED=True)
+    def test_add_comment_through_queue(self):
+        """Комментарий сохраняется через очередь записи."""
+        user = User.objects.create(username='TestUser')
+        post = Post.objects.create(text='Тестовый текст', author=user)
+        client = Client()
+        client.force_login(user)
+        client.post(f'/posts/{post.pk}/comment/', {'text': 'Коммент'})
+        self.assertTrue(Comment.objects.filter(text='Коммент').exists())
+
+    @override_settings(WRITE_QUEUE_ENABLED=True, WRITE_QUEUE_TIMEOUT=0.05)
+    def test_timed_out_write_not_executed(self):
+        """Запись, не начатая за WRITE_QUEUE_TIMEOUT, не выполняется."""
+        started, release = threading.Event(), threading.Event()
+
+        def block():
+            started.set()
+            release.wait(5)
+
+        blocker = write_queue.submit(block)
+        started.wait(5)
+        with self.assertRaises(TimeoutError):
+            run_write(
+                Group.objects.create, title='Группа', slug='late',
+                description='',
+            )
+        release.set()
+        blocker.result(5)
+        write_queue.submit(lambda: None).result(5)
+        self.assertFalse(Group.objects.filter(slug='late').exists())
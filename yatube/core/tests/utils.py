@@ -0,0 +1,41 @@
+import os
+import shutil
+import tempfile
+
+from django.test import override_settings
+
+
+class TempDirMixin:
+    """Временный каталог класса тестов в системном каталоге tmp.
+
+    temp_settings — {настройка: путь внутри каталога}; пустой путь
+    означает сам каталог. Каталог создаётся при запуске класса и
+    удаляется после него.
+    """
+    temp_settings = {}
+
+    @classmethod
+    def setUpClass(cls):
+        cls.temp_dir = tempfile.mkdtemp()
+        cls._temp_override = override_settings(**{
+            name: os.path.join(cls.temp_dir, path) if path else cls.temp_dir
+            for name, path in cls.temp_settings.items()
+        })
+        cls._temp_override.enable()
+        try:
+            super().setUpClass()
+        except Exception:
+            cls._remove_temp_dir()
+            raise
+
+    @classmethod
+    def tearDownClass(cls):
+        try:
+            super().tearDownClass()
+        finally:
+            cls._remove_temp_dir()
+
+    @classmethod
+    def _remove_temp_dir(cls):
+        cls._temp_override.disable()
+        shutil.rmtree(cls.temp_dir, ignore_errors=True)
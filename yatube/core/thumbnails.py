@@ -0,0 +1,18 @@
+"""Бэкенд sorl-thumbnail с замером времени создания миниатюр."""
+import time
+
+from sorl.thumbnail.base import ThumbnailBackend
+
+from core import metrics
+
+
+class TimedThumbnailBackend(ThumbnailBackend):
+    def _create_thumbnail(self, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return super()._create_thumbnail(*args, **kwargs)
+        finally:
+            metrics.registry.observe(
+                'yatube_thumbnail_generation_seconds',
+                time.perf_counter() - start,
+            )
@@ -1,8 +1,47 @@
+from datetime import date
+
+from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import (
+    HttpResponse, HttpResponseBadRequest, HttpResponseForbidden
+)
 from django.shortcuts import render
+from django.template.loader import render_to_string
+from django.utils.html import escape
+from django.views.decorators.http import require_http_methods
+
+from core import memory, metrics
+
+_PATH_MARKER = '__not_found_path__'
+_not_found_page = {}
+
+
+def _not_found_parts(request):
+    """Страница 404 для гостя, отрисованная один раз в день.
+
+    Возвращает байты до и после адреса страницы.
+    """
+    today = date.today()
+    if _not_found_page.get('date') != today:
+        content = render_to_string(
+            'core/404.html', {'path': _PATH_MARKER}, request
+        )
+        _not_found_page['parts'] = [
+            part.encode() for part in content.split(_PATH_MARKER, 1)
+        ]
+        _not_found_page['date'] = today
+    return _not_found_page['parts']
 
 
 def page_not_found(request, exception):
-    return render(request, 'core/404.html', {'path': request.path}, status=404)
+    if request.user.is_authenticated:
+        return render(
+            request, 'core/404.html', {'path': request.path}, status=404
+        )
+    before, after = _not_found_parts(request)
+    return HttpResponse(
+        before + escape(request.path).encode() + after, status=404
+    )
 
 
 def server_error(request):
@@ -15,3 +54,65 @@ def permission_denied(request, exception):
 
 def csrf_failure(request, reason=''):
     return render(request, 'core/403csrf.html')
+
+
+def metrics_view(request):
+    if request.META.get('REMOTE_ADDR') not in settings.METRICS_ALLOWED_IPS:
+        return HttpResponseForbidden()
+    return HttpResponse(
+        metrics.render(metrics.collect()),
+        content_type='text/plain; version=0.0.4; charset=utf-8',
+    )
+
+
+def _memory_report(limit):
+    lines = [f'tracemalloc: {"on" if memory.is_tracing() else "off"}']
+    for view, growth in sorted(memory.view_growth.items()):
+        lines.append(
+            f'{view}: {growth["requests"]} запросов, '
+            f'{growth["bytes"] / 1024:+.1f} KiB'
+        )
+    if memory.snapshots:
+        label, last = memory.snapshots[-1]
+        lines.append(f'\nТоп выделений ({label or "последний снимок"}):')
+        lines.extend(memory.top(last, limit))
+        lines.append('\nПо view и тегам шаблонов:')
+        lines.extend(
+            f'{size / 1024:10.1f} KiB {place}'
+            for place, size in memory.attribute(last)[:limit]
+        )
+    if len(memory.snapshots) > 1:
+        lines.append('\nРазница двух последних снимков:')
+        lines.extend(memory.diff(memory.snapshots[-2][1], last, limit))
+    return '\n'.join(lines)
+
+
+@staff_member_required
+@require_http_methods(['GET', 'POST'])
+def memory_view(request):
+    """Управление tracemalloc в текущем воркере.
+
+    POST с action=start|snapshot|stop меняет состояние. Страница выводит
+    прирост памяти по view, топ мест выделения (?limit=, по умолчанию 20)
+    и разницу двух последних снимков.
+    """
+    try:
+        limit = int(request.GET.get('limit', 20))
+    except ValueError:
+        limit = 0
+    if limit <= 0:
+        return HttpResponseBadRequest('limit должен быть положительным')
+    if request.method == 'POST':
+        action = request.POST.get('action')
+        if action == 'start':
+            memory.start()
+        elif action == 'snapshot':
+            memory.take_snapshot(request.POST.get('label', ''))
+        elif action == 'stop':
+            memory.stop()
+        else:
+            return HttpResponseBadRequest('Неизвестное действие')
+    return render(request, 'core/memory.html', {
+        'report': _memory_report(limit),
+        'tracing': memory.is_tracing(),
+    })
@@ -0,0 +1,133 @@
+"""Очередь записи: мелкие записи выполняет один поток пачками.
+
+SQLite допускает одного писателя, и при нескольких воркерах отдельные
+короткие транзакции упираются в блокировку. Очередь забирает записи,
+накопившиеся за время предыдущей фиксации (и, если задано, ждёт ещё
+WRITE_QUEUE_MAX_DELAY секунд), не больше WRITE_QUEUE_BATCH_SIZE, и
+фиксирует их одной транзакцией (group commit). Каждая запись выполняется
+в своей точке сохранения, так что ошибка одной не отменяет остальные.
+
+Очередь своя у каждого процесса: записи одного воркера идут по очереди,
+но воркеры пишут параллельно и по-прежнему ждут блокировку SQLite
+(busy_timeout). Если запись не начала выполняться за WRITE_QUEUE_TIMEOUT
+секунд, она снимается с очереди; начатая запись дожидается фиксации.
+"""
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, close_old_connections, transaction
+
+from core import metrics, routers
+
+
+class WriteQueue:
+    def __init__(self, using=DEFAULT_DB_ALIAS, batch_size=None,
+                 max_delay=None):
+        self.using = using
+        self.batch_size = batch_size or settings.WRITE_QUEUE_BATCH_SIZE
+        self.max_delay = (
+            settings.WRITE_QUEUE_MAX_DELAY if max_delay is None else max_delay
+        )
+        self.queue = queue.Queue()
+        self.batches = 0
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def submit(self, func, *args, **kwargs):
+        """Ставит func(*args, **kwargs) в очередь, возвращает Future."""
+        future = Future()
+        self.queue.put((future, func, args, kwargs))
+        self._ensure_thread()
+        return future
+
+    def depth(self):
+        return self.queue.qsize()
+
+    def _ensure_thread(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, name='write-queue', daemon=True
+                )
+                self._thread.start()
+
+    def _collect(self):
+        """Берёт всё, что накопилось, пока шла предыдущая фиксация."""
+        batch = [self.queue.get()]
+        deadline = time.monotonic() + self.max_delay
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self.queue.get_nowait())
+                continue
+            except queue.Empty:
+                pass
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(self.queue.get(timeout=timeout))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            # Как в начале и в конце запроса: соединение, закрытое сервером
+            # или старше CONN_MAX_AGE, переоткрывается.
+            close_old_connections()
+            try:
+                self._commit(batch)
+            finally:
+                close_old_connections()
+
+    def _commit(self, batch):
+        results = []
+        try:
+            with transaction.atomic(using=self.using):
+                for future, func, args, kwargs in batch:
+                    # Отменённая по таймауту запись пропускается.
+                    if not future.set_running_or_notify_cancel():
+                        continue
+                    try:
+                        with transaction.atomic(using=self.using):
+                            result = func(*args, **kwargs)
+                    except Exception as error:
+                        results.append((future, None, error))
+                    else:
+                        results.append((future, result, None))
+        except Exception as error:
+            for future, *_ in results:
+                future.set_exception(error)
+            return
+        self.batches += 1
+        for future, result, error in results:
+            if error is None:
+                future.set_result(result)
+            else:
+                future.set_exception(error)
+
+
+write_queue = WriteQueue()
+metrics.registry.register_gauge(
+    'yatube_write_queue_depth', 'Записи, ожидающие в очереди записи.',
+    write_queue.depth,
+)
+
+
+def run_write(func, *args, **kwargs):
+    """Выполняет запись через очередь, если она включена, иначе сразу."""
+    if not settings.WRITE_QUEUE_ENABLED:
+        return func(*args, **kwargs)
+    routers.note_write()
+    future = write_queue.submit(func, *args, **kwargs)
+    try:
+        return future.result(settings.WRITE_QUEUE_TIMEOUT)
+    except TimeoutError:
+        if future.cancel():
+            raise
+    # Запись уже выполняется, её результат нужно дождаться.
+    return future.result()
@@ -1,5 +1,33 @@
 from django.apps import AppConfig
+from django.core import checks
+from django.core.signals import request_finished
+from django.db.models.signals import post_migrate
 
 
 class PostsConfig(AppConfig):
     name = 'posts'
+
+    def ready(self):
+        from core import object_cache
+        from posts import (
+            counters, follow_cache, hashtags, live, recommendations,
+            rendering, sharding, trending, view_counter
+        )
+        from posts.checks import check_view_dedupe_cache
+        from posts.models import Group, Post
+        checks.register(
+            check_view_dedupe_cache, checks.Tags.caches, deploy=True
+        )
+        post_migrate.connect(sharding.seed_after_migrate, sender=self)
+        object_cache.register(Post)
+        object_cache.register(Group, ['slug'])
+        counters.connect()
+        trending.connect()
+        recommendations.connect()
+        follow_cache.connect()
+        hashtags.connect()
+        rendering.connect()
+        live.connect()
+        request_finished.connect(
+            view_counter.accumulator.flush_if_due, weak=False
+        )
@@ -0,0 +1,20 @@
+"""Проверки настроек приложения posts."""
+from django.conf import settings
+from django.core import checks
+
+from core.cache import is_process_local
+
+
+def check_view_dedupe_cache(app_configs, **kwargs):
+    """Отметки о просмотрах должны быть видны всем воркерам."""
+    if not is_process_local(settings.POST_VIEWS_DEDUPE_CACHE):
+        return []
+    return [checks.Error(
+        'POST_VIEWS_DEDUPE_CACHE требует общего для процессов кэша.',
+        hint=(
+            'В кэше процесса каждый воркер помнит только свои просмотры, '
+            'и зритель учитывается по разу в каждом. Укажите кэш на '
+            'Redis, Memcached или базе данных.'
+        ),
+        id='posts.E001',
+    )]
@@ -0,0 +1,178 @@
+"""Денормализованные счётчики постов, комментариев и подписок.
+
+Обработчики сигналов меняют счётчик одним UPDATE с F-выражением, так что
+одновременные записи не теряют друг друга. Комментарии к посту и
+подписчики автора бывают «горячими», поэтому идут через шардированные
+счётчики core.counters, а поля comments_count и followers_count получают
+их сумму при сбросе. Изменения через update() и bulk_create() сигналов не
+посылают; расхождения исправляет команда recount_counters.
+"""
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.db.models.signals import post_delete, post_save, pre_save
+
+from core import counters, object_cache
+from core.models import User
+from posts import sharding
+from posts.models import Comment, Follow, Group, Post, UserCounters
+
+
+def _add(queryset, field, delta):
+    return queryset.update(**{field: F(field) + delta})
+
+
+def add_user(user_id, field, delta):
+    # Строка создаётся только при увеличении: при удалении пользователя
+    # его счётчики могут быть уже удалены каскадом.
+    counters = UserCounters.objects.filter(user_id=user_id)
+    if not _add(counters, field, delta) and delta > 0:
+        UserCounters.objects.get_or_create(user_id=user_id)
+        _add(counters, field, delta)
+
+
+def add_group(group_id, delta):
+    if group_id is not None:
+        _add(Group.objects.filter(pk=group_id), 'posts_count', delta)
+        object_cache.forget(Group, group_id)
+
+
+def user_saved(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        UserCounters.objects.get_or_create(user=instance)
+
+
+def post_pre_save(sender, instance, raw=False, **kwargs):
+    if raw or instance._state.adding:
+        return
+    instance._previous_group_id = Post.objects.using(
+        instance._state.db
+    ).filter(pk=instance.pk).values_list('group_id', flat=True).first()
+
+
+def post_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        add_user(instance.author_id, 'posts_count', 1)
+        add_group(instance.group_id, 1)
+        return
+    previous = getattr(instance, '_previous_group_id', instance.group_id)
+    if previous != instance.group_id:
+        add_group(previous, -1)
+        add_group(instance.group_id, 1)
+
+
+def post_deleted(sender, instance, **kwargs):
+    add_user(instance.author_id, 'posts_count', -1)
+    add_group(instance.group_id, -1)
+
+
+def comment_saved(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        counters.increment('comments', instance.post_id)
+
+
+def comment_deleted(sender, instance, **kwargs):
+    counters.increment('comments', instance.post_id, -1)
+
+
+def follow_saved(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        counters.increment('followers', instance.author_id)
+        add_user(instance.user_id, 'following_count', 1)
+
+
+def follow_deleted(sender, instance, **kwargs):
+    counters.increment('followers', instance.author_id, -1)
+    add_user(instance.user_id, 'following_count', -1)
+
+
+def write_comments_count(totals):
+    for database in sharding.databases():
+        for post_id, total in totals.items():
+            Post.objects.using(database).filter(pk=post_id).update(
+                comments_count=total
+            )
+    for post_id in totals:
+        object_cache.forget(Post, post_id)
+
+
+def write_followers_count(totals):
+    for user_id, total in totals.items():
+        UserCounters.objects.filter(user_id=user_id).update(
+            followers_count=total
+        )
+
+
+def connect():
+    post_save.connect(user_saved, sender=User)
+    pre_save.connect(post_pre_save, sender=Post)
+    post_save.connect(post_saved, sender=Post)
+    post_delete.connect(post_deleted, sender=Post)
+    post_save.connect(comment_saved, sender=Comment)
+    post_delete.connect(comment_deleted, sender=Comment)
+    post_save.connect(follow_saved, sender=Follow)
+    post_delete.connect(follow_deleted, sender=Follow)
+    counters.register('comments', write_comments_count)
+    counters.register('followers', write_followers_count)
+
+
+def _count(queryset, field):
+    return Coalesce(Subquery(
+        queryset.filter(**{field: OuterRef('pk')}).order_by()
+        .values(field).annotate(total=Count('pk')).values('total')
+    ), 0)
+
+
+def recount_users(user_ids):
+    """Пересчитывает счётчики пользователей с заданными id."""
+    for user_id in user_ids:
+        UserCounters.objects.get_or_create(user_id=user_id)
+    posts_count = dict.fromkeys(user_ids, 0)
+    for database in sharding.databases():
+        rows = Post.objects.using(database).filter(
+            author_id__in=user_ids
+        ).order_by().values('author_id').annotate(total=Count('pk'))
+        for row in rows:
+            posts_count[row['author_id']] += row['total']
+    follows = Follow.objects.using(DEFAULT_DB_ALIAS)
+    rows = UserCounters.objects.filter(user_id__in=user_ids)
+    rows.update(
+        followers_count=_count(follows, 'author'),
+        following_count=_count(follows, 'user'),
+    )
+    for user_id, total in posts_count.items():
+        rows.filter(user_id=user_id).update(posts_count=total)
+    counters.reset('followers', dict(
+        rows.values_list('user_id', 'followers_count')
+    ))
+
+
+def recount_groups():
+    totals = {}
+    for database in sharding.databases():
+        rows = Post.objects.using(database).filter(
+            group__isnull=False
+        ).order_by().values('group_id').annotate(total=Count('pk'))
+        for row in rows:
+            totals[row['group_id']] = (
+                totals.get(row['group_id'], 0) + row['total']
+            )
+    for group in Group.objects.all():
+        Group.objects.filter(pk=group.pk).update(
+            posts_count=totals.get(group.pk, 0)
+        )
+        object_cache.forget(Group, group.pk)
+
+
+def recount_comments(database, post_ids):
+    posts = Post.objects.using(database).filter(pk__in=post_ids)
+    posts.update(
+        comments_count=_count(Comment.objects.using(database), 'post')
+    )
+    counters.reset('comments', dict(
+        posts.values_list('pk', 'comments_count')
+    ))
+    for post_id in post_ids:
+        object_cache.forget(Post, post_id)
@@ -0,0 +1,67 @@
+"""Кэш подписок пользователя для проверки кнопок «Подписаться».
+
+Id авторов, на которых подписан пользователь, загружаются одним запросом
+и хранятся в кэше как отсортированный массив int64 в байтах. Проверка
+одного автора — бинарный поиск, пачки авторов — np.isin. Кэш сбрасывается
+сигналами при создании и удалении Follow, в том числе через
+QuerySet.delete(). version() входит в ключи кэшированных фрагментов с
+кнопками подписки, чтобы они не показывали устаревшее состояние.
+"""
+import hashlib
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save
+
+from posts.models import Follow
+
+
+def _cache_key(user_id):
+    return f'following:{user_id}'
+
+
+def following_ids(user):
+    """Отсортированный массив id авторов, на которых подписан user."""
+    if not user.is_authenticated:
+        return np.empty(0, np.int64)
+    key = _cache_key(user.pk)
+    packed = cache.get(key)
+    if packed is None:
+        ids = np.sort(np.fromiter(
+            Follow.objects.filter(user_id=user.pk)
+            .values_list('author_id', flat=True),
+            np.int64
+        ))
+        cache.set(key, ids.tobytes(), settings.FOLLOW_CACHE_TIMEOUT)
+        return ids
+    return np.frombuffer(packed, np.int64)
+
+
+def is_following(user, author_id):
+    ids = following_ids(user)
+    index = np.searchsorted(ids, author_id)
+    return bool(index < len(ids) and ids[index] == author_id)
+
+
+def is_following_many(user, author_ids):
+    """{id автора: подписан ли на него user} для всех author_ids."""
+    author_ids = list(author_ids)
+    found = np.isin(np.array(author_ids, np.int64), following_ids(user))
+    return dict(zip(author_ids, found.tolist()))
+
+
+def version(user):
+    """Короткий отпечаток подписок user для ключей кэша фрагментов."""
+    return hashlib.blake2b(
+        following_ids(user).tobytes(), digest_size=8
+    ).hexdigest()
+
+
+def invalidate(sender, instance, **kwargs):
+    cache.delete(_cache_key(instance.user_id))
+
+
+def connect():
+    post_save.connect(invalidate, sender=Follow)
+    post_delete.connect(invalidate, sender=Follow)
@@ -0,0 +1,84 @@
+"""Граф подписок в виде разреженных массивов CSR.
+
+Пользователи нумеруются подряд по возрастанию id (FollowGraph.ids), и
+для каждого хранятся отсортированные номера тех, на кого он подписан
+(following), и его подписчиков (followers). Граф грузится из Follow
+пачками сразу в массивы NumPy, без создания объектов моделей.
+"""
+import numpy as np
+
+from posts.models import Follow
+
+
+class CSR:
+    """Строки разреженной матрицы: indices[indptr[i]:indptr[i + 1]]."""
+
+    def __init__(self, rows, columns, size):
+        order = np.lexsort((columns, rows))
+        self.indices = columns[order].astype(np.int32)
+        self.indptr = np.zeros(size + 1, np.int64)
+        np.cumsum(np.bincount(rows, minlength=size), out=self.indptr[1:])
+
+    @property
+    def nbytes(self):
+        return self.indices.nbytes + self.indptr.nbytes
+
+    def degrees(self):
+        return np.diff(self.indptr)
+
+    def row(self, index):
+        return self.indices[self.indptr[index]:self.indptr[index + 1]]
+
+    def rows(self, indices, limit=None):
+        """Строки подряд и их длины; limit обрезает каждую строку."""
+        starts = self.indptr[indices]
+        lengths = self.indptr[np.asarray(indices) + 1] - starts
+        if limit is not None:
+            lengths = np.minimum(lengths, limit)
+        offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+        return self.indices[offsets + np.arange(offsets.size)], lengths
+
+
+class FollowGraph:
+    def __init__(self, users, authors):
+        users = np.asarray(users, np.int64)
+        authors = np.asarray(authors, np.int64)
+        self.ids = np.unique(np.concatenate((users, authors)))
+        users = np.searchsorted(self.ids, users)
+        authors = np.searchsorted(self.ids, authors)
+        self.following = CSR(users, authors, len(self.ids))
+        self.followers = CSR(authors, users, len(self.ids))
+
+    @classmethod
+    def load(cls, batch_size=100000):
+        """Читает все подписки пачками по batch_size строк."""
+        users, authors = [], []
+        last_pk = 0
+        while True:
+            rows = np.array(
+                Follow.objects.filter(pk__gt=last_pk).order_by('pk')
+                .values_list('pk', 'user_id', 'author_id')[:batch_size],
+                np.int64
+            ).reshape(-1, 3)
+            if not len(rows):
+                break
+            last_pk = int(rows[-1, 0])
+            users.append(rows[:, 1])
+            authors.append(rows[:, 2])
+        empty = [np.empty(0, np.int64)]
+        return cls(
+            np.concatenate(users or empty), np.concatenate(authors or empty)
+        )
+
+    @property
+    def nbytes(self):
+        return (
+            self.ids.nbytes + self.following.nbytes + self.followers.nbytes
+        )
+
+    def index(self, user_id):
+        """Номер пользователя в графе или None, если подписок у него нет."""
+        index = np.searchsorted(self.ids, user_id)
+        if index < len(self.ids) and self.ids[index] == user_id:
+            return int(index)
+        return None
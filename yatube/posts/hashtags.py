@@ -0,0 +1,102 @@
+"""Теги (#тег) и упоминания (@username) в текстах постов.
+
+При сохранении поста теги и упоминания разбираются из текста и
+записываются в PostTag и Mention вместе с датой публикации, так что
+ленты /tag/<name>/ и /mentions/ читаются по индексу (тег или
+пользователь, дата) постранично по ключу (core.keyset). Теги
+приводятся к нижнему регистру; упоминания несуществующих пользователей
+пропускаются. Посты, сохранённые в обход save(), переразбирает команда
+index_hashtags.
+"""
+import re
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+
+from core import keyset
+from core.models import User
+from posts.models import Mention, Post, PostTag, Tag
+
+TAG_RE = re.compile(r'(?<![\w&#])#(\w+)')
+MENTION_RE = re.compile(r'(?<![\w@])@([\w.+-]+)')
+TAG_MAX_LENGTH = Tag._meta.get_field('name').max_length
+
+
+def extract_tags(text):
+    """Нормализованные теги текста; #1 и #___ — не теги."""
+    return sorted({
+        tag.casefold() for tag in TAG_RE.findall(text)
+        if len(tag) <= TAG_MAX_LENGTH and tag.strip('_')
+        and not tag.isdigit()
+    })
+
+
+def extract_mentions(text):
+    # Точка в конце — обычно конец предложения, а не часть имени.
+    names = {name.rstrip('.') for name in MENTION_RE.findall(text)}
+    return sorted(names - {''})
+
+
+def parse(pk, pub_date, text):
+    return pk, pub_date, extract_tags(text), extract_mentions(text)
+
+
+def parse_chunk(rows):
+    """Разбирает [(id, pub_date, text)]; не обращается к базе."""
+    return [parse(*row) for row in rows]
+
+
+def store(parsed):
+    """Заменяет теги и упоминания постов результатами parse()."""
+    names = {tag for _, _, tags, _ in parsed for tag in tags}
+    usernames = {name for _, _, _, mentions in parsed for name in mentions}
+    post_ids = [pk for pk, _, _, _ in parsed]
+    with transaction.atomic():
+        Tag.objects.bulk_create(
+            (Tag(name=name) for name in names), ignore_conflicts=True
+        )
+        tag_ids = dict(
+            Tag.objects.filter(name__in=names).values_list('name', 'pk')
+        )
+        user_ids = dict(
+            User.objects.filter(username__in=usernames)
+            .values_list('username', 'pk')
+        )
+        PostTag.objects.filter(post_id__in=post_ids).delete()
+        Mention.objects.filter(post_id__in=post_ids).delete()
+        PostTag.objects.bulk_create(
+            PostTag(tag_id=tag_ids[tag], post_id=pk, pub_date=pub_date)
+            for pk, pub_date, tags, _ in parsed for tag in tags
+        )
+        Mention.objects.bulk_create(
+            Mention(user_id=user_ids[name], post_id=pk, pub_date=pub_date)
+            for pk, pub_date, _, mentions in parsed for name in mentions
+            if name in user_ids
+        )
+
+
+def feed(queryset, cursor, size):
+    """Посты страницы строк PostTag или Mention и курсор следующей."""
+    rows, next_cursor = keyset.page(
+        queryset, cursor, size, pk_field='post_id'
+    )
+    ids = [row.post_id for row in rows]
+    posts = {
+        post.pk: post for post in Post.objects.feed().filter(pk__in=ids)
+    }
+    return [posts[pk] for pk in ids if pk in posts], next_cursor
+
+
+def post_saved(sender, instance, raw=False, **kwargs):
+    if not raw:
+        store([parse(instance.pk, instance.pub_date, instance.text)])
+
+
+def post_deleted(sender, instance, **kwargs):
+    PostTag.objects.filter(post_id=instance.pk).delete()
+    Mention.objects.filter(post_id=instance.pk).delete()
+
+
+def connect():
+    post_save.connect(post_saved, sender=Post)
+    post_delete.connect(post_deleted, sender=Post)
@@ -0,0 +1,45 @@
+"""Уведомления о новых постах для открытых лент.
+
+После фиксации транзакции с новым постом в журнал core.pubsub пишется
+событие с курсором поста для областей 'all' (главная), 'author:<id>'
+(ленты подписчиков автора) и 'group:<id>'; его читают sidecar и
+posts.recent. Страница ленты получает от token() подписанный список
+своих областей и слушает sidecar core.sse по адресу SSE_URL.
+"""
+from django.db import transaction
+from django.db.models.signals import post_save
+
+from core import keyset, pubsub, sse
+from posts import follow_cache
+from posts.models import Post
+
+
+def token(user=None):
+    """Токен для ленты подписок user или, без user, для главной."""
+    if user is None:
+        return sse.make_token(['all'])
+    scopes = [
+        f'author:{author_id}'
+        for author_id in follow_cache.following_ids(user).tolist()
+    ]
+    return sse.make_token(scopes) if scopes else None
+
+
+def post_saved(sender, instance, created, raw=False, **kwargs):
+    if not created or raw:
+        return
+    scopes = ['all', f'author:{instance.author_id}']
+    if instance.group_id is not None:
+        scopes.append(f'group:{instance.group_id}')
+    data = {
+        'id': instance.pk,
+        'author': instance.author_id,
+        'cursor': keyset.encode(instance.pub_date, instance.pk),
+    }
+    transaction.on_commit(
+        lambda: pubsub.publish(scopes, data), using=kwargs['using']
+    )
+
+
+def connect():
+    post_save.connect(post_saved, sender=Post)
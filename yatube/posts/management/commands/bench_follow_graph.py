@@ -0,0 +1,74 @@
+import time
+import tracemalloc
+
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from core.benchmark import percentile
+from posts import recommendations
+from posts.follow_graph import FollowGraph
+
+
+def synthetic_edges(users, edges, seed):
+    """edges разных подписок с популярностью авторов по закону Ципфа."""
+    rng = np.random.default_rng(seed)
+    pairs = np.empty(0, np.int64)
+    while len(pairs) < edges:
+        missing = edges - len(pairs)
+        followers = rng.integers(1, users + 1, missing)
+        authors = rng.zipf(1.3, missing) % users + 1
+        keep = followers != authors
+        pairs = np.union1d(
+            pairs, followers[keep] * (users + 1) + authors[keep]
+        )
+    pairs = rng.permutation(pairs)[:edges]
+    return np.divmod(pairs, users + 1)
+
+
+class Command(BaseCommand):
+    help = (
+        'Замеряет построение графа подписок и расчёт рекомендаций на '
+        'синтетическом графе (по умолчанию — миллион подписок).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100000)
+        parser.add_argument('--edges', type=int, default=1000000)
+        parser.add_argument(
+            '--sample', type=int, default=1000,
+            help='Для скольких случайных пользователей считать рекомендации.'
+        )
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        followers, authors = synthetic_edges(
+            options['users'], options['edges'], options['seed']
+        )
+        tracemalloc.start()
+        start = time.perf_counter()
+        graph = FollowGraph(followers, authors)
+        build = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        self.stdout.write(
+            f'Подписок: {len(followers)}, пользователей: {len(graph.ids)}'
+        )
+        self.stdout.write(
+            f'Построение CSR: {build * 1000:.0f} мс, '
+            f'массивы: {graph.nbytes / 2 ** 20:.1f} МиБ, '
+            f'пик памяти: {peak / 2 ** 20:.1f} МиБ'
+        )
+        popular = recommendations.popular_authors(graph, 11)
+        rng = np.random.default_rng(options['seed'])
+        timings = []
+        for user_id in rng.choice(graph.ids, options['sample']):
+            start = time.perf_counter()
+            recommendations.recommend(graph, int(user_id), popular=popular)
+            timings.append((time.perf_counter() - start) * 1000)
+        total = sum(timings) / len(timings) * len(graph.ids) / 1000
+        self.stdout.write(
+            f'Рекомендации на пользователя: '
+            f'p50 {percentile(timings, 50):.2f} мс, '
+            f'p99 {percentile(timings, 99):.2f} мс, '
+            f'оценка на всех: {total:.0f} с'
+        )
@@ -0,0 +1,77 @@
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import hashtags, sharding
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = (
+        'Заново разбирает теги и упоминания во всех постах. Тексты '
+        'разбираются пачками в нескольких процессах, запись идёт из '
+        'основного.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument(
+            '--workers', type=int, default=multiprocessing.cpu_count(),
+            help='Число процессов разбора; 1 — без дочерних процессов.'
+        )
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1 or options['workers'] < 1:
+            raise CommandError(
+                '--batch-size и --workers должны быть положительными'
+            )
+        batches = self.batches(options['batch_size'])
+        if options['workers'] == 1:
+            indexed = self.store(map(hashtags.parse_chunk, batches))
+        else:
+            # parse_chunk не обращается к базе, поэтому унаследованные
+            # при fork соединения в дочерних процессах не используются.
+            with ProcessPoolExecutor(
+                options['workers'],
+                mp_context=multiprocessing.get_context('fork')
+            ) as pool:
+                indexed = self.store(
+                    self.parallel(pool, batches, options['workers'] * 2)
+                )
+        self.stdout.write(self.style.SUCCESS(
+            f'Разобрано постов: {indexed}'
+        ))
+
+    def batches(self, batch_size):
+        for database in sharding.databases():
+            last_pk = 0
+            while True:
+                rows = list(
+                    Post.objects.using(database).filter(pk__gt=last_pk)
+                    .order_by('pk')
+                    .values_list('pk', 'pub_date', 'text')[:batch_size]
+                )
+                if not rows:
+                    break
+                last_pk = rows[-1][0]
+                yield rows
+
+    def parallel(self, pool, batches, in_flight):
+        """Результаты parse_chunk по порядку, не больше in_flight задач."""
+        pending = deque()
+        for rows in batches:
+            pending.append(pool.submit(hashtags.parse_chunk, rows))
+            if len(pending) >= in_flight:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+    def store(self, results):
+        indexed = 0
+        for parsed in results:
+            hashtags.store(parsed)
+            indexed += len(parsed)
+            self.stdout.write(f'до id {parsed[-1][0]}: разобрано {indexed}')
+        return indexed
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import recommendations
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает рекомендации «на кого подписаться» для всех '
+        'пользователей пачками. Запускается периодически, например из cron.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size должен быть положительным')
+        users = recommendations.precompute(options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Рекомендации пересчитаны: пользователей {users}'
+        ))
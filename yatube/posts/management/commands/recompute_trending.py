@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import trending
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает рейтинг /trending/ из событий постов и удаляет '
+        'устаревшие события. Запускается периодически, например из cron.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=10000)
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size должен быть положительным')
+        posts = trending.recompute(options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Рейтинг пересчитан: постов {posts}'
+        ))
@@ -0,0 +1,47 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.models import User
+from posts import counters, sharding
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает денормализованные счётчики постов, комментариев '
+        'и подписок пачками.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        if batch_size < 1:
+            raise CommandError('--batch-size должен быть положительным')
+        users = 0
+        for batch in self.batches(User.objects.all(), batch_size):
+            counters.recount_users(batch)
+            users += len(batch)
+        counters.recount_groups()
+        posts = 0
+        for database in sharding.databases():
+            queryset = Post.objects.using(database)
+            for batch in self.batches(queryset, batch_size):
+                counters.recount_comments(database, batch)
+                posts += len(batch)
+        self.stdout.write(self.style.SUCCESS(
+            f'Пересчитано: пользователей {users}, постов {posts}'
+        ))
+
+    def batches(self, queryset, batch_size):
+        """Списки id по возрастанию, не больше batch_size в каждом."""
+        last_pk = 0
+        while True:
+            batch = list(
+                queryset.filter(pk__gt=last_pk).order_by('pk')
+                .values_list('pk', flat=True)[:batch_size]
+            )
+            if not batch:
+                return
+            yield batch
+            last_pk = batch[-1]
@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core import object_cache
+from posts import rendering, sharding
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = (
+        'Заново рендерит HTML текста и начала всех постов пачками, '
+        'например после изменения разметки или POST_EXCERPT_LENGTH.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        if batch_size < 1:
+            raise CommandError('--batch-size должен быть положительным')
+        rendered = 0
+        for database in sharding.databases():
+            posts = Post.objects.using(database)
+            last_pk = 0
+            while True:
+                batch = list(
+                    posts.filter(pk__gt=last_pk).order_by('pk')
+                    .only('pk', 'text')[:batch_size]
+                )
+                if not batch:
+                    break
+                last_pk = batch[-1].pk
+                for post in batch:
+                    post.text_html, post.excerpt_html = rendering.render(
+                        post.text
+                    )
+                posts.bulk_update(batch, ['text_html', 'excerpt_html'])
+                for post in batch:
+                    object_cache.forget(Post, post.pk)
+                rendered += len(batch)
+        self.stdout.write(self.style.SUCCESS(
+            f'Перерисовано постов: {rendered}'
+        ))
@@ -0,0 +1,81 @@
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, transaction
+
+from posts import sharding
+from posts.models import Comment, Post
+
+
+class Command(BaseCommand):
+    help = (
+        'Переносит посты и их комментарии из основной базы в шарды '
+        'пачками. Повторный запуск продолжает с места остановки.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        if not sharding.enabled():
+            raise CommandError('SHARD_DATABASES пуст')
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size должен быть положительным')
+        for alias in settings.SHARD_DATABASES:
+            sharding.seed_sequences(alias)
+        moved = last_pk = 0
+        while True:
+            posts = list(
+                Post.objects.using(DEFAULT_DB_ALIAS)
+                .filter(pk__gt=last_pk).order_by('pk')
+                [:options['batch_size']]
+            )
+            if not posts:
+                break
+            last_pk = posts[-1].pk
+            by_shard = defaultdict(list)
+            for post in posts:
+                alias = sharding.shard_for_author(post.author_id)
+                if alias != DEFAULT_DB_ALIAS:
+                    by_shard[alias].append(post)
+            for alias, shard_posts in by_shard.items():
+                self.move(alias, shard_posts)
+                moved += len(shard_posts)
+            self.stdout.write(f'до id {last_pk}: перенесено {moved}')
+        self.stdout.write(self.style.SUCCESS(f'Готово, перенесено {moved}'))
+
+    def move(self, alias, posts):
+        """Копирует пачку в шард, затем удаляет её из основной базы.
+
+        Копирование идемпотентно, поэтому сбой между двумя транзакциями
+        исправляется повторным запуском.
+        """
+        ids = [post.pk for post in posts]
+        comments = list(
+            Comment.objects.using(DEFAULT_DB_ALIAS).filter(post_id__in=ids)
+        )
+        with transaction.atomic(using=alias):
+            # bulk_create проставляет auto_now_add, поэтому даты
+            # восстанавливаются следом.
+            for objects in (posts, comments):
+                if not objects:
+                    continue
+                model = type(objects[0])
+                dates = [obj.pub_date for obj in objects]
+                model.objects.using(alias).bulk_create(
+                    objects, ignore_conflicts=True
+                )
+                for obj, pub_date in zip(objects, dates):
+                    obj.pub_date = pub_date
+                model.objects.using(alias).bulk_update(objects, ['pub_date'])
+        # Посты переезжают, а не удаляются: удаление без сигналов
+        # post_delete, иначе обработчики уменьшат счётчики и сотрут теги,
+        # упоминания и события трендов, которые уже относятся к копиям.
+        with transaction.atomic(using=DEFAULT_DB_ALIAS):
+            Comment.objects.using(DEFAULT_DB_ALIAS).filter(
+                post_id__in=ids
+            )._raw_delete(DEFAULT_DB_ALIAS)
+            Post.objects.using(DEFAULT_DB_ALIAS).filter(
+                pk__in=ids
+            )._raw_delete(DEFAULT_DB_ALIAS)
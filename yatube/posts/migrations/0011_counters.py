@@ -0,0 +1,86 @@
+# Generated by Django 2.2.16 on 2026-10-19 08:12
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+import django.db.models.deletion
+
+
+def _count(queryset, field):
+    return Coalesce(Subquery(
+        queryset.filter(**{field: OuterRef('pk')}).order_by()
+        .values(field).annotate(total=Count('pk')).values('total')
+    ), 0)
+
+
+def fill_counters(apps, schema_editor):
+    database = schema_editor.connection.alias
+    User = apps.get_model(settings.AUTH_USER_MODEL)
+    Post = apps.get_model('posts', 'Post')
+    Group = apps.get_model('posts', 'Group')
+    Follow = apps.get_model('posts', 'Follow')
+    UserCounters = apps.get_model('posts', 'UserCounters')
+    posts = Post.objects.using(database)
+    follows = Follow.objects.using(database)
+    UserCounters.objects.using(database).bulk_create(
+        UserCounters(user_id=pk)
+        for pk in User.objects.using(database).values_list('pk', flat=True)
+    )
+    UserCounters.objects.using(database).update(
+        posts_count=_count(posts, 'author'),
+        followers_count=_count(follows, 'author'),
+        following_count=_count(follows, 'user'),
+    )
+    Group.objects.using(database).update(posts_count=_count(posts, 'group'))
+
+
+def fill_comments_count(apps, schema_editor):
+    database = schema_editor.connection.alias
+    Post = apps.get_model('posts', 'Post')
+    Comment = apps.get_model('posts', 'Comment')
+    Post.objects.using(database).update(
+        comments_count=_count(Comment.objects.using(database), 'post')
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0010_auto_20221204_1331'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserCounters',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='counters', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('posts_count', models.PositiveIntegerField(default=0, verbose_name='Постов')),
+                ('followers_count', models.PositiveIntegerField(default=0, verbose_name='Подписчиков')),
+                ('following_count', models.PositiveIntegerField(default=0, verbose_name='Подписок')),
+            ],
+            options={
+                'verbose_name': 'Счётчики пользователя',
+                'verbose_name_plural': 'Счётчики пользователей',
+            },
+        ),
+        migrations.AddField(
+            model_name='group',
+            name='posts_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Постов'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='comments_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Комментариев'),
+        ),
+        migrations.RunPython(
+            fill_counters, migrations.RunPython.noop,
+            hints={'model_name': 'usercounters'},
+        ),
+        migrations.RunPython(
+            fill_comments_count, migrations.RunPython.noop,
+            hints={'model_name': 'post'},
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 2.2.16 on 2026-10-19 08:20
+
+from django.db import migrations
+
+
+def seed_counters(apps, schema_editor):
+    """Переносит текущие значения счётчиков в шардированные счётчики."""
+    database = schema_editor.connection.alias
+    CounterShard = apps.get_model('core', 'CounterShard')
+    Post = apps.get_model('posts', 'Post')
+    UserCounters = apps.get_model('posts', 'UserCounters')
+    rows = [
+        CounterShard(name=f'comments:{pk}', shard=0, value=total)
+        for pk, total in Post.objects.using(database).filter(
+            comments_count__gt=0
+        ).values_list('pk', 'comments_count')
+    ] + [
+        CounterShard(name=f'followers:{pk}', shard=0, value=total)
+        for pk, total in UserCounters.objects.using(database).filter(
+            followers_count__gt=0
+        ).values_list('user_id', 'followers_count')
+    ]
+    CounterShard.objects.using(database).bulk_create(
+        rows, batch_size=500, ignore_conflicts=True
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_initial'),
+        ('posts', '0011_counters'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            seed_counters, migrations.RunPython.noop,
+            hints={'model_name': 'countershard'},
+        ),
+    ]
@@ -0,0 +1,67 @@
+# Generated by Django 2.2.16 on 2026-10-19 08:20
+
+import math
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def seed_scores(apps, schema_editor):
+    # До шардирования все посты лежат в основной базе; рейтинг каждого
+    # начинается с события публикации.
+    database = schema_editor.connection.alias
+    Post = apps.get_model('posts', 'Post')
+    PostEvent = apps.get_model('posts', 'PostEvent')
+    PostScore = apps.get_model('posts', 'PostScore')
+    weight = settings.TRENDING_WEIGHTS['post']
+    rate = math.log(2) / settings.TRENDING_HALF_LIFE
+    posts = list(Post.objects.using(database).values_list('pk', 'pub_date'))
+    PostEvent.objects.using(database).bulk_create(
+        PostEvent(post_id=pk, weight=weight, created=pub_date)
+        for pk, pub_date in posts
+    )
+    PostScore.objects.using(database).bulk_create(
+        PostScore(
+            post_id=pk,
+            score=math.log(weight) + pub_date.timestamp() * rate,
+        )
+        for pk, pub_date in posts
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0013_post_views_count'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PostEvent',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('post_id', models.BigIntegerField(db_index=True, verbose_name='Пост')),
+                ('weight', models.FloatField(verbose_name='Вес')),
+                ('created', models.DateTimeField(db_index=True, verbose_name='Время')),
+            ],
+            options={
+                'verbose_name': 'Событие поста',
+                'verbose_name_plural': 'События постов',
+            },
+        ),
+        migrations.CreateModel(
+            name='PostScore',
+            fields=[
+                ('post_id', models.BigIntegerField(primary_key=True, serialize=False, verbose_name='Пост')),
+                ('score', models.FloatField(db_index=True, verbose_name='Рейтинг')),
+            ],
+            options={
+                'verbose_name': 'Рейтинг поста',
+                'verbose_name_plural': 'Рейтинги постов',
+            },
+        ),
+        migrations.RunPython(
+            seed_scores, migrations.RunPython.noop,
+            hints={'model_name': 'postscore'},
+        ),
+    ]
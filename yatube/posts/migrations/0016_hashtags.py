@@ -0,0 +1,69 @@
+# Generated by Django 2.2.16 on 2026-10-19 08:27
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0015_author_recommendation'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tag',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True, verbose_name='Название')),
+            ],
+            options={
+                'verbose_name': 'Тег',
+                'verbose_name_plural': 'Теги',
+            },
+        ),
+        migrations.CreateModel(
+            name='PostTag',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('post_id', models.BigIntegerField(db_index=True, verbose_name='Пост')),
+                ('pub_date', models.DateTimeField(verbose_name='Дата публикации')),
+                ('tag', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='post_tags', to='posts.Tag')),
+            ],
+            options={
+                'verbose_name': 'Тег поста',
+                'verbose_name_plural': 'Теги постов',
+            },
+        ),
+        migrations.CreateModel(
+            name='Mention',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('post_id', models.BigIntegerField(db_index=True, verbose_name='Пост')),
+                ('pub_date', models.DateTimeField(verbose_name='Дата публикации')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='mentions', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Упоминание',
+                'verbose_name_plural': 'Упоминания',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='posttag',
+            index=models.Index(fields=['tag', '-pub_date', '-post_id'], name='tag_pub_date'),
+        ),
+        migrations.AddConstraint(
+            model_name='posttag',
+            constraint=models.UniqueConstraint(fields=('tag', 'post_id'), name='tag_post'),
+        ),
+        migrations.AddIndex(
+            model_name='mention',
+            index=models.Index(fields=['user', '-pub_date', '-post_id'], name='mention_pub_date'),
+        ),
+        migrations.AddConstraint(
+            model_name='mention',
+            constraint=models.UniqueConstraint(fields=('user', 'post_id'), name='mention_user_post'),
+        ),
+    ]
@@ -0,0 +1,114 @@
+# Generated by Django 2.2.16 on 2026-10-19 08:29
+
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.db import migrations, models
+from django.utils.html import escape
+
+
+# Копия posts.rendering на момент миграции: миграция не должна зависеть
+# от того, как разметка будет устроена в следующих версиях.
+URL_RE = r'\bhttps?://[^\s<>"\']+[^\s<>"\'.,;:!?)]'
+TAG_RE = r'(?<![\w&#])#(\w+)'
+MENTION_RE = r'(?<![\w@])@([\w.+-]+)'
+TOKEN_RE = re.compile(
+    f'(?P<url>{URL_RE})|(?P<tag>{TAG_RE})|(?P<mention>{MENTION_RE})'
+)
+TAG_MAX_LENGTH = 50
+EXCERPT_LENGTH = 300
+# Символы, которые reverse() оставляет в пути как есть.
+PATH_SAFE = "!$&'()*+,;=/~:@"
+
+
+def _link(href, text, rel=None):
+    rel = f' rel="{rel}"' if rel else ''
+    return f'<a href="{escape(href)}"{rel}>{escape(text)}</a>'
+
+
+def _path(prefix, name):
+    return f'/{prefix}/{quote(name, safe=PATH_SAFE)}/'
+
+
+def _linkify(text, usernames):
+    parts = []
+    position = 0
+    for match in TOKEN_RE.finditer(text):
+        parts.append(escape(text[position:match.start()]))
+        position = match.end()
+        token = match.group()
+        if match['url']:
+            parts.append(_link(token, token, 'nofollow noopener'))
+            continue
+        if match['tag']:
+            name = token[1:]
+            if (len(name) > TAG_MAX_LENGTH or not name.strip('_')
+                    or name.isdigit()):
+                parts.append(escape(token))
+                continue
+            parts.append(_link(_path('tag', name.casefold()), token))
+            continue
+        username = token[1:].rstrip('.')
+        if username not in usernames:
+            parts.append(escape(token))
+            continue
+        parts.append(_link(_path('profile', username), f'@{username}'))
+        parts.append(escape(token[1 + len(username):]))
+    parts.append(escape(text[position:]))
+    return ''.join(parts)
+
+
+def _excerpt(text):
+    if len(text) <= EXCERPT_LENGTH:
+        return text
+    cut = EXCERPT_LENGTH - 1
+    for match in TOKEN_RE.finditer(text):
+        if match.start() >= cut:
+            break
+        if match.end() > cut:
+            cut = match.start()
+            break
+    return text[:cut].rstrip() + '…'
+
+
+def render_texts(apps, schema_editor):
+    Post = apps.get_model('posts', 'Post')
+    User = apps.get_model(settings.AUTH_USER_MODEL)
+    posts = Post.objects.using(schema_editor.connection.alias)
+    for pk, text in posts.values_list('pk', 'text').iterator():
+        names = {
+            name.rstrip('.') for name in re.findall(MENTION_RE, text)
+        }
+        usernames = set(User.objects.filter(
+            username__in=names
+        ).values_list('username', flat=True))
+        posts.filter(pk=pk).update(
+            text_html=_linkify(text, usernames),
+            excerpt_html=_linkify(_excerpt(text), usernames),
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0016_hashtags'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='excerpt_html',
+            field=models.TextField(blank=True, editable=False, verbose_name='Начало текста в HTML'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='text_html',
+            field=models.TextField(blank=True, editable=False, verbose_name='Текст в HTML'),
+        ),
+        migrations.RunPython(
+            render_texts, migrations.RunPython.noop,
+            hints={'model_name': 'post'},
+        ),
+    ]
@@ -2,9 +2,26 @@ from django.db import models
 from django.contrib.auth import get_user_model
 
 from core.models import CreatedModel
+from posts.sharding import ShardedManager
 
 User = get_user_model()
 
+# Колонки, которые выводят карточки лент (templates/posts/*.html и
+# includes/follow_button.html). Поле, которого здесь нет, загружается
+# отдельным запросом на каждую карточку.
+FEED_FIELDS = (
+    'pub_date', 'image', 'comments_count', 'excerpt_html', 'author',
+    'group', 'author__username', 'group__slug',
+)
+
+
+class PostManager(ShardedManager):
+    def feed(self):
+        """Посты со всех шардов для карточек лент, только FEED_FIELDS."""
+        return self.sharded().select_related('author', 'group').only(
+            *FEED_FIELDS
+        )
+
 
 class Post(CreatedModel):
     text = models.TextField(
@@ -25,12 +42,37 @@ class Post(CreatedModel):
         blank=True,
         null=True
     )
+    comments_count = models.PositiveIntegerField(
+        'Комментариев', default=0, editable=False
+    )
+    views_count = models.PositiveIntegerField(
+        'Просмотров', default=0, editable=False
+    )
+    text_html = models.TextField(
+        'Текст в HTML', blank=True, editable=False
+    )
+    excerpt_html = models.TextField(
+        'Начало текста в HTML', blank=True, editable=False
+    )
+
+    objects = PostManager()
 
     class Meta:
         ordering = ['-pub_date']
         default_related_name = 'posts'
         verbose_name = 'Пост'
         verbose_name_plural = 'Посты'
+        indexes = [
+            models.Index(fields=['-pub_date', '-id'], name='post_pub_date'),
+            models.Index(
+                fields=['author', '-pub_date', '-id'],
+                name='post_author_pub_date'
+            ),
+            models.Index(
+                fields=['group', '-pub_date', '-id'],
+                name='post_group_pub_date'
+            ),
+        ]
 
     def __str__(self):
         return self.text[:15]
@@ -40,6 +82,9 @@ class Group(models.Model):
     title = models.CharField(max_length=200)
     slug = models.SlugField(unique=True)
     description = models.TextField()
+    posts_count = models.PositiveIntegerField(
+        'Постов', default=0, editable=False
+    )
 
     class Meta:
         verbose_name = 'Группа'
@@ -58,6 +103,8 @@ class Comment(CreatedModel):
     text = models.TextField()
     active = models.BooleanField(default=True)
 
+    objects = ShardedManager()
+
     class Meta:
         ordering = ['-pub_date']
         verbose_name = 'Комментарий'
@@ -87,3 +134,127 @@ class Follow(CreatedModel):
                 fields=['user', 'author'], name='user_author'
             ),
         ]
+
+
+class UserCounters(models.Model):
+    """Денормализованные счётчики пользователя (см. posts.counters)."""
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='counters',
+    )
+    posts_count = models.PositiveIntegerField('Постов', default=0)
+    followers_count = models.PositiveIntegerField('Подписчиков', default=0)
+    following_count = models.PositiveIntegerField('Подписок', default=0)
+
+    class Meta:
+        verbose_name = 'Счётчики пользователя'
+        verbose_name_plural = 'Счётчики пользователей'
+
+
+class AuthorRecommendation(models.Model):
+    """Автор, рекомендованный пользователю (см. posts.recommendations)."""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='recommendations',
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+',
+    )
+    score = models.FloatField('Оценка')
+
+    class Meta:
+        verbose_name = 'Рекомендация автора'
+        verbose_name_plural = 'Рекомендации авторов'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'author'], name='recommendation_user_author'
+            ),
+        ]
+
+
+class Tag(models.Model):
+    name = models.CharField('Название', max_length=50, unique=True)
+
+    class Meta:
+        verbose_name = 'Тег'
+        verbose_name_plural = 'Теги'
+
+    def __str__(self):
+        return self.name
+
+
+class PostTag(models.Model):
+    """Тег поста; дата публикации скопирована для ленты по индексу."""
+    tag = models.ForeignKey(
+        Tag,
+        on_delete=models.CASCADE,
+        related_name='post_tags',
+    )
+    post_id = models.BigIntegerField('Пост', db_index=True)
+    pub_date = models.DateTimeField('Дата публикации')
+
+    class Meta:
+        verbose_name = 'Тег поста'
+        verbose_name_plural = 'Теги постов'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['tag', 'post_id'], name='tag_post'
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=['tag', '-pub_date', '-post_id'], name='tag_pub_date'
+            ),
+        ]
+
+
+class Mention(models.Model):
+    """Упоминание пользователя в посте (см. posts.hashtags)."""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='mentions',
+    )
+    post_id = models.BigIntegerField('Пост', db_index=True)
+    pub_date = models.DateTimeField('Дата публикации')
+
+    class Meta:
+        verbose_name = 'Упоминание'
+        verbose_name_plural = 'Упоминания'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'post_id'], name='mention_user_post'
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', '-pub_date', '-post_id'],
+                name='mention_pub_date'
+            ),
+        ]
+
+
+class PostEvent(models.Model):
+    """Событие, поднимающее пост в рейтинге (см. posts.trending)."""
+    post_id = models.BigIntegerField('Пост', db_index=True)
+    weight = models.FloatField('Вес')
+    created = models.DateTimeField('Время', db_index=True)
+
+    class Meta:
+        verbose_name = 'Событие поста'
+        verbose_name_plural = 'События постов'
+
+
+class PostScore(models.Model):
+    """Логарифм рейтинга поста с затуханием (см. posts.trending)."""
+    post_id = models.BigIntegerField('Пост', primary_key=True)
+    score = models.FloatField('Рейтинг', db_index=True)
+
+    class Meta:
+        verbose_name = 'Рейтинг поста'
+        verbose_name_plural = 'Рейтинги постов'
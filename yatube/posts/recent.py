@@ -0,0 +1,173 @@
+"""Новые посты ленты после курсора для опроса без перезагрузки страницы.
+
+Процесс держит кольцевые буферы последних постов по областям
+('all', 'author:<id>', 'group:<id>'): отсортированные ключи (pub_date,
+id) и нижнюю границу floor, новее которой в буфере есть все посты.
+Буферы пополняются событиями журнала core.pubsub (posts.live), поэтому
+видят посты, созданные любым воркером. Курсор не старше floor
+обслуживается из памяти; иначе выполняется один запрос по индексам
+(область, -pub_date, -id), и его результат становится буфером области
+с floor, равным курсору. Буферов не больше RECENT_POSTS_SCOPES, ключей
+в каждом — не больше RECENT_POSTS_SIZE; удалённые посты из буферов не
+убираются. Если журнал повернулся дважды между обращениями к воркеру,
+часть событий потеряна (pubsub.Tail.missed): все буферы сбрасываются,
+и следующие запросы снова идут в базу.
+"""
+import threading
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db.models import Q, QuerySet
+
+from core import keyset, pubsub
+from posts.models import Post
+
+# Каждый id подписки — параметр запроса, а SQLite допускает 999; остальные
+# уходят на курсор и LIMIT.
+CHUNK_SIZE = 900
+
+
+class Buffer:
+    def __init__(self, floor, keys=()):
+        self.floor = floor
+        self.keys = sorted(keys)
+        self._trim()
+
+    def add(self, key):
+        if key <= self.floor:
+            return
+        index = bisect_left(self.keys, key)
+        if index == len(self.keys) or self.keys[index] != key:
+            self.keys.insert(index, key)
+            self._trim()
+
+    def _trim(self):
+        excess = len(self.keys) - settings.RECENT_POSTS_SIZE
+        if excess > 0:
+            self.floor = self.keys[excess - 1]
+            del self.keys[:excess]
+
+    def covers(self, cursor):
+        return cursor >= self.floor
+
+    def since(self, cursor):
+        return self.keys[bisect_right(self.keys, cursor):]
+
+
+_lock = threading.Lock()
+_buffers = OrderedDict()
+_tail = None
+
+
+def reset():
+    """Забывает буферы и позицию в журнале (для тестов)."""
+    global _tail
+    with _lock:
+        _buffers.clear()
+        if _tail is not None:
+            _tail.close()
+        _tail = None
+
+
+def _sync():
+    global _tail
+    if _tail is None:
+        _tail = pubsub.Tail()
+        return
+    events = _tail.read()
+    if _tail.missed:
+        _buffers.clear()
+        return
+    for event in events:
+        key = keyset.decode(event['data']['cursor'])
+        for scope in event['scopes']:
+            buffer = _buffers.get(scope)
+            if buffer is not None:
+                buffer.add(key)
+
+
+def _store(scope, buffer):
+    _buffers[scope] = buffer
+    _buffers.move_to_end(scope)
+    while len(_buffers) > settings.RECENT_POSTS_SCOPES:
+        _buffers.popitem(last=False)
+
+
+def _post_scopes(post):
+    return {'all', f'author:{post.author_id}', f'group:{post.group_id}'}
+
+
+def _conditions(scopes):
+    """Условия на посты scopes, не больше CHUNK_SIZE id в каждом."""
+    if 'all' in scopes:
+        return [Q()]
+    pairs = [scope.split(':') for scope in scopes]
+    conditions = []
+    for start in range(0, len(pairs), CHUNK_SIZE):
+        ids = {'author': [], 'group': []}
+        for kind, pk in pairs[start:start + CHUNK_SIZE]:
+            ids[kind].append(int(pk))
+        conditions.append(
+            Q(author_id__in=ids['author']) | Q(group_id__in=ids['group'])
+        )
+    return conditions
+
+
+def _load(scopes, cursor):
+    """Посты scopes новее cursor из базы, не больше RECENT_POSTS_SIZE + 1."""
+    limit = settings.RECENT_POSTS_SIZE + 1
+    moment, pk = cursor
+    posts = {}
+    for condition in _conditions(scopes):
+        queryset = Post.objects.sharded().filter(
+            condition, Q(pub_date__gt=moment) | Q(pub_date=moment, pk__gt=pk)
+        ).only('pub_date', 'author', 'group')
+        if isinstance(queryset, QuerySet):
+            queryset = queryset.order_by('-pub_date', '-pk')
+        # Пост автора из подписок в группе из подписок может попасть в
+        # две пачки.
+        posts.update((post.pk, post) for post in queryset[:limit])
+    return sorted(
+        posts.values(), key=lambda post: (post.pub_date, post.pk),
+        reverse=True,
+    )[:limit]
+
+
+def since(scopes, cursor):
+    """Ключи постов scopes новее cursor от новых к старым и признак,
+    что в ответ вошли не все такие посты.
+
+    cursor и ключи — пары (pub_date, id), как у core.keyset.decode.
+    """
+    size = settings.RECENT_POSTS_SIZE
+    keys = set()
+    more = False
+    with _lock:
+        _sync()
+        missing = []
+        for scope in scopes:
+            buffer = _buffers.get(scope)
+            if buffer is not None and buffer.covers(cursor):
+                _buffers.move_to_end(scope)
+                keys.update(buffer.since(cursor))
+            else:
+                missing.append(scope)
+        if missing:
+            posts = _load(missing, cursor)
+            more = len(posts) > size
+            posts = posts[:size]
+            if not more:
+                for scope in missing:
+                    _store(scope, Buffer(cursor, [
+                        (post.pub_date, post.pk) for post in posts
+                        if scope in _post_scopes(post)
+                    ]))
+            keys.update((post.pub_date, post.pk) for post in posts)
+            if more:
+                # Старше последнего прочитанного из базы может быть
+                # пропущенное, поэтому такие ключи не отдаются.
+                boundary = (posts[-1].pub_date, posts[-1].pk)
+                keys = {key for key in keys if key >= boundary}
+    keys = sorted(keys, reverse=True)
+    return keys[:size], more or len(keys) > size
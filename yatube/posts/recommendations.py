@@ -0,0 +1,132 @@
+"""Рекомендации «на кого подписаться».
+
+Кандидат получает по очку за каждого, на кого подписан пользователь и
+кто сам подписан на кандидата (друзья друзей), и
+RECOMMENDATIONS_COFOLLOW_WEIGHT за долю «соподписчиков» — тех, кто
+подписан на тех же авторов, — подписанных на кандидата. Для каждого
+автора берутся первые RECOMMENDATIONS_FOLLOWERS_SAMPLE подписчиков,
+чтобы популярные авторы не раздували расчёт. Пользователям без подписок
+предлагаются авторы с наибольшим числом подписчиков.
+
+precompute() считает рекомендации по графу из posts.follow_graph пачками
+пользователей и сохраняет до RECOMMENDATIONS_LIMIT на каждого в
+AuthorRecommendation; for_user() читает их через кэш.
+"""
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_save
+
+from core.models import User
+from posts.follow_graph import FollowGraph
+from posts.models import AuthorRecommendation, Follow
+
+
+def _cache_key(user_id):
+    return f'who_to_follow:{user_id}'
+
+
+def recommend(graph, user_id, limit=None, popular=None):
+    """[(id автора, оценка)] по убыванию оценки."""
+    limit = limit or settings.RECOMMENDATIONS_LIMIT
+    index = graph.index(user_id)
+    following = (
+        graph.following.row(index) if index is not None
+        else np.empty(0, np.int32)
+    )
+    if not len(following):
+        if popular is None:
+            popular = popular_authors(graph, limit + 1)
+        return [
+            (int(graph.ids[author]), float(score))
+            for author, score in popular if author != index
+        ][:limit]
+    friends, _ = graph.following.rows(following)
+    cofollowers, counts = graph.followers.rows(
+        following, settings.RECOMMENDATIONS_FOLLOWERS_SAMPLE
+    )
+    cofollowed, lengths = graph.following.rows(cofollowers)
+    shares = np.repeat(1 / counts[counts > 0], counts[counts > 0])
+    candidates = np.concatenate((friends, cofollowed))
+    weights = np.concatenate((
+        np.ones(len(friends)),
+        np.repeat(shares, lengths) * settings.RECOMMENDATIONS_COFOLLOW_WEIGHT,
+    ))
+    keep = ~np.isin(candidates, following) & (candidates != index)
+    authors, inverse = np.unique(candidates[keep], return_inverse=True)
+    scores = np.bincount(inverse, weights=weights[keep])
+    best = np.lexsort((authors, -scores))[:limit]
+    return [
+        (int(graph.ids[authors[i]]), float(scores[i])) for i in best
+    ]
+
+
+def popular_authors(graph, limit):
+    """[(номер автора, число подписчиков)] для самых популярных."""
+    degrees = graph.followers.degrees()
+    best = np.lexsort((graph.ids, -degrees))[:limit]
+    return [(int(i), float(degrees[i])) for i in best if degrees[i]]
+
+
+def _user_batches(batch_size):
+    last_pk = 0
+    while True:
+        batch = list(
+            User.objects.filter(pk__gt=last_pk).order_by('pk')
+            .values_list('pk', flat=True)[:batch_size]
+        )
+        if not batch:
+            return
+        yield batch
+        last_pk = batch[-1]
+
+
+def precompute(batch_size=1000, graph=None):
+    """Пересчитывает рекомендации всех пользователей; возвращает их число."""
+    graph = graph or FollowGraph.load()
+    limit = settings.RECOMMENDATIONS_LIMIT
+    popular = popular_authors(graph, limit + 1)
+    users = 0
+    for batch in _user_batches(batch_size):
+        rows = [
+            AuthorRecommendation(
+                user_id=user_id, author_id=author, score=score
+            )
+            for user_id in batch
+            for author, score in recommend(graph, user_id, limit, popular)
+        ]
+        with transaction.atomic():
+            AuthorRecommendation.objects.filter(user_id__in=batch).delete()
+            AuthorRecommendation.objects.bulk_create(rows, batch_size=500)
+        cache.delete_many([_cache_key(user_id) for user_id in batch])
+        users += len(batch)
+    return users
+
+
+def for_user(user):
+    """Рекомендованные авторы пользователя, по убыванию оценки."""
+    if not user.is_authenticated:
+        return []
+    key = _cache_key(user.pk)
+    authors = cache.get(key)
+    if authors is None:
+        authors = [
+            recommendation.author for recommendation in
+            AuthorRecommendation.objects.filter(user=user)
+            .select_related('author').order_by('-score')
+        ]
+        cache.set(key, authors, settings.RECOMMENDATIONS_CACHE_TIMEOUT)
+    return authors
+
+
+def follow_saved(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        AuthorRecommendation.objects.filter(
+            user_id=instance.user_id, author_id=instance.author_id
+        ).delete()
+        cache.delete(_cache_key(instance.user_id))
+
+
+def connect():
+    post_save.connect(follow_saved, sender=Follow)
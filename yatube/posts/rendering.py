@@ -0,0 +1,101 @@
+"""Готовый HTML текста поста и его начала для карточек лент.
+
+При сохранении поста текст экранируется, ссылки, теги и упоминания
+существующих пользователей превращаются в <a>, и результат пишется в
+Post.text_html; начало текста до POST_EXCERPT_LENGTH символов так же
+записывается в Post.excerpt_html. Шаблоны выводят их без повторного
+экранирования, а ленты не читают колонки text и text_html
+(posts.models.FEED_FIELDS). Посты, сохранённые в обход save(), можно
+перерисовать командой render_posts.
+"""
+import re
+
+from django.conf import settings
+from django.db.models.signals import pre_save
+from django.urls import reverse
+from django.utils.html import escape
+
+from core.models import User
+from posts.hashtags import MENTION_RE, TAG_RE, extract_mentions, extract_tags
+from posts.models import Post
+
+URL_RE = re.compile(r'\bhttps?://[^\s<>"\']+[^\s<>"\'.,;:!?)]')
+TOKEN_RE = re.compile(
+    f'(?P<url>{URL_RE.pattern})'
+    f'|(?P<tag>{TAG_RE.pattern})'
+    f'|(?P<mention>{MENTION_RE.pattern})'
+)
+
+
+def _link(href, text, rel=None):
+    rel = f' rel="{rel}"' if rel else ''
+    return f'<a href="{escape(href)}"{rel}>{escape(text)}</a>'
+
+
+def linkify(text, usernames):
+    """Экранированный text со ссылками; usernames — кого можно упомянуть."""
+    parts = []
+    position = 0
+    for match in TOKEN_RE.finditer(text):
+        parts.append(escape(text[position:match.start()]))
+        position = match.end()
+        token = match.group()
+        if match['url']:
+            parts.append(_link(token, token, 'nofollow noopener'))
+        elif match['tag']:
+            names = extract_tags(token)
+            if not names:
+                parts.append(escape(token))
+                continue
+            parts.append(_link(
+                reverse('posts:tag_posts', kwargs={'name': names[0]}), token
+            ))
+        else:
+            username = token[1:].rstrip('.')
+            if username not in usernames:
+                parts.append(escape(token))
+                continue
+            parts.append(_link(
+                reverse('posts:profile', kwargs={'username': username}),
+                f'@{username}'
+            ))
+            parts.append(escape(token[1 + len(username):]))
+    parts.append(escape(text[position:]))
+    return ''.join(parts)
+
+
+def excerpt(text, length):
+    """Начало text не длиннее length символов вместе с многоточием.
+
+    Ссылка, тег или упоминание, на которых пришёлся обрез, отбрасываются
+    целиком: иначе ссылка вела бы на обрезанный адрес.
+    """
+    if len(text) <= length:
+        return text
+    cut = length - 1
+    for match in TOKEN_RE.finditer(text):
+        if match.start() >= cut:
+            break
+        if match.end() > cut:
+            cut = match.start()
+            break
+    return text[:cut].rstrip() + '…'
+
+
+def render(text):
+    """(text_html, excerpt_html) для текста поста."""
+    usernames = set(User.objects.filter(
+        username__in=extract_mentions(text)
+    ).values_list('username', flat=True))
+    return linkify(text, usernames), linkify(
+        excerpt(text, settings.POST_EXCERPT_LENGTH), usernames
+    )
+
+
+def post_pre_save(sender, instance, raw=False, **kwargs):
+    if not raw:
+        instance.text_html, instance.excerpt_html = render(instance.text)
+
+
+def connect():
+    pre_save.connect(post_pre_save, sender=Post)
@@ -0,0 +1,271 @@
+"""Горизонтальное шардирование постов и комментариев по автору.
+
+Посты автора лежат в базе SHARD_DATABASES[crc32(author_id) % N],
+комментарии лежат рядом со своим постом. Пользователи, группы и подписки
+остаются в основной базе, поэтому внешние ключи шардов на них не
+проверяются (см. core.db.configure_sqlite), а связанные объекты для
+ленты догружаются из основной базы отдельным запросом.
+
+Первичные ключи шарда с номером k начинаются с (k + 1) * SHARD_ID_RANGE,
+так что пост по id находится без перебора шардов. Посты, перенесённые
+командой shard_posts, сохраняют старые id и ищутся по всем шардам.
+При пустом SHARD_DATABASES всё работает с основной базой как раньше.
+"""
+import heapq
+import zlib
+from itertools import islice
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections, models
+from django.db.models.query import QuerySet
+
+from core import routers
+
+SHARDED_MODELS = {'posts.post', 'posts.comment'}
+
+
+def enabled():
+    return bool(settings.SHARD_DATABASES)
+
+
+def databases():
+    """Базы, в которых лежат посты."""
+    return list(settings.SHARD_DATABASES) or [DEFAULT_DB_ALIAS]
+
+
+def is_shard(alias):
+    return alias in settings.SHARD_DATABASES
+
+
+def shard_for_author(author_id):
+    if not enabled():
+        return DEFAULT_DB_ALIAS
+    shards = settings.SHARD_DATABASES
+    return shards[zlib.crc32(str(author_id).encode()) % len(shards)]
+
+
+def shard_for_pk(pk):
+    """Шард по диапазону id или None для id, выданных до шардирования."""
+    index = int(pk) // settings.SHARD_ID_RANGE - 1
+    if 0 <= index < len(settings.SHARD_DATABASES):
+        return settings.SHARD_DATABASES[index]
+    return None
+
+
+def id_start(alias):
+    index = settings.SHARD_DATABASES.index(alias)
+    return (index + 1) * settings.SHARD_ID_RANGE
+
+
+def seed_sequences(alias):
+    """Сдвигает счётчики id постов и комментариев шарда в его диапазон."""
+    connection = connections[alias]
+    if connection.vendor != 'sqlite':
+        return
+    start = id_start(alias)
+    with connection.cursor() as cursor:
+        for table in ('posts_post', 'posts_comment'):
+            cursor.execute(
+                'UPDATE sqlite_sequence SET seq = MAX(seq, %s) '
+                'WHERE name = %s',
+                [start, table]
+            )
+            if not cursor.rowcount:
+                cursor.execute(
+                    'INSERT INTO sqlite_sequence (name, seq) VALUES (%s, %s)',
+                    [table, start]
+                )
+
+
+def seed_after_migrate(sender, using, **kwargs):
+    if is_shard(using):
+        seed_sequences(using)
+
+
+def _comment_shard(comment):
+    post = comment._meta.get_field('post').get_cached_value(comment, None)
+    if post is None:
+        post = comment._meta.get_field('post').related_model.objects.sharded(
+        ).get(pk=comment.post_id)
+    return post._state.db or shard_for_author(post.author_id)
+
+
+class ShardRouter:
+    """Направляет посты и комментарии в шарды, остальное в основную базу."""
+
+    def db_for_read(self, model, **hints):
+        if not enabled():
+            return None
+        instance = hints.get('instance')
+        if model._meta.label_lower in SHARDED_MODELS:
+            if instance is None:
+                return None
+            if instance._meta.label_lower in SHARDED_MODELS:
+                return instance._state.db
+            if model._meta.label_lower == 'posts.post' and (
+                    instance._meta.label_lower
+                    == settings.AUTH_USER_MODEL.lower()):
+                return shard_for_author(instance.pk)
+            return None
+        if instance is not None and is_shard(instance._state.db):
+            return DEFAULT_DB_ALIAS
+        return None
+
+    def db_for_write(self, model, **hints):
+        if not enabled() or model._meta.label_lower not in SHARDED_MODELS:
+            return None
+        instance = hints.get('instance')
+        if instance is None or instance._meta.model is not model:
+            return None
+        routers.note_write()
+        if model._meta.label_lower == 'posts.comment':
+            return _comment_shard(instance)
+        return shard_for_author(instance.author_id)
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db == DEFAULT_DB_ALIAS or not is_shard(db):
+            return None
+        return f'{app_label}.{model_name}' in SHARDED_MODELS
+
+
+class ShardedFeed:
+    """Выборка со всех шардов, слитая по убыванию pub_date.
+
+    Поддерживает то, что нужно Paginator и get_object_or_404: filter,
+    select_related, defer, only, get, count и срезы. Для среза
+    [start:stop] из каждого шарда берутся первые stop строк, и они
+    сливаются через heapq.merge.
+    """
+    ordered = True
+
+    def __init__(self, model, querysets, related=(), related_only=None):
+        self.model = model
+        self.querysets = querysets
+        self.related = related
+        self.related_only = related_only or {}
+
+    def _clone(self, querysets=None, related=None, related_only=None):
+        return ShardedFeed(
+            self.model,
+            self.querysets if querysets is None else querysets,
+            self.related if related is None else related,
+            self.related_only if related_only is None else related_only,
+        )
+
+    def filter(self, *args, **kwargs):
+        # Подзапрос к основной базе нельзя выполнить в шарде.
+        kwargs = {
+            key: list(value) if isinstance(value, QuerySet) else value
+            for key, value in kwargs.items()
+        }
+        querysets = self.querysets
+        author = kwargs.get('author_id', kwargs.get('author'))
+        if author is not None and self.model._meta.label_lower == 'posts.post':
+            alias = shard_for_author(getattr(author, 'pk', author))
+            querysets = [qs for qs in querysets if qs.db == alias]
+        return self._clone([qs.filter(*args, **kwargs) for qs in querysets])
+
+    def select_related(self, *fields):
+        return self._clone(related=self.related + fields)
+
+    def defer(self, *fields):
+        return self._clone([qs.defer(*fields) for qs in self.querysets])
+
+    def only(self, *fields):
+        # Поля связанных моделей (author__username) применяются при
+        # догрузке из основной базы в _attach.
+        local = [name for name in fields if '__' not in name]
+        related_only = dict(self.related_only)
+        for name in fields:
+            if '__' in name:
+                relation, field = name.split('__', 1)
+                related_only[relation] = (
+                    related_only.get(relation, ()) + (field,)
+                )
+        return self._clone(
+            [qs.only(*local) for qs in self.querysets],
+            related_only=related_only,
+        )
+
+    def get(self, *args, **kwargs):
+        querysets = self.querysets
+        alias = shard_for_pk(kwargs['pk']) if 'pk' in kwargs else None
+        if alias is not None:
+            querysets = [qs for qs in querysets if qs.db == alias]
+        for queryset in querysets:
+            try:
+                obj = queryset.get(*args, **kwargs)
+            except self.model.DoesNotExist:
+                continue
+            self._attach([obj])
+            return obj
+        raise self.model.DoesNotExist(
+            f'{self.model._meta.object_name} matching query does not exist.'
+        )
+
+    def count(self):
+        return sum(queryset.count() for queryset in self.querysets)
+
+    def __len__(self):
+        return self.count()
+
+    def __iter__(self):
+        return iter(self[:])
+
+    def __getitem__(self, key):
+        if isinstance(key, int):
+            return self[key:key + 1][0]
+        start, stop = key.start or 0, key.stop
+        streams = [
+            queryset.order_by('-pub_date', '-pk')[:stop]
+            for queryset in self.querysets
+        ]
+        merged = heapq.merge(
+            *streams, key=lambda obj: (obj.pub_date, obj.pk), reverse=True
+        )
+        objects = list(islice(merged, start, stop))
+        self._attach(objects)
+        return objects
+
+    def _attach(self, objects):
+        """Догружает связанные объекты из основной базы одним запросом."""
+        for name in self.related:
+            field = self.model._meta.get_field(name)
+            ids = {getattr(obj, field.attname) for obj in objects} - {None}
+            manager = field.related_model._default_manager.using(
+                DEFAULT_DB_ALIAS
+            )
+            if name in self.related_only:
+                manager = manager.only(*self.related_only[name])
+            related = manager.in_bulk(ids)
+            for obj in objects:
+                field.set_cached_value(
+                    obj, related.get(getattr(obj, field.attname))
+                )
+
+
+class ShardedQuerySet(QuerySet):
+    def create(self, **kwargs):
+        # QuerySet.create передаёт в save базу без instance, и роутер не
+        # может выбрать шард; здесь база задаётся только явным using().
+        obj = self.model(**kwargs)
+        obj.save(force_insert=True, using=self._db)
+        return obj
+
+
+class ShardedManager(models.Manager.from_queryset(ShardedQuerySet)):
+    def sharded(self):
+        """Выборка по всем шардам; без шардирования — обычный QuerySet."""
+        if not enabled():
+            return self.get_queryset()
+        return ShardedFeed(self.model, [
+            self.get_queryset().using(alias)
+            for alias in settings.SHARD_DATABASES
+        ])
+
+    def for_author(self, author):
+        """Посты автора из его шарда."""
+        author_id = getattr(author, 'pk', author)
+        return self.get_queryset().using(
+            shard_for_author(author_id)
+        ).filter(author_id=author_id)
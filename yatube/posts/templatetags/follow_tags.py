@@ -0,0 +1,18 @@
+from django import template
+
+from posts import follow_cache
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def follow_states(context, posts):
+    """{id автора: подписан ли текущий пользователь} для постов страницы."""
+    return follow_cache.is_following_many(
+        context['request'].user, {post.author_id for post in posts}
+    )
+
+
+@register.filter
+def get_item(mapping, key):
+    return mapping.get(key)
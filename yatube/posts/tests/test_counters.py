@@ -0,0 +1,97 @@
+import threading
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from core import counters
+from core.models import CounterShard, User
+from posts.models import Comment, Follow, Group, Post, UserCounters
+
+
+class CountersTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create(username='TestUser')
+        cls.reader = User.objects.create(username='Reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test_group',
+            description='Тестовое описание'
+        )
+        cls.other_group = Group.objects.create(
+            title='Другая группа',
+            slug='other_group',
+            description='Тестовое описание'
+        )
+
+    def setUp(self):
+        counters.accumulator.clear()
+
+    def counters(self, user):
+        return UserCounters.objects.get(user=user)
+
+    def test_counters_follow_creates_and_deletes(self):
+        """Счётчики меняются при создании и удалении объектов."""
+        post = Post.objects.create(
+            text='Тестовый текст', author=self.author, group=self.group
+        )
+        Comment.objects.create(post=post, author=self.reader, text='Текст')
+        Follow.objects.create(user=self.reader, author=self.author)
+        counters.accumulator.flush()
+        post.refresh_from_db()
+        self.group.refresh_from_db()
+        self.assertEqual(post.comments_count, 1)
+        self.assertEqual(self.group.posts_count, 1)
+        self.assertEqual(self.counters(self.author).posts_count, 1)
+        self.assertEqual(self.counters(self.author).followers_count, 1)
+        self.assertEqual(self.counters(self.reader).following_count, 1)
+
+        post.group = self.other_group
+        post.save()
+        self.group.refresh_from_db()
+        self.other_group.refresh_from_db()
+        self.assertEqual(self.group.posts_count, 0)
+        self.assertEqual(self.other_group.posts_count, 1)
+
+        Follow.objects.filter(user=self.reader).delete()
+        post.delete()
+        counters.accumulator.flush()
+        self.assertEqual(self.counters(self.author).posts_count, 0)
+        self.assertEqual(self.counters(self.author).followers_count, 0)
+
+    def test_recount_repairs_counters(self):
+        """recount_counters восстанавливает счётчики после bulk_create."""
+        Post.objects.bulk_create(
+            Post(text=f'Текст {number}', author=self.author, group=self.group)
+            for number in range(3)
+        )
+        post = Post.objects.first()
+        Comment.objects.bulk_create(
+            Comment(post=post, author=self.reader, text='Текст')
+            for _ in range(2)
+        )
+        call_command('recount_counters', batch_size=1, stdout=StringIO())
+        post.refresh_from_db()
+        self.group.refresh_from_db()
+        self.assertEqual(post.comments_count, 2)
+        self.assertEqual(self.group.posts_count, 3)
+        self.assertEqual(self.counters(self.author).posts_count, 3)
+        self.assertEqual(counters.value('comments', post.pk), 2)
+        self.assertEqual(
+            CounterShard.objects.filter(name=f'comments:{post.pk}').count(), 1
+        )
+
+    @override_settings(
+        SHARDED_COUNTER_FLUSH_INTERVAL=0.01, POST_VIEWS_FLUSH_INTERVAL=0.01
+    )
+    def test_background_flush_without_requests(self):
+        """Фоновый поток сбрасывает дельты без запросов."""
+        counters.clear_all()
+        flushed = threading.Event()
+        accumulator = counters.Accumulator(lambda deltas: flushed.set())
+        accumulator.add('key')
+        counters.start_flusher()
+        self.addCleanup(counters.stop_flusher)
+        self.assertTrue(flushed.wait(5))
+        self.assertEqual(accumulator.pending('key'), 0)
@@ -0,0 +1,77 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core.models import User
+from posts.models import Follow, Group, Post
+
+
+# Сброс накопленных счётчиков по окончании запроса добавил бы запросы в
+# случайный момент и сбил бы подсчёт.
+@override_settings(
+    SHARDED_COUNTER_FLUSH_INTERVAL=3600, POST_VIEWS_FLUSH_INTERVAL=3600
+)
+class FeedProjectionTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader = User.objects.create(username='reader')
+        cls.author = User.objects.create(username='author')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test_group',
+            description='Тестовое описание'
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        cls.urls = [
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': 'test_group'}),
+            reverse('posts:profile', kwargs={'username': 'author'}),
+            reverse('posts:follow_index'),
+            reverse('posts:trending'),
+            reverse('posts:tag_posts', kwargs={'name': 'тег'}),
+            reverse('posts:mentions'),
+        ]
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def add_post(self):
+        Post.objects.create(
+            text='#тег для @reader', author=self.author, group=self.group
+        )
+
+    def get(self, url):
+        cache.clear()
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return context.captured_queries
+
+    def test_cards_do_not_load_deferred_fields(self):
+        """Число запросов ленты не растёт с числом карточек."""
+        self.add_post()
+        one_card = {url: len(self.get(url)) for url in self.urls}
+        for _ in range(4):
+            self.add_post()
+        for url in self.urls:
+            with self.subTest(url=url):
+                self.assertEqual(len(self.get(url)), one_card[url])
+
+    def test_feeds_select_only_card_columns(self):
+        """Ленты не читают пароль автора, описание группы и текст поста."""
+        self.add_post()
+        for url in self.urls:
+            sql = [
+                query['sql'] for query in self.get(url)
+                if 'FROM "posts_post"' in query['sql']
+                and 'COUNT' not in query['sql']
+            ]
+            with self.subTest(url=url):
+                self.assertTrue(sql)
+                for statement in sql:
+                    self.assertNotIn('"password"', statement)
+                    self.assertNotIn('"description"', statement)
+                    self.assertNotIn('"posts_post"."text"', statement)
@@ -0,0 +1,75 @@
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from core.models import User
+from posts import follow_cache
+from posts.models import Follow, Post
+
+
+class FollowCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader = User.objects.create(username='reader')
+        cls.authors = [
+            User.objects.create(username=f'author{number}')
+            for number in range(3)
+        ]
+        for author in cls.authors:
+            Post.objects.create(text='Тестовый текст', author=author)
+        Follow.objects.create(user=cls.reader, author=cls.authors[1])
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def test_is_following_many_loads_once(self):
+        """Подписки загружаются одним запросом и дальше берутся из кэша."""
+        ids = [author.pk for author in self.authors]
+        with self.assertNumQueries(1):
+            states = follow_cache.is_following_many(self.reader, ids)
+        with self.assertNumQueries(0):
+            self.assertTrue(
+                follow_cache.is_following(self.reader, self.authors[1].pk)
+            )
+        self.assertEqual(states, {
+            self.authors[0].pk: False,
+            self.authors[1].pk: True,
+            self.authors[2].pk: False,
+        })
+
+    def test_follow_and_unfollow_invalidate_cache(self):
+        """Подписка и отписка через views сбрасывают кэш."""
+        author = self.authors[0]
+        self.assertFalse(follow_cache.is_following(self.reader, author.pk))
+        self.client.get(
+            reverse('posts:profile_follow', kwargs={'username': 'author0'})
+        )
+        self.assertTrue(follow_cache.is_following(self.reader, author.pk))
+        self.client.get(
+            reverse('posts:profile_unfollow', kwargs={'username': 'author0'})
+        )
+        self.assertFalse(follow_cache.is_following(self.reader, author.pk))
+
+    def test_feed_cards_show_follow_buttons(self):
+        """На карточках ленты есть кнопки подписки по состоянию."""
+        response = self.client.get(reverse('posts:index'))
+        content = response.content.decode()
+        self.assertEqual(content.count('>Отписаться</a>'), 1)
+        self.assertEqual(content.count('>Подписаться</a>'), 2)
+        self.assertIn(
+            reverse('posts:profile_unfollow', kwargs={'username': 'author1'}),
+            content
+        )
+
+    def test_cached_index_shows_current_follow_state(self):
+        """Кэш главной не показывает кнопку до подписки после неё."""
+        url = reverse('posts:index')
+        self.assertEqual(
+            self.client.get(url).content.decode().count('>Отписаться</a>'), 1
+        )
+        Follow.objects.create(user=self.reader, author=self.authors[0])
+        self.assertEqual(
+            self.client.get(url).content.decode().count('>Отписаться</a>'), 2
+        )
@@ -0,0 +1,92 @@
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from core.models import User
+from posts import hashtags
+from posts.models import Mention, Post, PostTag, Tag
+
+
+class HashtagsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create(username='TestUser')
+        cls.reader = User.objects.create(username='reader')
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def test_extract_tags_and_mentions(self):
+        """Теги приводятся к нижнему регистру, точка в конце отбрасывается."""
+        text = 'Про #Django и #джанго, не #1 и не a#b. Привет, @reader.'
+        self.assertEqual(hashtags.extract_tags(text), ['django', 'джанго'])
+        self.assertEqual(hashtags.extract_mentions(text), ['reader'])
+
+    def test_save_updates_tags_and_mentions(self):
+        """Правка поста заменяет его теги и упоминания."""
+        post = Post.objects.create(
+            text='#django для @reader и @nobody', author=self.author
+        )
+        self.assertEqual(
+            list(PostTag.objects.values_list('tag__name', 'post_id')),
+            [('django', post.pk)]
+        )
+        self.assertEqual(
+            list(Mention.objects.values_list('user', flat=True)),
+            [self.reader.pk]
+        )
+        post.text = '#python'
+        post.save()
+        self.assertEqual(
+            list(PostTag.objects.values_list('tag__name', flat=True)),
+            ['python']
+        )
+        self.assertFalse(Mention.objects.exists())
+        post.delete()
+        self.assertFalse(PostTag.objects.exists())
+
+    def test_tag_feed_uses_keyset_pagination(self):
+        """Лента тега листается курсором от новых постов к старым."""
+        posts = [
+            Post.objects.create(text=f'#Django {number}', author=self.author)
+            for number in range(12)
+        ]
+        Post.objects.create(text='без тега', author=self.author)
+        url = reverse('posts:tag_posts', kwargs={'name': 'DJANGO'})
+        response = self.client.get(url)
+        self.assertEqual(response.context['posts'], posts[:1:-1])
+        cursor = response.context['next_cursor']
+        response = self.client.get(url, {'cursor': cursor})
+        self.assertEqual(response.context['posts'], posts[1::-1])
+        self.assertIsNone(response.context['next_cursor'])
+        for cursor in ('bad', '99999999999999999999_1', '1_' + '9' * 20,
+                       '-1_1', '1_0'):
+            with self.subTest(cursor=cursor):
+                self.assertEqual(
+                    self.client.get(url, {'cursor': cursor}).status_code, 404
+                )
+
+    def test_mentions_feed(self):
+        """/mentions/ показывает посты с упоминанием пользователя."""
+        post = Post.objects.create(text='Привет, @reader', author=self.author)
+        Post.objects.create(text='Привет, @TestUser', author=self.reader)
+        response = self.client.get(reverse('posts:mentions'))
+        self.assertEqual(response.context['posts'], [post])
+
+    def test_backfill_in_parallel(self):
+        """index_hashtags разбирает посты, созданные в обход save()."""
+        Post.objects.bulk_create(
+            Post(text=f'#тег{number % 3} @reader', author=self.author)
+            for number in range(7)
+        )
+        call_command(
+            'index_hashtags', batch_size=2, workers=2, stdout=StringIO()
+        )
+        self.assertEqual(Tag.objects.count(), 3)
+        self.assertEqual(PostTag.objects.count(), 7)
+        self.assertEqual(self.reader.mentions.count(), 7)
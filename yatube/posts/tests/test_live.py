@@ -0,0 +1,60 @@
+import json
+import os
+
+from django.conf import settings
+from django.db import transaction
+from django.test import Client, TransactionTestCase
+from django.urls import reverse
+
+from core import keyset, sse
+from core.models import User
+from core.tests.utils import TempDirMixin
+from posts.models import Follow, Post
+
+
+class LiveTests(TempDirMixin, TransactionTestCase):
+    temp_settings = {'PUBSUB_LOG': 'pubsub.ndjson'}
+
+    def setUp(self):
+        self.reader = User.objects.create(username='reader')
+        self.author = User.objects.create(username='author')
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def tearDown(self):
+        if os.path.exists(settings.PUBSUB_LOG):
+            os.remove(settings.PUBSUB_LOG)
+
+    def events(self):
+        if not os.path.exists(settings.PUBSUB_LOG):
+            return []
+        with open(settings.PUBSUB_LOG) as log:
+            return [json.loads(line) for line in log]
+
+    def test_new_post_published_after_commit(self):
+        with transaction.atomic():
+            post = Post.objects.create(text='Текст', author=self.author)
+            self.assertEqual(self.events(), [])
+        self.assertEqual(self.events(), [{
+            'scopes': ['all', f'author:{self.author.pk}'],
+            'data': {
+                'id': post.pk,
+                'author': self.author.pk,
+                'cursor': keyset.encode(post.pub_date, post.pk),
+            },
+        }])
+
+    def test_feed_tokens(self):
+        """Главная слушает все посты, лента подписок — своих авторов."""
+        response = self.client.get(reverse('posts:follow_index'))
+        self.assertIsNone(response.context['events_token'])
+        Follow.objects.create(user=self.reader, author=self.author)
+        response = self.client.get(reverse('posts:follow_index'))
+        self.assertEqual(
+            sse.read_token(response.context['events_token']),
+            [f'author:{self.author.pk}']
+        )
+        response = self.client.get(reverse('posts:index'))
+        self.assertEqual(
+            sse.read_token(response.context['events_token']), ['all']
+        )
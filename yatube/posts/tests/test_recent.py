@@ -0,0 +1,133 @@
+import os
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.test import Client, TransactionTestCase, override_settings
+from django.urls import reverse
+
+from core import keyset
+from core.models import User
+from core.tests.utils import TempDirMixin
+from posts import recent
+from posts.models import Follow, Group, Post
+
+
+@override_settings(RECENT_POSTS_SIZE=5)
+class NewPostsTests(TempDirMixin, TransactionTestCase):
+    temp_settings = {'PUBSUB_LOG': 'pubsub.ndjson'}
+
+    def setUp(self):
+        cache.clear()
+        recent.reset()
+        self.addCleanup(recent.reset)
+        self.reader = User.objects.create(username='reader')
+        self.author = User.objects.create(username='author')
+        self.group = Group.objects.create(
+            title='Тестовая группа', slug='test_group', description=''
+        )
+        self.first = Post.objects.create(text='Старый', author=self.author)
+        self.cursor = keyset.encode(self.first.pub_date, self.first.pk)
+        self.client = Client()
+
+    def tearDown(self):
+        if os.path.exists(settings.PUBSUB_LOG):
+            os.remove(settings.PUBSUB_LOG)
+
+    def poll(self, scope, cursor=None):
+        response = self.client.get(reverse('posts:new_posts', kwargs={
+            'scope': scope, 'cursor': cursor or self.cursor
+        }))
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_buffer_answers_without_queries(self):
+        """После первого опроса новые посты берутся из буфера."""
+        self.assertEqual(self.poll('all')['ids'], [])
+        posts = [
+            Post.objects.create(text='Новый', author=self.author)
+            for _ in range(2)
+        ]
+        with self.assertNumQueries(0):
+            data = self.poll('all')
+        self.assertEqual(data['ids'], [post.pk for post in reversed(posts)])
+        self.assertEqual(data['count'], 2)
+        self.assertFalse(data['more'])
+        with self.assertNumQueries(0):
+            self.assertEqual(self.poll('all', data['cursor'])['ids'], [])
+
+    def test_scopes(self):
+        other = User.objects.create(username='other')
+        in_group = Post.objects.create(
+            text='В группе', author=other, group=self.group
+        )
+        by_author = Post.objects.create(text='Автора', author=self.author)
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.client.force_login(self.reader)
+        self.assertEqual(
+            self.poll('group:test_group')['ids'], [in_group.pk]
+        )
+        self.assertEqual(self.poll('author:author')['ids'], [by_author.pk])
+        self.assertEqual(self.poll('follow')['ids'], [by_author.pk])
+        self.assertEqual(
+            self.poll('all')['ids'], [by_author.pk, in_group.pk]
+        )
+
+    @mock.patch.object(recent, 'CHUNK_SIZE', 2)
+    def test_subscriptions_are_read_in_chunks(self):
+        """id подписок делятся на пачки, результаты сливаются по ключу."""
+        authors = [self.author] + [
+            User.objects.create(username=f'author{number}')
+            for number in range(6)
+        ]
+        for author in authors:
+            Follow.objects.create(user=self.reader, author=author)
+        posts = [
+            Post.objects.create(text='Новый', author=author)
+            for author in authors
+        ]
+        self.client.force_login(self.reader)
+        data = self.poll('follow')
+        self.assertEqual(
+            data['ids'], [post.pk for post in reversed(posts)][:5]
+        )
+        self.assertTrue(data['more'])
+
+    def test_overflow_and_old_cursor(self):
+        """Курсор старше буфера читается из базы, лишнее отмечается more."""
+        for _ in range(7):
+            Post.objects.create(text='Новый', author=self.author)
+        data = self.poll('all')
+        self.assertEqual(data['count'], 5)
+        self.assertTrue(data['more'])
+        self.assertEqual(
+            self.poll('all', data['cursor']), {
+                'count': 0, 'more': False, 'ids': [],
+                'cursor': data['cursor'],
+            }
+        )
+
+    @override_settings(PUBSUB_LOG_MAX_BYTES=150)
+    def test_lost_events_drop_buffers(self):
+        """Пропущенный при двойной ротации файл не теряет посты."""
+        self.assertEqual(self.poll('all')['ids'], [])
+        posts = [
+            Post.objects.create(text='Новый', author=self.author)
+            for _ in range(4)
+        ]
+        self.assertEqual(
+            self.poll('all')['ids'], [post.pk for post in reversed(posts)]
+        )
+
+    def test_bad_requests(self):
+        for cursor in ('bad', '9' * 20 + '_1', '1_' + '9' * 20):
+            with self.subTest(cursor=cursor):
+                response = self.client.get(reverse(
+                    'posts:new_posts',
+                    kwargs={'scope': 'all', 'cursor': cursor}
+                ))
+                self.assertEqual(response.status_code, 404)
+        response = self.client.get(reverse('posts:new_posts', kwargs={
+            'scope': 'group:missing', 'cursor': self.cursor
+        }))
+        self.assertEqual(response.status_code, 404)
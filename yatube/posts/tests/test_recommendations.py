@@ -0,0 +1,82 @@
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from core.models import User
+from posts import recommendations
+from posts.follow_graph import FollowGraph
+from posts.models import Follow
+
+
+class RecommendationsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader, cls.author, cls.first, cls.second, cls.other, cls.fan = [
+            User.objects.create(username=name) for name in (
+                'reader', 'author', 'first', 'second', 'other', 'fan'
+            )
+        ]
+        for user, author in (
+            (cls.reader, cls.author),
+            (cls.author, cls.first),
+            (cls.author, cls.second),
+            (cls.fan, cls.author),
+            (cls.fan, cls.other),
+        ):
+            Follow.objects.create(user=user, author=author)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_graph_is_loaded_in_batches(self):
+        """Граф из пачек совпадает с подписками в базе."""
+        graph = FollowGraph.load(batch_size=2)
+        author = graph.index(self.author.pk)
+        self.assertEqual(
+            list(graph.ids[graph.following.row(author)]),
+            [self.first.pk, self.second.pk]
+        )
+        self.assertEqual(
+            list(graph.ids[graph.followers.row(author)]),
+            [self.reader.pk, self.fan.pk]
+        )
+        self.assertIsNone(graph.index(0))
+
+    def test_recommend_scores_friends_and_cofollowers(self):
+        """Друзья друзей идут выше авторов соподписчиков."""
+        graph = FollowGraph.load()
+        self.assertEqual(
+            recommendations.recommend(graph, self.reader.pk),
+            [(self.first.pk, 1.0), (self.second.pk, 1.0),
+             (self.other.pk, 0.25)]
+        )
+
+    def test_new_user_gets_popular_authors(self):
+        """Пользователю без подписок предлагаются популярные авторы."""
+        newcomer = User.objects.create(username='newcomer')
+        graph = FollowGraph.load()
+        self.assertEqual(
+            recommendations.recommend(graph, newcomer.pk, limit=1),
+            [(self.author.pk, 2.0)]
+        )
+
+    def test_precomputed_recommendations_are_served(self):
+        """Рекомендации берутся из предрасчёта и убираются при подписке."""
+        call_command('recommend_authors', batch_size=2, stdout=StringIO())
+        client = Client()
+        client.force_login(self.reader)
+        response = client.get(reverse('posts:follow_index'))
+        self.assertEqual(
+            response.context['who_to_follow'],
+            [self.first, self.second, self.other]
+        )
+        Follow.objects.create(user=self.reader, author=self.first)
+        response = client.get(
+            reverse('posts:profile', kwargs={'username': 'first'})
+        )
+        self.assertEqual(
+            response.context['who_to_follow'], [self.second, self.other]
+        )
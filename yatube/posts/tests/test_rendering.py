@@ -0,0 +1,77 @@
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core.models import User
+from posts import rendering
+from posts.models import Post
+
+
+class RenderingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create(username='TestUser')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_text_is_escaped_and_linkified(self):
+        """Текст экранируется, ссылки, теги и упоминания становятся <a>."""
+        post = Post.objects.create(
+            text='<b>Привет</b>, @TestUser и @nobody! #Django: '
+                 'https://example.com/?a=1&b=2.',
+            author=self.author
+        )
+        self.assertEqual(
+            post.text_html,
+            '&lt;b&gt;Привет&lt;/b&gt;, '
+            '<a href="/profile/TestUser/">@TestUser</a> и @nobody! '
+            '<a href="/tag/django/">#Django</a>: '
+            '<a href="https://example.com/?a=1&amp;b=2" '
+            'rel="nofollow noopener">https://example.com/?a=1&amp;b=2</a>.'
+        )
+
+    @override_settings(POST_EXCERPT_LENGTH=10)
+    def test_excerpt_is_truncated(self):
+        """Начало текста обрезается до POST_EXCERPT_LENGTH символов."""
+        post = Post.objects.create(text='а' * 20, author=self.author)
+        self.assertEqual(post.excerpt_html, 'а' * 9 + '…')
+
+    @override_settings(POST_EXCERPT_LENGTH=20)
+    def test_excerpt_drops_cut_token(self):
+        """Ссылка, тег или упоминание на месте обреза отбрасываются."""
+        for token in ('https://example.com/page', '#длинныйтег',
+                      '@TestUser'):
+            with self.subTest(token=token):
+                post = Post.objects.create(
+                    text=f'Начало текста {token} конец', author=self.author
+                )
+                self.assertEqual(post.excerpt_html, 'Начало текста…')
+
+    def test_feeds_do_not_load_full_text(self):
+        """Ленты выводят начало текста и не читают колонку text."""
+        Post.objects.create(text='слово ' * 200, author=self.author)
+        with CaptureQueriesContext(connection) as context:
+            response = Client().get(reverse('posts:index'))
+        self.assertNotIn('слово ' * 60, response.content.decode())
+        post_queries = [
+            query['sql'] for query in context.captured_queries
+            if 'FROM "posts_post"' in query['sql']
+        ]
+        self.assertTrue(post_queries)
+        for sql in post_queries:
+            self.assertNotIn('"posts_post"."text"', sql)
+            self.assertNotIn('"posts_post"."text_html"', sql)
+
+    def test_render_posts_command(self):
+        """render_posts заполняет HTML постов, созданных в обход save()."""
+        Post.objects.bulk_create([Post(text='#тег', author=self.author)])
+        call_command('render_posts', stdout=StringIO())
+        self.assertEqual(
+            Post.objects.get().text_html, rendering.linkify('#тег', set())
+        )
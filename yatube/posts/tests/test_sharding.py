@@ -0,0 +1,185 @@
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connections, transaction
+from django.test import Client, TransactionTestCase, override_settings
+from django.urls import reverse
+
+from core.models import User
+from posts import sharding, view_counter
+from core import counters
+from posts.models import (
+    Comment, Follow, Group, Mention, Post, PostEvent, PostTag, UserCounters
+)
+
+SHARDS = ['shard_a', 'shard_b']
+
+
+@override_settings(SHARD_DATABASES=SHARDS)
+class ShardingTests(TransactionTestCase):
+    databases = {'default', *SHARDS}
+
+    @classmethod
+    def setUpClass(cls):
+        # Базы шардов должны быть известны до TransactionTestCase.setUpClass.
+        cls.temp_dir = tempfile.mkdtemp()
+        for alias in SHARDS:
+            connections.databases[alias] = {
+                'ENGINE': 'django.db.backends.sqlite3',
+                'NAME': os.path.join(cls.temp_dir, f'{alias}.sqlite3'),
+            }
+        super().setUpClass()
+        for alias in SHARDS:
+            call_command('migrate', database=alias, verbosity=0)
+            # migrate включает проверку внешних ключей обратно.
+            connections[alias].close()
+
+    @classmethod
+    def tearDownClass(cls):
+        for alias in SHARDS:
+            connections[alias].close()
+            del connections.databases[alias]
+        super().tearDownClass()
+        shutil.rmtree(cls.temp_dir, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        for alias in SHARDS:
+            sharding.seed_sequences(alias)
+        self.authors = {}
+        number = 0
+        while len(self.authors) < len(SHARDS):
+            user = User.objects.create(username=f'author{number}')
+            self.authors.setdefault(sharding.shard_for_author(user.pk), user)
+            number += 1
+        self.reader = User.objects.create(username='reader')
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def test_posts_and_comments_go_to_author_shard(self):
+        """Пост и комментарии к нему пишутся в шард автора поста."""
+        for alias, author in self.authors.items():
+            post = Post.objects.create(text=f'Пост {alias}', author=author)
+            self.assertEqual(post._state.db, alias)
+            self.assertEqual(sharding.shard_for_pk(post.pk), alias)
+            self.client.post(
+                reverse('posts:add_comment', kwargs={'post_id': post.pk}),
+                {'text': 'Комментарий'}
+            )
+            self.assertEqual(
+                Comment.objects.using(alias).get().post_id, post.pk
+            )
+            response = self.client.get(
+                reverse('posts:post_detail', kwargs={'post_id': post.pk})
+            )
+            self.assertEqual(len(response.context['comments']), 1)
+        self.assertFalse(Post.objects.using('default').exists())
+
+    def test_feeds_merge_shards_by_pub_date(self):
+        """Главная и подписки сливают шарды по убыванию даты."""
+        expected = []
+        for number in range(settings.NUMBER_OF_POSTS + 2):
+            author = list(self.authors.values())[number % len(SHARDS)]
+            expected.insert(
+                0, Post.objects.create(text=f'Пост {number}', author=author)
+            )
+        response = self.client.get(reverse('posts:index'))
+        page = response.context['page_obj']
+        self.assertEqual(page.paginator.count, len(expected))
+        self.assertEqual(
+            [post.pk for post in page],
+            [post.pk for post in expected[:settings.NUMBER_OF_POSTS]]
+        )
+        self.assertEqual(page[0].author, expected[0].author)
+
+        followed = self.authors[SHARDS[0]]
+        Follow.objects.create(user=self.reader, author=followed)
+        response = self.client.get(reverse('posts:follow_index'))
+        self.assertEqual(
+            {post.author_id for post in response.context['page_obj']},
+            {followed.pk}
+        )
+
+    def test_shard_posts_moves_existing_rows(self):
+        """shard_posts переносит посты и комментарии, сохраняя id и даты."""
+        with override_settings(SHARD_DATABASES=[]):
+            posts = [
+                Post.objects.create(text='Старый пост', author=author)
+                for author in self.authors.values()
+            ]
+            Comment.objects.create(
+                text='Комментарий', post=posts[0], author=self.reader
+            )
+        call_command('shard_posts', batch_size=1, stdout=StringIO())
+        self.assertFalse(Post.objects.using('default').exists())
+        self.assertFalse(Comment.objects.using('default').exists())
+        for post in posts:
+            moved = Post.objects.sharded().get(pk=post.pk)
+            self.assertEqual(
+                moved._state.db, sharding.shard_for_author(post.author_id)
+            )
+            self.assertEqual(moved.pub_date, post.pub_date)
+        self.assertEqual(
+            Post.objects.sharded().get(pk=posts[0].pk).comments.count(), 1
+        )
+
+    def test_shard_posts_keeps_counters_tags_and_trending(self):
+        """Перенос не считается удалением: счётчики и связи остаются."""
+        author = self.authors[SHARDS[0]]
+        group = Group.objects.create(title='Группа', slug='group')
+        with override_settings(SHARD_DATABASES=[]):
+            post = Post.objects.create(
+                text='Пост #тег @reader', author=author, group=group
+            )
+            Comment.objects.create(
+                text='Комментарий', post=post, author=self.reader
+            )
+            counters.accumulator.flush()
+        call_command('shard_posts', stdout=StringIO())
+        counters.accumulator.flush()
+        group.refresh_from_db()
+        self.assertEqual(group.posts_count, 1)
+        self.assertEqual(
+            UserCounters.objects.get(user=author).posts_count, 1
+        )
+        self.assertEqual(
+            Post.objects.sharded().get(pk=post.pk).comments_count, 1
+        )
+        self.assertTrue(PostTag.objects.filter(post_id=post.pk).exists())
+        self.assertTrue(Mention.objects.filter(post_id=post.pk).exists())
+        self.assertTrue(PostEvent.objects.filter(post_id=post.pk).exists())
+
+    def test_views_of_moved_posts_are_saved(self):
+        """Просмотры поста со старым id доходят до его копии в шарде."""
+        with override_settings(SHARD_DATABASES=[]):
+            post = Post.objects.create(
+                text='Старый пост', author=self.authors[SHARDS[0]]
+            )
+        call_command('shard_posts', stdout=StringIO())
+        view_counter.accumulator.clear()
+        view_counter.accumulator.add(post.pk, 3)
+        view_counter.accumulator.flush()
+        self.assertEqual(
+            Post.objects.sharded().get(pk=post.pk).views_count, 3
+        )
+
+    def test_new_post_published_after_shard_commit(self):
+        """Событие о посте уходит после фиксации транзакции его шарда."""
+        alias = SHARDS[0]
+        log = os.path.join(self.temp_dir, 'pubsub.ndjson')
+        with override_settings(PUBSUB_LOG=log):
+            with transaction.atomic(using=alias):
+                post = Post.objects.create(
+                    text='Пост', author=self.authors[alias]
+                )
+                self.assertFalse(os.path.exists(log))
+            with open(log) as events:
+                self.assertEqual(
+                    json.loads(events.read())['data']['id'], post.pk
+                )
@@ -0,0 +1,79 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from core.models import User
+from posts import trending
+from posts.models import Comment, Follow, Post, PostEvent, PostScore
+
+
+class TrendingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create(username='TestUser')
+        cls.reader = User.objects.create(username='Reader')
+        cls.old_post = Post.objects.create(
+            text='Старый пост', author=cls.author
+        )
+        cls.new_post = Post.objects.create(
+            text='Новый пост', author=cls.author
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_comments_raise_post_in_trending(self):
+        """Комментарии поднимают пост выше более свежего."""
+        for _ in range(3):
+            Comment.objects.create(
+                post=self.old_post, author=self.reader, text='Текст'
+            )
+        self.assertEqual(trending.top(), [self.old_post, self.new_post])
+        response = Client().get(reverse('posts:trending'))
+        self.assertEqual(
+            list(response.context['page_obj']), [self.old_post, self.new_post]
+        )
+
+    def test_old_events_decay(self):
+        """Событие двух периодов полураспада давности весит вчетверо меньше."""
+        half_life = timedelta(seconds=settings.TRENDING_HALF_LIFE)
+        now = timezone.now()
+        trending.add('comment', {self.old_post.pk: 4}, now - 2 * half_life)
+        trending.add('comment', {self.new_post.pk: 1}, now)
+        old = PostScore.objects.get(post_id=self.old_post.pk).score
+        new = PostScore.objects.get(post_id=self.new_post.pk).score
+        # Оба поста опубликованы почти в момент now: 1 + 4/4 == 1 + 1.
+        self.assertAlmostEqual(old, new, places=3)
+
+    def test_recompute_matches_incremental_scores(self):
+        """Пересчёт из событий даёт те же значения и чистит старые."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        Comment.objects.create(
+            post=self.old_post, author=self.reader, text='Текст'
+        )
+        trending.add('view', {self.old_post.pk: 5, self.new_post.pk: 2})
+        expected = dict(PostScore.objects.values_list('post_id', 'score'))
+        stale = Post.objects.create(text='Давний пост', author=self.reader)
+        PostEvent.objects.filter(post_id=stale.pk).update(
+            created=timezone.now() - timedelta(
+                seconds=settings.TRENDING_EVENT_RETENTION + 1
+            )
+        )
+        call_command('recompute_trending', batch_size=2, stdout=StringIO())
+        scores = dict(PostScore.objects.values_list('post_id', 'score'))
+        self.assertEqual(set(scores), set(expected))
+        for post_id, score in expected.items():
+            self.assertAlmostEqual(scores[post_id], score, places=6)
+
+    def test_deleted_post_leaves_trending(self):
+        """Удалённый пост пропадает из рейтинга."""
+        post = Post.objects.create(text='Удаляемый пост', author=self.author)
+        post.delete()
+        self.assertFalse(PostScore.objects.filter(post_id=post.pk).exists())
+        self.assertNotIn(post, trending.top())
@@ -65,10 +65,18 @@ class PostURLTests(TestCase):
         response = self.guest_client.get('posts/home/')
         self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
 
+    def test_not_found_page_is_prerendered(self):
+        """Гость получает готовую страницу 404 с адресом запроса."""
+        response = self.guest_client.get('/12/')
+        self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+        self.assertContains(
+            response, 'Страницы с адресом /12/ не существует',
+            status_code=HTTPStatus.NOT_FOUND
+        )
+
     def test_post_url_uses_correct_template(self):
         """Проверка шаблонов для неавторизованного пользователя."""
         templates_url_names = {
-            '/12/': 'core/404.html',
             '/': 'posts/index.html',
             f'/group/{self.group.slug}/': 'posts/group_list.html',
             f'/profile/{self.user.username}/': 'posts/profile.html',
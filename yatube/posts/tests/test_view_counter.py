@@ -0,0 +1,89 @@
+from django.core.cache import cache, caches
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core.models import User
+from posts import view_counter
+from posts.checks import check_view_dedupe_cache
+from posts.models import Post
+
+
+class ViewCounterTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create(username='TestUser')
+        cls.posts = [
+            Post.objects.create(text=f'Текст {number}', author=cls.author)
+            for number in range(3)
+        ]
+
+    def setUp(self):
+        cache.clear()
+        view_counter.accumulator.clear()
+
+    def view(self, client, post):
+        return client.get(
+            reverse('posts:post_detail', kwargs={'post_id': post.pk})
+        )
+
+    def test_repeat_views_are_counted_once(self):
+        """Повторный просмотр в той же сессии не увеличивает счётчик."""
+        post = self.posts[0]
+        reader = User.objects.create(username='Reader')
+        client = Client()
+        client.force_login(reader)
+        self.view(client, post)
+        response = self.view(client, post)
+        self.view(Client(REMOTE_ADDR='10.0.0.1'), post)
+        self.view(Client(REMOTE_ADDR='10.0.0.2'), post)
+        self.assertEqual(response.context['views_count'], 1)
+        self.assertEqual(view_counter.accumulator.pending(post.pk), 3)
+        post.refresh_from_db()
+        self.assertEqual(post.views_count, 0)
+
+    def test_flush_writes_all_posts_in_one_update(self):
+        """Сброс записывает просмотры всех постов одним UPDATE."""
+        for number, post in enumerate(self.posts):
+            view_counter.accumulator.add(post.pk, number + 1)
+        with CaptureQueriesContext(connection) as context:
+            view_counter.accumulator.flush()
+        updates = [
+            query for query in context.captured_queries
+            if query['sql'].startswith('UPDATE "posts_post"')
+        ]
+        self.assertEqual(len(updates), 1)
+        for number, post in enumerate(self.posts):
+            post.refresh_from_db()
+            self.assertEqual(post.views_count, number + 1)
+        self.assertEqual(view_counter.accumulator.pending(self.posts[0].pk), 0)
+
+    def test_dedupe_cache_must_be_shared(self):
+        """С кэшем отметок в памяти процесса check --deploy — ошибка."""
+        self.assertEqual(
+            [error.id for error in check_view_dedupe_cache(None)],
+            ['posts.E001']
+        )
+        with self.settings(CACHES={'default': {
+            'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+            'LOCATION': 'cache_table',
+        }}):
+            self.assertEqual(check_view_dedupe_cache(None), [])
+
+    @override_settings(
+        CACHES={
+            'default': {'BACKEND': 'core.cache.InstrumentedLocMemCache'},
+            'views': {
+                'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+                'LOCATION': 'views',
+            },
+        },
+        POST_VIEWS_DEDUPE_CACHE='views',
+    )
+    def test_dedupe_uses_configured_cache(self):
+        caches['views'].clear()
+        self.view(Client(), self.posts[0])
+        self.assertTrue(any(
+            'post_view:' in key for key in caches['views']._cache
+        ))
@@ -0,0 +1,174 @@
+"""Рейтинг «в тренде» с экспоненциальным затуханием.
+
+Событие весом w в момент t к моменту now даёт посту w·2^(-(now - t)/H),
+где H — TRENDING_HALF_LIFE. Множитель 2^(-now/H) у всех постов общий и
+на порядок не влияет, поэтому в PostScore.score хранится
+ln Σ w·2^(t/H): значение не зависит от now, не переполняется и при новом
+событии меняется одним UPDATE со сложением в логарифмической шкале. Топ
+читается одним запросом по индексу score.
+
+События пишутся и в PostEvent: recompute() пересчитывает рейтинг из них
+пачками на NumPy, исправляя пропущенные обновления, и удаляет события
+старше TRENDING_EVENT_RETENTION вместе с постами, у которых их не
+осталось. События, пришедшие во время пересчёта, попадут в рейтинг при
+следующем.
+"""
+import math
+from datetime import timedelta
+
+import numpy as np
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F, FloatField, Value
+from django.db.models.functions import Abs, Exp, Greatest, Ln
+from django.db.models.signals import post_delete, post_save
+from django.utils import timezone
+
+from posts.models import Comment, Follow, Post, PostEvent, PostScore
+
+
+def _rate():
+    return math.log(2) / settings.TRENDING_HALF_LIFE
+
+
+def log_weight(weight, moment):
+    """Вклад события в PostScore.score."""
+    return math.log(weight) + moment.timestamp() * _rate()
+
+
+def _log_add(value):
+    # ln(e^score + e^value) = max + ln(1 + e^-|score - value|)
+    value = Value(value, output_field=FloatField())
+    return Greatest(F('score'), value) + Ln(
+        Value(1.0, output_field=FloatField()) + Exp(-Abs(F('score') - value))
+    )
+
+
+def _add_score(post_id, value):
+    scores = PostScore.objects.filter(post_id=post_id)
+    if scores.update(score=_log_add(value)):
+        return
+    try:
+        with transaction.atomic():
+            PostScore.objects.create(post_id=post_id, score=value)
+    except IntegrityError:
+        scores.update(score=_log_add(value))
+
+
+def add(kind, counts, moment=None):
+    """Учитывает события вида kind; counts — {id поста: число событий}."""
+    moment = moment or timezone.now()
+    weight = settings.TRENDING_WEIGHTS[kind]
+    counts = {pk: count for pk, count in counts.items() if count > 0}
+    PostEvent.objects.bulk_create(
+        PostEvent(post_id=pk, weight=weight * count, created=moment)
+        for pk, count in counts.items()
+    )
+    for pk, count in counts.items():
+        _add_score(pk, log_weight(weight * count, moment))
+
+
+def top(limit=None):
+    """Посты с наибольшим рейтингом, по убыванию."""
+    ids = list(
+        PostScore.objects.order_by('-score')
+        .values_list('post_id', flat=True)[:limit or settings.TRENDING_SIZE]
+    )
+    posts = {
+        post.pk: post for post in Post.objects.feed().filter(pk__in=ids)
+    }
+    return [posts[pk] for pk in ids if pk in posts]
+
+
+def _log_sum_by(ids, values):
+    """ln Σ e^value для каждого id: (уникальные id, суммы)."""
+    unique, inverse = np.unique(ids, return_inverse=True)
+    maxima = np.full(len(unique), -np.inf)
+    np.maximum.at(maxima, inverse, values)
+    sums = np.bincount(
+        inverse, weights=np.exp(values - maxima[inverse]),
+        minlength=len(unique)
+    )
+    return unique, maxima + np.log(sums)
+
+
+def _event_batches(batch_size):
+    last_pk = 0
+    while True:
+        rows = list(
+            PostEvent.objects.filter(pk__gt=last_pk).order_by('pk')
+            .values_list('pk', 'post_id', 'weight', 'created')[:batch_size]
+        )
+        if not rows:
+            return
+        last_pk = rows[-1][0]
+        yield (
+            np.fromiter((row[1] for row in rows), np.int64, len(rows)),
+            np.fromiter((row[2] for row in rows), np.float64, len(rows)),
+            np.fromiter(
+                (row[3].timestamp() for row in rows), np.float64, len(rows)
+            ),
+        )
+
+
+def recompute(batch_size=10000):
+    """Пересчитывает рейтинг из PostEvent; возвращает число постов в нём."""
+    cutoff = timezone.now() - timedelta(
+        seconds=settings.TRENDING_EVENT_RETENTION
+    )
+    PostEvent.objects.filter(created__lt=cutoff).delete()
+    partial_ids, partial_scores = [], []
+    for ids, weights, moments in _event_batches(batch_size):
+        ids, scores = _log_sum_by(ids, np.log(weights) + moments * _rate())
+        partial_ids.append(ids)
+        partial_scores.append(scores)
+    if partial_ids:
+        ids, scores = _log_sum_by(
+            np.concatenate(partial_ids), np.concatenate(partial_scores)
+        )
+    else:
+        ids, scores = np.empty(0, np.int64), np.empty(0)
+    with transaction.atomic():
+        PostScore.objects.all().delete()
+        PostScore.objects.bulk_create(
+            (
+                PostScore(post_id=int(pk), score=float(score))
+                for pk, score in zip(ids, scores)
+            ),
+            batch_size=500,
+        )
+    return len(ids)
+
+
+def post_saved(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        add('post', {instance.pk: 1}, instance.pub_date)
+
+
+def post_deleted(sender, instance, **kwargs):
+    PostEvent.objects.filter(post_id=instance.pk).delete()
+    PostScore.objects.filter(post_id=instance.pk).delete()
+
+
+def comment_saved(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        add('comment', {instance.post_id: 1})
+
+
+def follow_saved(sender, instance, created, raw=False, **kwargs):
+    # Подписка поднимает последний пост автора: скорее всего, из-за него
+    # на автора и подписались.
+    if not created or raw:
+        return
+    latest = Post.objects.for_author(instance.author_id).order_by(
+        '-pub_date'
+    ).values_list('pk', flat=True).first()
+    if latest is not None:
+        add('follow', {latest: 1})
+
+
+def connect():
+    post_save.connect(post_saved, sender=Post)
+    post_delete.connect(post_deleted, sender=Post)
+    post_save.connect(comment_saved, sender=Comment)
+    post_save.connect(follow_saved, sender=Follow)
@@ -5,7 +5,14 @@ app_name = 'posts'
 
 urlpatterns = [
     path('', views.index, name='index'),
+    path('trending/', views.trending_posts, name='trending'),
     path('group/<slug:slug>/', views.group_posts, name='group_list'),
+    path('tag/<str:name>/', views.tag_posts, name='tag_posts'),
+    path('mentions/', views.mentions, name='mentions'),
+    path(
+        'feed/<str:scope>/since/<str:cursor>/',
+        views.new_posts, name='new_posts'
+    ),
     path('profile/<str:username>/', views.profile, name='profile'),
     path('posts/<int:post_id>/', views.post_detail, name='post_detail'),
     path('create/', views.post_create, name='post_create'),
@@ -0,0 +1,104 @@
+"""Счётчик просмотров постов.
+
+Просмотры копятся в памяти воркера (core.counters.Accumulator) и не чаще
+раза в POST_VIEWS_FLUSH_INTERVAL секунд (по окончании запроса или
+фоновым потоком core.counters.start_flusher) записываются одной
+транзакцией: на каждую базу — UPDATE … CASE по пачке постов. При
+падении воркера теряются только просмотры с последнего сброса. Повторный
+просмотр поста тем же зрителем в течение POST_VIEWS_DEDUPE_WINDOW секунд
+не считается; отметки о просмотрах хранятся в кэше
+POST_VIEWS_DEDUPE_CACHE. Он должен быть общим для воркеров: с кэшем в
+памяти процесса зритель учитывается по разу в каждом воркере, и
+manage.py check --deploy сообщает об ошибке (posts.E001).
+"""
+import atexit
+import hashlib
+from collections import defaultdict
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.db.models import Case, F, IntegerField, Value, When
+
+from core import object_cache
+from core.counters import Accumulator
+from posts import sharding, trending
+from posts.models import Post
+
+# Каждый пост занимает три параметра запроса, а SQLite допускает 999.
+BATCH_SIZE = 300
+
+
+def _viewer(request):
+    if request.user.is_authenticated:
+        return f'user:{request.user.pk}'
+    if request.session.session_key:
+        return f'session:{request.session.session_key}'
+    # Сессию для гостя не создаём, чтобы не писать в базу на каждый
+    # просмотр, и узнаём его по адресу и браузеру.
+    fingerprint = '|'.join((
+        request.META.get('REMOTE_ADDR', ''),
+        request.META.get('HTTP_USER_AGENT', ''),
+    ))
+    return 'guest:' + hashlib.blake2b(
+        fingerprint.encode(), digest_size=16
+    ).hexdigest()
+
+
+def _update(database, deltas):
+    pks = list(deltas)
+    for start in range(0, len(pks), BATCH_SIZE):
+        batch = pks[start:start + BATCH_SIZE]
+        Post.objects.using(database).filter(pk__in=batch).update(
+            views_count=F('views_count') + Case(
+                *(When(pk=pk, then=Value(deltas[pk])) for pk in batch),
+                default=Value(0), output_field=IntegerField()
+            )
+        )
+
+
+def _databases(pk):
+    """Базы, где может лежать пост.
+
+    id из диапазона шарда выдан этим шардом. Посты, созданные до
+    шардирования, сохраняют старые id и лежат в основной базе или, после
+    shard_posts, в шарде автора; их ищем во всех базах, как
+    posts.counters.write_comments_count.
+    """
+    shard = sharding.shard_for_pk(pk)
+    if shard is not None:
+        return [shard]
+    return [DEFAULT_DB_ALIAS, *settings.SHARD_DATABASES]
+
+
+def _write(deltas):
+    by_database = defaultdict(dict)
+    for pk, delta in deltas.items():
+        for database in _databases(pk):
+            by_database[database][pk] = delta
+    with ExitStack() as stack:
+        for database in by_database:
+            stack.enter_context(transaction.atomic(using=database))
+        for database, database_deltas in by_database.items():
+            _update(database, database_deltas)
+    for pk in deltas:
+        object_cache.forget(Post, pk)
+    trending.add('view', deltas)
+
+
+accumulator = Accumulator(_write, 'POST_VIEWS_FLUSH_INTERVAL')
+atexit.register(accumulator.flush)
+
+
+def record(request, post):
+    """Учитывает просмотр, если зритель не видел пост за окно дедупликации."""
+    key = f'post_view:{post.pk}:{_viewer(request)}'
+    dedupe = caches[settings.POST_VIEWS_DEDUPE_CACHE]
+    if dedupe.add(key, True, settings.POST_VIEWS_DEDUPE_WINDOW):
+        accumulator.add(post.pk)
+
+
+def views(post):
+    """Просмотры поста с учётом ещё не сброшенных в этом воркере."""
+    return post.views_count + accumulator.pending(post.pk)
@@ -1,28 +1,49 @@
 from django.contrib.auth.decorators import login_required
 from django.core.paginator import Paginator
+from django.http import Http404, JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
 from django.urls import reverse
+from posts import (
+    follow_cache, hashtags, live, recent, recommendations, trending,
+    view_counter
+)
 from posts.forms import CommentForm, PostForm
-from posts.models import Comment, Group, Post, Follow
+from posts.models import Group, Post, Follow, Tag
+from core import keyset
 from core.models import User
+from core.object_cache import get_cached_or_404
+from core.write_queue import run_write
 
-from yatube.settings import NUMBER_OF_POSTS
+from yatube.settings import NUMBER_OF_POSTS, SSE_URL
 
 
 def index(request):
-    post_list = Post.objects.select_related('author', 'group')
+    post_list = Post.objects.feed()
     paginator = Paginator(post_list, NUMBER_OF_POSTS)
     page_number = request.GET.get('page')
     page_obj = paginator.get_page(page_number)
     context = {
         'page_obj': page_obj,
+        'follow_version': follow_cache.version(request.user),
+        'events_url': SSE_URL,
+        'events_token': live.token(),
     }
     return render(request, 'posts/index.html', context)
 
 
+def trending_posts(request):
+    paginator = Paginator(trending.top(), NUMBER_OF_POSTS)
+    page_number = request.GET.get('page')
+    page_obj = paginator.get_page(page_number)
+    context = {
+        'page_obj': page_obj,
+    }
+    return render(request, 'posts/trending.html', context)
+
+
 def group_posts(request, slug):
-    group = get_object_or_404(Group, slug=slug)
-    posts_list = group.posts.select_related('author')
+    group = get_cached_or_404(Group, slug=slug)
+    posts_list = Post.objects.feed().filter(group=group)
     paginator = Paginator(posts_list, NUMBER_OF_POSTS)
     page_number = request.GET.get('page')
     page_obj = paginator.get_page(page_number)
@@ -33,14 +54,72 @@ def group_posts(request, slug):
     return render(request, 'posts/group_list.html', context)
 
 
+def keyset_feed(request, queryset):
+    """Страница ленты по ключу: посты и курсор следующей страницы."""
+    try:
+        return hashtags.feed(
+            queryset, request.GET.get('cursor'), NUMBER_OF_POSTS
+        )
+    except ValueError:
+        raise Http404('Неверный курсор')
+
+
+def tag_posts(request, name):
+    tag = get_object_or_404(Tag, name=name.casefold())
+    posts, next_cursor = keyset_feed(request, tag.post_tags.all())
+    context = {
+        'tag': tag,
+        'posts': posts,
+        'next_cursor': next_cursor,
+    }
+    return render(request, 'posts/tag_posts.html', context)
+
+
+@login_required
+def mentions(request):
+    posts, next_cursor = keyset_feed(request, request.user.mentions.all())
+    context = {
+        'posts': posts,
+        'next_cursor': next_cursor,
+    }
+    return render(request, 'posts/mentions.html', context)
+
+
+def _feed_scopes(request, scope):
+    if scope == 'all':
+        return ['all']
+    if scope == 'follow':
+        return [
+            f'author:{author_id}'
+            for author_id in follow_cache.following_ids(request.user).tolist()
+        ]
+    kind, _, key = scope.partition(':')
+    if kind == 'group':
+        return [f'group:{get_cached_or_404(Group, slug=key).pk}']
+    if kind == 'author':
+        return [f'author:{get_cached_or_404(User, username=key).pk}']
+    raise Http404('Неизвестная лента')
+
+
+def new_posts(request, scope, cursor):
+    """Число и id постов ленты scope новее cursor, без шаблона."""
+    try:
+        position = keyset.decode(cursor)
+    except ValueError:
+        raise Http404('Неверный курсор')
+    keys, more = recent.since(_feed_scopes(request, scope), position)
+    return JsonResponse({
+        'count': len(keys),
+        'more': more,
+        'ids': [pk for _, pk in keys],
+        'cursor': keyset.encode(*keys[0]) if keys else cursor,
+    })
+
+
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
-    posts = author.posts.select_related()
-    if request.user.is_authenticated and (
-            request.user.follower.filter(author=author).exists()):
-        following = True
-    else:
-        following = False
+    author = get_cached_or_404(User, username=username)
+    posts = Post.objects.feed().filter(author=author)
+    following = follow_cache.is_following(request.user, author.pk)
     paginator = Paginator(posts, NUMBER_OF_POSTS)
     page_number = request.GET.get('page')
     page_obj = paginator.get_page(page_number)
@@ -48,18 +127,21 @@ def profile(request, username):
         'page_obj': page_obj,
         'author': author,
         'following': following,
+        'who_to_follow': recommendations.for_user(request.user),
     }
     return render(request, 'posts/profile.html', context)
 
 
 def post_detail(request, post_id):
-    post = get_object_or_404(Post, pk=post_id)
+    post = get_cached_or_404(Post.objects.sharded(), pk=post_id)
+    view_counter.record(request, post)
     form = CommentForm(request.POST or None)
-    comments = Comment.objects.filter(post_id=post.id)
+    comments = post.comments.all()
     context = {
         'form': form,
         'post': post,
-        'comments': comments
+        'comments': comments,
+        'views_count': view_counter.views(post),
     }
     return render(request, 'posts/post_detail.html', context)
 
@@ -70,14 +152,14 @@ def post_create(request):
     if form.is_valid():
         post = form.save(False)
         post.author = request.user
-        form.save()
+        run_write(form.save)
         return redirect('posts:profile', request.user)
     return render(request, 'posts/create_post.html', {'form': form})
 
 
 @login_required
 def post_edit(request, post_id):
-    post = get_object_or_404(Post, pk=post_id)
+    post = get_cached_or_404(Post.objects.sharded(), pk=post_id)
     if request.user != post.author:
         return redirect('posts:post_detail', post_id)
     form = PostForm(
@@ -98,24 +180,29 @@ def post_edit(request, post_id):
 
 @login_required
 def add_comment(request, post_id):
-    post = get_object_or_404(Post, pk=post_id)
+    post = get_cached_or_404(Post.objects.sharded(), pk=post_id)
     form = CommentForm(request.POST or None)
     if form.is_valid():
         comment = form.save(commit=False)
         comment.author = request.user
         comment.post = post
-        comment.save()
+        run_write(comment.save)
     return redirect('posts:post_detail', post_id=post_id)
 
 
 @login_required
 def follow_index(request):
-    post_list = Post.objects.filter(author__following__user=request.user)
+    post_list = Post.objects.feed().filter(
+        author__in=request.user.follower.values_list('author', flat=True)
+    )
     paginator = Paginator(post_list, NUMBER_OF_POSTS)
     page_number = request.GET.get('page')
     page_obj = paginator.get_page(page_number)
     context = {
         'page_obj': page_obj,
+        'who_to_follow': recommendations.for_user(request.user),
+        'events_url': SSE_URL,
+        'events_token': live.token(request.user),
     }
     return render(request, 'posts/follow.html', context)
 
@@ -125,9 +212,10 @@ def profile_follow(request, username):
     follow_author = get_object_or_404(User, username=username)
 
     if follow_author != request.user and (
-        not request.user.follower.filter(author=follow_author).exists()
+        not follow_cache.is_following(request.user, follow_author.pk)
     ):
-        Follow.objects.create(
+        run_write(
+            Follow.objects.create,
             user=request.user,
             author=follow_author
         )
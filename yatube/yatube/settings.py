@@ -33,11 +33,19 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.compression.CompressionMiddleware',
+    'core.middleware.MetricsMiddleware',
+    'core.middleware.ServerTimingMiddleware',
+    'core.middleware.SlowQueryLogMiddleware',
+    'core.middleware.MemoryMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'core.middleware.ReplicaRoutingMiddleware',
+    'core.middleware.IdentityMapMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.middleware.ProfilingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     #'debug_toolbar.middleware.DebugToolbarMiddleware',
@@ -71,6 +79,8 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'yatube.wsgi.application'
 
+TEST_RUNNER = 'core.test_runner.TestRunner'
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
@@ -78,6 +88,53 @@ DATABASES = {
     }
 }
 
+# Реплики только для чтения. Чтобы включить локально, добавьте
+#     DATABASES['replica'] = {
+#         'ENGINE': 'django.db.backends.sqlite3',
+#         'NAME': os.path.join(BASE_DIR, 'db_replica.sqlite3'),
+#     }
+#     REPLICA_DATABASES = ['replica']
+# и периодически запускайте manage.py sync_replicas --interval 5.
+DATABASE_ROUTERS = [
+    'posts.sharding.ShardRouter',
+    'core.routers.PrimaryReplicaRouter',
+]
+REPLICA_DATABASES = []
+REPLICA_READ_VIEWS = [
+    'posts:index',
+    'posts:group_list',
+    'posts:profile',
+    'posts:post_detail',
+    'posts:follow_index',
+    'about:author',
+    'about:tech',
+]
+# Сколько секунд после записи браузер читает из основной базы.
+REPLICA_PIN_SECONDS = 10
+# На сколько секунд недоступная реплика исключается из выбора.
+REPLICA_RETRY_SECONDS = 30
+
+# Шарды постов и комментариев. Чтобы включить локально, добавьте
+#     for name in ('shard0', 'shard1'):
+#         DATABASES[name] = {
+#             'ENGINE': 'django.db.backends.sqlite3',
+#             'NAME': os.path.join(BASE_DIR, f'db_{name}.sqlite3'),
+#         }
+#     SHARD_DATABASES = ['shard0', 'shard1']
+# выполните migrate --database для каждого шарда и manage.py shard_posts.
+SHARD_DATABASES = []
+# Размер диапазона первичных ключей одного шарда (см. posts.sharding).
+SHARD_ID_RANGE = 10 ** 12
+
+# Применяются к каждому соединению SQLite (см. core.db.configure_sqlite).
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,
+    'mmap_size': 256 * 1024 * 1024,
+    'temp_store': 'MEMORY',
+}
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -107,6 +164,13 @@ STATIC_URL = '/static/'
 
 STATICFILES_DIRS = (os.path.join(BASE_DIR, 'static'),)
 
+# collectstatic добавляет к именам хэш и кладёт рядом .gz и .br; из
+# STATIC_ROOT файлы отдаёт core.staticfiles.StaticFiles в yatube.wsgi.
+# STATIC_MAX_AGE — время кэширования файлов без хэша в имени, секунды.
+STATIC_ROOT = os.path.join(BASE_DIR, 'collected_static')
+STATICFILES_STORAGE = 'core.staticfiles.CompressedManifestStaticFilesStorage'
+STATIC_MAX_AGE = 60
+
 NUMBER_OF_POSTS = 10
 
 LOGIN_URL = 'users:login'
@@ -121,8 +185,133 @@ CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Кэш в памяти процесса годится для одного воркера; с несколькими
+# настройте общий кэш (Redis, Memcached, база), см. manage.py check
+# --deploy.
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'BACKEND': 'core.cache.InstrumentedLocMemCache',
     }
 }
+
+# Модели, экземпляры которых переиспользуются в пределах запроса
+# (см. core.identity_map).
+IDENTITY_MAP_MODELS = ['auth.User', 'posts.Group']
+
+# Шардированные счётчики (см. core.counters): строк на счётчик, период
+# сброса накопленных в процессе дельт (по окончании запроса и фоновым
+# потоком воркера) и время кэширования суммы.
+SHARDED_COUNTER_SHARDS = 8
+SHARDED_COUNTER_FLUSH_INTERVAL = 1.0
+SHARDED_COUNTER_CACHE_TIMEOUT = 5
+
+# Период сброса просмотров постов в базу, окно, в котором повторный
+# просмотр из той же сессии не считается, и кэш отметок о просмотрах
+# (см. posts.view_counter). С несколькими воркерами кэш должен быть общим.
+POST_VIEWS_FLUSH_INTERVAL = 1.0
+POST_VIEWS_DEDUPE_WINDOW = 30 * 60
+POST_VIEWS_DEDUPE_CACHE = 'default'
+
+# Рейтинг /trending/ (см. posts.trending): период полураспада вклада
+# события, веса событий, размер топа и срок хранения событий, секунды.
+TRENDING_HALF_LIFE = 6 * 60 * 60
+TRENDING_WEIGHTS = {
+    'post': 1.0,
+    'view': 0.1,
+    'comment': 1.0,
+    'follow': 2.0,
+}
+TRENDING_SIZE = 100
+TRENDING_EVENT_RETENTION = 7 * 24 * 60 * 60
+
+# Рекомендации «на кого подписаться» (см. posts.recommendations): сколько
+# авторов хранить на пользователя, сколько подписчиков автора учитывать,
+# вес соподписчиков относительно друзей друзей и время жизни в кэше.
+RECOMMENDATIONS_LIMIT = 10
+RECOMMENDATIONS_FOLLOWERS_SAMPLE = 100
+RECOMMENDATIONS_COFOLLOW_WEIGHT = 0.5
+RECOMMENDATIONS_CACHE_TIMEOUT = 60 * 60
+
+# Длина начала текста поста на карточках лент (см. posts.rendering).
+POST_EXCERPT_LENGTH = 300
+
+# Время жизни списка подписок пользователя в кэше (см. posts.follow_cache).
+FOLLOW_CACHE_TIMEOUT = 60 * 60
+
+# Время жизни объектов в core.object_cache и отметок об их отсутствии.
+OBJECT_CACHE_TIMEOUT = 300
+OBJECT_CACHE_MISS_TIMEOUT = 30
+# Предел для обоих, если кэш default у каждого процесса свой: удаление
+# после записи не доходит до других воркеров.
+OBJECT_CACHE_LOCAL_TIMEOUT = 5
+# Отсев отсутствующих ключей в процессе (см. core.negative_cache).
+NEGATIVE_CACHE_SIZE = 10000
+NEGATIVE_CACHE_TIMEOUT = 30
+# Журнал, через который процессы узнают о сохранённых ключах.
+NEGATIVE_CACHE_LOG = os.path.join(BASE_DIR, 'logs', 'negative_cache.ndjson')
+# Поля, для которых строится фильтр Блума, например
+# ['auth.user.username', 'posts.group.slug']. Требуют общего для процессов
+# кэша default.
+NEGATIVE_CACHE_BLOOM_FIELDS = []
+NEGATIVE_CACHE_BLOOM_ERROR_RATE = 0.01
+
+# Доля запросов, для которых считаются SQL, шаблоны и кэш
+# (заголовок Server-Timing и лог core.timing).
+SERVER_TIMING_SAMPLE_RATE = 1.0
+
+# Журнал медленных запросов (NDJSON с ротацией); None отключает журнал.
+SLOW_QUERY_THRESHOLD_MS = 100
+SLOW_QUERY_LOG = os.path.join(BASE_DIR, 'logs', 'slow_queries.ndjson')
+SLOW_QUERY_LOG_MAX_BYTES = 10 * 1024 * 1024
+SLOW_QUERY_LOG_BACKUP_COUNT = 5
+
+# Метрики Prometheus: каталог для файлов воркеров (None — только текущий
+# процесс), период сброса в секундах и адреса, которым доступен /metrics.
+METRICS_DIR = os.path.join(BASE_DIR, 'logs', 'metrics')
+METRICS_FLUSH_INTERVAL = 5
+METRICS_ALLOWED_IPS = ['127.0.0.1', '::1']
+
+THUMBNAIL_BACKEND = 'core.thumbnails.TimedThumbnailBackend'
+
+# Профилировщик по запросу сотрудника: период снятия стеков и каталог
+# для файлов со свёрнутыми стеками.
+PROFILE_INTERVAL = 0.005
+PROFILE_DIR = os.path.join(BASE_DIR, 'logs', 'profiles')
+
+# tracemalloc: глубина стека выделений и число хранимых снимков.
+MEMORY_TRACE_FRAMES = 25
+MEMORY_SNAPSHOT_LIMIT = 5
+
+# Очередь записи с групповой фиксацией (core.write_queue), своя в каждом
+# процессе. WRITE_QUEUE_TIMEOUT — сколько секунд запись может ждать начала
+# выполнения, прежде чем её снимут с очереди.
+WRITE_QUEUE_ENABLED = False
+WRITE_QUEUE_BATCH_SIZE = 50
+WRITE_QUEUE_MAX_DELAY = 0
+WRITE_QUEUE_TIMEOUT = 10
+
+# Уведомления о новых постах: журнал событий (core.pubsub) и sidecar
+# Server-Sent Events (core.sse, команда sse_server), на который прокси
+# отправляет SSE_URL. Периоды — в секундах, кроме SSE_RETRY_MS.
+PUBSUB_LOG = os.path.join(BASE_DIR, 'logs', 'pubsub.ndjson')
+PUBSUB_LOG_MAX_BYTES = 10 * 1024 * 1024
+SSE_URL = '/events/'
+SSE_HEARTBEAT = 15
+SSE_POLL_INTERVAL = 0.25
+SSE_RETRY_MS = 3000
+SSE_TOKEN_MAX_AGE = 12 * 60 * 60
+
+# Опрос новых постов ленты (posts.recent): ключей в буфере области и
+# число буферов в процессе.
+RECENT_POSTS_SIZE = 200
+RECENT_POSTS_SCOPES = 10000
+
+# Сжатие ответов (core.compression): минимальный размер тела в байтах,
+# уровни gzip и brotli для ответов и уровень для кэшируемых фрагментов,
+# которые сжимаются один раз. COMPRESSION_FRAGMENTS = False отключает
+# склейку ответа из заранее сжатых фрагментов.
+COMPRESSION_MIN_LENGTH = 200
+COMPRESSION_GZIP_LEVEL = 6
+COMPRESSION_BROTLI_QUALITY = 5
+COMPRESSION_FRAGMENT_LEVEL = 9
+COMPRESSION_FRAGMENTS = True
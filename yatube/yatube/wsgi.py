@@ -1,7 +1,14 @@
 import os
 
 from django.core.wsgi import get_wsgi_application
+from django.utils.module_loading import import_string
+
+from core.staticfiles import StaticFiles
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
 
-application = get_wsgi_application()
+application = StaticFiles(get_wsgi_application())
+
+# Фоновый сброс счётчиков нужен только процессам, обслуживающим запросы;
+# модуль импортируется после загрузки приложений.
+import_string('core.counters.start_flusher')()